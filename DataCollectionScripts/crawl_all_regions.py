@@ -0,0 +1,46 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import REGION_ROUTING
+from src.crawler import crawl_regions
+from src.key_pool import KeyPool
+from src.metrics import start_reporting_from_env
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
+load_dotenv()
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
+    print("❌ Error: RIOT_API_KEY not found in .env file")
+    exit(1)
+
+# Comma-separated platform regions to crawl, e.g. REGIONS=na1,euw1,kr (default: all)
+regions = [r.strip() for r in os.getenv("REGIONS", ",".join(REGION_ROUTING)).split(",") if r.strip()]
+unknown = [r for r in regions if r not in REGION_ROUTING]
+if unknown:
+    print(f"❌ Error: Unknown region(s): {', '.join(unknown)}")
+    exit(1)
+
+backfill_pages = int(os.getenv("BACKFILL_PAGES", "0"))
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
+
+os.makedirs("data", exist_ok=True)
+print(f"🌍 Crawling {len(regions)} regions at once: {', '.join(regions)}")
+# Metrics snapshots go to data/metrics.json (METRICS_PORT also serves them over HTTP)
+metrics = start_reporting_from_env()
+summaries = crawl_regions(API_KEYS, regions, backfill_pages=backfill_pages, max_in_flight=max_in_flight)
+metrics.stop_reporting()
+
+# Print summary
+print("\n📊 MULTI-REGION CRAWL SUMMARY")
+print("=" * 70)
+print(f"{'Region':<8}{'Players':<10}{'New IDs':<10}{'Saved':<10}{'Time':<10}")
+print("-" * 70)
+for summary in summaries:
+    if 'error' in summary:
+        print(f"{summary['region']:<8}❌ {summary['error']}")
+        continue
+    print(f"{summary['region']:<8}{summary['players']:<10}{summary['new_match_ids']:<10}"
+          f"{summary['matches_saved']:<10}{summary['seconds']:.0f}s")
+print("=" * 70)
@@ -1,34 +1,35 @@
-import requests
 import os
-import time
+import sys
 import csv
+import requests
 from dotenv import load_dotenv
 
-# Load API key from .env
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import REGION_ROUTING, RiotClient
+from src.job_queue import JobQueue, KIND_MATCH_IDS, KIND_MATCH
+from src.key_pool import KeyPool
+from src.match_sync import MatchSync
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
 load_dotenv()
-API_KEY = os.getenv("RIOT_API_KEY")
-if not API_KEY:
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
     print("❌ Error: RIOT_API_KEY not found in .env file")
     exit(1)
 
-headers = {"X-Riot-Token": API_KEY}
+client = RiotClient(API_KEYS)
 
 # Read region from env or use default
 region = os.getenv("REGION", "na1")
-match_region_mapping = {
-    "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
-    "euw1": "europe", "eun1": "europe", "tr1": "europe", "ru": "europe",
-    "kr": "asia", "jp1": "asia"
-}
-region_routing = match_region_mapping.get(region, "americas")  # for match-v5
+region_routing = REGION_ROUTING.get(region, "americas")  # for match-v5
+
+# Pages of older history (100 IDs each) to backfill per player on this run
+backfill_pages = int(os.getenv("BACKFILL_PAGES", "0"))
 
 # Input and output files
 # Use relative paths from script location
 input_path = "data/all_challenger_puuids.csv"
 output_path = "data/player_match_ids.csv"
-# Rate limiting variables
-requests_made = 0
-last_request_time = time.time()
 
 # Check if input file exists
 if not os.path.exists(input_path):
@@ -44,7 +45,7 @@ try:
         for row in reader:
             players.append({
                 "rank": row.get("rank", ""),
-                "name": row.get("name", "Unknown"),
+                "name": row.get("name") or row.get("puuid", "")[:15],
                 "puuid": row.get("puuid", ""),
                 "league_points": row.get("league_points", "0")
             })
@@ -53,62 +54,60 @@ except Exception as e:
     print(f"❌ Error reading input file: {str(e)}")
     exit(1)
 
-# Write header to output file
-with open(output_path, "w") as f:
-    f.write("rank,name,league_points,match_ids\n")
+# Queue a match-ID listing per player. If the previous run was interrupted,
+# resume it; otherwise start a fresh round for every player.
+queue = JobQueue()
+# Nothing else uses the job table while this runs, so jobs a crashed run had claimed can be picked up again at once
+queue.recover(older_than=0)
+sync = MatchSync()
+resuming = queue.has_open(KIND_MATCH_IDS, region)
+queue.enqueue_many(KIND_MATCH_IDS, region, [p["puuid"] for p in players if p["puuid"]], reset=not resuming)
+players_by_puuid = {p["puuid"]: p for p in players}
+if resuming:
+    print(f"↩️ Resuming interrupted run: {queue.counts(KIND_MATCH_IDS, region)}")
 
-    for i, player in enumerate(players):
+processed = 0
+for jobs in queue.drain(KIND_MATCH_IDS, region):
+    for puuid, _ in jobs:
+        player = players_by_puuid.get(puuid, {"name": puuid[:15], "rank": "", "league_points": ""})
         name = player["name"]
-        puuid = player["puuid"]
-        rank = player["rank"]
-        lp = player["league_points"]
+        processed += 1
         
         # Show progress every 10 players
-        if (i+1) % 10 == 0:
-            print(f"Processing player {i+1}/{len(players)}...")
-        
-        if not puuid:
-            print(f"⚠️ Skipping {name} - No PUUID available")
-            continue
+        if processed % 10 == 0:
+            print(f"Processing player {processed}/{len(players)}...")
             
         try:
-            # Check rate limit
-            if requests_made >= 100:
-                time_diff = time.time() - last_request_time
-                if time_diff < 120:
-                    sleep_time = 120 - time_diff
-                    print(f"⏳ Sleeping for {sleep_time:.1f} seconds to avoid rate limit...")
-                    time.sleep(sleep_time)
-                requests_made = 0
-                last_request_time = time.time()
-                
-            # Fetch match IDs
-            url = f"https://{region_routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-            params = {"count": 10, "queue": 420, "type": "ranked"}  # 420 = Ranked Solo 5v5
-            response = requests.get(url, headers=headers, params=params)
+            # Fetch only the ranked solo match IDs played since this player's last sync
+            match_ids = sync.sync_player(client, region, puuid, backfill_pages=backfill_pages)
+            queue.complete(KIND_MATCH_IDS, region, puuid, result=match_ids)
+            # Hand the IDs straight to the match download stage
+            queue.enqueue_many(KIND_MATCH, region, match_ids)
             
-            if response.status_code == 200:
-                match_ids = response.json()
-                # Write to CSV: rank, name, league_points, match_ids (comma-separated)
-                match_ids_str = ",".join(match_ids)
-                f.write(f"{rank},{name},{lp},\"{match_ids_str}\"\n")
-                
-                # Only print details for every 10th player to avoid console spam
-                if i % 10 == 0:
-                    print(f"✅ #{rank}: {name:<20} | {lp:>4} LP | Matches: {len(match_ids)}")
-            else:
-                print(f"❌ Failed for {name} | Status: {response.status_code}")
-                if response.status_code == 429:
-                    print("Rate limit exceeded. Sleeping for 2 minutes...")
-                    time.sleep(120)
-                    
-            # Rate limiting
-            requests_made += 1
-            time.sleep(1.2)  # Prevent hitting rate limits
+            # Only print details for every 10th player to avoid console spam
+            if processed % 10 == 1:
+                print(f"✅ #{player['rank']}: {name:<20} | {player['league_points']:>4} LP | New matches: {len(match_ids)}")
             
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code
+            print(f"❌ Failed for {name} | Status: {status}")
+            queue.fail(KIND_MATCH_IDS, region, puuid, f"Status {status}", retry=status not in (400, 404))
         except Exception as e:
             print(f"❌ Error processing {name}: {str(e)}")
+            queue.fail(KIND_MATCH_IDS, region, puuid, str(e))
+
+# Write every match ID synced so far for each player to CSV:
+# rank, name, league_points, match_ids (comma-separated, newest first)
+with open(output_path, "w") as f:
+    f.write("rank,name,league_points,match_ids\n")
+    for player in players:
+        if not player["puuid"]:
+            print(f"⚠️ Skipping {player['name']} - No PUUID available")
             continue
+        match_ids = sync.known_match_ids(region, player["puuid"])
+        if match_ids:
+            match_ids_str = ",".join(match_ids)
+            f.write(f"{player['rank']},{player['name']},{player['league_points']},\"{match_ids_str}\"\n")
 
 print(f"\n✅ All match data saved to {output_path}")
 
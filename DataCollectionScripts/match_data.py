@@ -1,48 +1,51 @@
-import requests
-import time
 import os
-import json
+import sys
 import csv
+import asyncio
 from dotenv import load_dotenv
 from datetime import datetime
 
-# Load API key from .env
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import REGION_ROUTING, RiotClient
+from src.async_downloader import download_matches
+from src.job_queue import JobQueue, KIND_MATCH
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+from src.metrics import start_reporting_from_env
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
 load_dotenv()
-API_KEY = os.getenv("RIOT_API_KEY")
-if not API_KEY:
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
     print("❌ Error: RIOT_API_KEY not found in .env file")
     exit(1)
 
 # Read region from env or use default
 region = os.getenv("REGION", "na1")
-match_region_mapping = {
-    "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
-    "euw1": "europe", "eun1": "europe", "tr1": "europe", "ru": "europe",
-    "kr": "asia", "jp1": "asia"
-}
-region_routing = match_region_mapping.get(region, "americas")
+region_routing = REGION_ROUTING.get(region, "americas")
+
+# DOWNLOAD_MODE=async keeps MAX_IN_FLIGHT requests running at once
+download_mode = os.getenv("DOWNLOAD_MODE", "sequential")
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
 
-headers = {"X-Riot-Token": API_KEY}
+client = RiotClient(API_KEYS, pool_size=max_in_flight)
 
 # File paths
 input_path = "data/player_match_ids.csv"
 output_folder = "data/match_data"
-# Rate limiting variables
-requests_made = 0
-last_request_time = time.time()
-MAX_REQUESTS = 100
-RATE_LIMIT_WINDOW = 120  # 2 minutes
 
 # Make sure output folder exists
 os.makedirs(output_folder, exist_ok=True)
 
-# Create player-specific folders
-player_folder = os.path.join(output_folder, "by_player")
-os.makedirs(player_folder, exist_ok=True)
+# Matches are packed into one compressed store; per-player views come from its index
+store = MatchStore()
 
-# Create a folder for all matches
-matches_folder = os.path.join(output_folder, "all_matches")
-os.makedirs(matches_folder, exist_ok=True)
+# Pack any matches saved by older runs as one JSON file each
+legacy_matches_folder = os.path.join(output_folder, "all_matches")
+if os.path.isdir(legacy_matches_folder):
+    imported = store.import_json_dir(legacy_matches_folder)
+    if imported:
+        print(f"📦 Packed {imported} legacy match files into {store.root}")
 
 # Check if input file exists
 if not os.path.exists(input_path):
@@ -82,99 +85,99 @@ for player in player_matches:
 
 print(f"🔍 Found {len(all_match_ids)} unique match IDs to process")
 
+# Match downloads live in the crawl job table: finished matches are never
+# checked again and failed ones are retried with backoff
+queue = JobQueue()
+# Nothing else uses the job table while this runs, so jobs a crashed run had claimed can be picked up again at once
+queue.recover(older_than=0)
+states = queue.states(KIND_MATCH, region)
+new_match_ids = [match_id for match_id in all_match_ids if match_id not in states]
+queue.enqueue_many(KIND_MATCH, region, new_match_ids)
+
+# Matches stored before the job table existed only need marking done
+queue.complete_many(KIND_MATCH, region, [match_id for match_id in new_match_ids if match_id in store])
+
+print(f"📋 Match jobs: {queue.counts(KIND_MATCH, region)}")
+
+
+def handle_response(log, progress, match_id, response, error):
+    """Save a downloaded match, or record the failure so it is retried later"""
+    if error is not None:
+        queue.fail(KIND_MATCH, region, match_id, str(error))
+        log.write(f"  {progress}: {match_id} - ❌ Error: {str(error)}\n")
+        print(f"  {progress}: {match_id} - ❌ Error: {str(error)}")
+    elif response.status_code == 200:
+        store.put(match_id, response.json())
+        queue.complete(KIND_MATCH, region, match_id)
+        client.metrics.record_matches()
+        log.write(f"  {progress}: {match_id} - ✅ Saved\n")
+        print(f"  {progress}: {match_id} - ✅ Saved")
+    else:
+        state = queue.fail(KIND_MATCH, region, match_id, f"Status {response.status_code}",
+                           retry=response.status_code not in (400, 404))
+        log.write(f"  {progress}: {match_id} - ❌ Failed: Status {response.status_code} ({state})\n")
+        print(f"  {progress}: {match_id} - ❌ Failed: Status {response.status_code} ({state})")
+
+
+def download_all_async(log):
+    """Download queued matches concurrently, MAX_IN_FLIGHT at a time"""
+    print(f"⬇️ Downloading with {max_in_flight} requests in flight...")
+    done = 0
+
+    def on_result(match_id, response, error):
+        nonlocal done
+        done += 1
+        handle_response(log, f"Match {done}", match_id, response, error)
+
+    for jobs in queue.drain(KIND_MATCH, region, batch_size=max_in_flight * 50):
+        match_ids = [match_id for match_id, _ in jobs]
+        asyncio.run(download_matches(client, region_routing, match_ids, on_result, max_in_flight=max_in_flight))
+
+
+def download_all_sequential(log):
+    """Download queued matches one at a time"""
+    done = 0
+    for jobs in queue.drain(KIND_MATCH, region):
+        for match_id, _ in jobs:
+            done += 1
+            try:
+                response = client.get(region_routing, f"/lol/match/v5/matches/{match_id}")
+            except Exception as e:
+                handle_response(log, f"Match {done}", match_id, None, e)
+            else:
+                handle_response(log, f"Match {done}", match_id, response, None)
+
+
 # Create a log file to track progress
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 log_file = os.path.join(output_folder, f"match_data_log_{timestamp}.txt")
 
+# Metrics snapshots go to data/metrics.json (METRICS_PORT also serves them over HTTP)
+metrics = start_reporting_from_env(client.metrics)
+
 with open(log_file, "w") as log:
     log.write(f"Match data collection started at {datetime.now()}\n")
     log.write(f"Total unique matches to process: {len(all_match_ids)}\n\n")
     
-    # Process each player's matches
-    for player_idx, player in enumerate(player_matches):
-        player_name = player["name"]
-        player_rank = player["rank"]
-        match_ids = player["match_ids"]
-        
-        # Create a folder for this player
-        safe_name = "".join(c if c.isalnum() else "_" for c in player_name)
-        player_match_folder = os.path.join(player_folder, f"{player_rank}_{safe_name}")
-        os.makedirs(player_match_folder, exist_ok=True)
-        
-        log.write(f"Processing player {player_idx+1}/{len(player_matches)}: {player_name} (Rank {player_rank})\n")
-        print(f"\nProcessing player {player_idx+1}/{len(player_matches)}: {player_name} (Rank {player_rank})")
-        
-        # Process each match for this player
-        for match_idx, match_id in enumerate(match_ids):
-            if not match_id:  # Skip empty match IDs
-                continue
-                
-            # Check if we already have this match data
-            match_file_path = os.path.join(matches_folder, f"{match_id}.json")
-            if os.path.exists(match_file_path):
-                # Create a symlink to the existing match data in the player's folder
-                player_match_path = os.path.join(player_match_folder, f"{match_id}.json")
-                if not os.path.exists(player_match_path):
-                    os.symlink(match_file_path, player_match_path)
-                
-                log.write(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - Already exists, created link\n")
-                continue
-            
-            # Check rate limit
-            if requests_made >= MAX_REQUESTS:
-                time_diff = time.time() - last_request_time
-                if time_diff < RATE_LIMIT_WINDOW:
-                    sleep_time = RATE_LIMIT_WINDOW - time_diff
-                    log.write(f"  Rate limit reached. Sleeping for {sleep_time:.1f} seconds\n")
-                    print(f"⏳ Rate limit reached. Sleeping for {sleep_time:.1f} seconds...")
-                    time.sleep(sleep_time)
-                requests_made = 0
-                last_request_time = time.time()
-            
-            # Fetch match data
-            url = f"https://{region_routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-            try:
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code == 200:
-                    match_data = response.json()
-                    
-                    # Save to all_matches folder
-                    with open(match_file_path, "w") as f:
-                        json.dump(match_data, f, indent=2)
-                    
-                    # Create a symlink in the player's folder
-                    player_match_path = os.path.join(player_match_folder, f"{match_id}.json")
-                    if not os.path.exists(player_match_path):
-                        os.symlink(match_file_path, player_match_path)
-                    
-                    log.write(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ✅ Saved\n")
-                    print(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ✅ Saved")
-                else:
-                    log.write(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ❌ Failed: Status {response.status_code}\n")
-                    print(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ❌ Failed: Status {response.status_code}")
-                    
-                    if response.status_code == 429:
-                        retry_after = int(response.headers.get('Retry-After', 10))
-                        log.write(f"  Rate limit exceeded. Sleeping for {retry_after} seconds\n")
-                        print(f"⏳ Rate limit exceeded. Sleeping for {retry_after} seconds...")
-                        time.sleep(retry_after)
-            
-            except Exception as e:
-                log.write(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ❌ Error: {str(e)}\n")
-                print(f"  Match {match_idx+1}/{len(match_ids)}: {match_id} - ❌ Error: {str(e)}")
-            
-            # Rate limiting
-            requests_made += 1
-            time.sleep(1.2)  # Respect Riot's rate limit
+    if download_mode == "async":
+        download_all_async(log)
+    else:
+        download_all_sequential(log)
     
     log.write(f"\nMatch data collection completed at {datetime.now()}\n")
     log.write(f"Total players processed: {len(player_matches)}\n")
     log.write(f"Total unique matches processed: {len(all_match_ids)}\n")
+    log.write(f"Match jobs: {queue.counts(KIND_MATCH, region)}\n")
+
+metrics.stop_reporting()
 
 print("\n✅ Match data collection complete!")
 print(f"📊 Summary:")
 print(f"  - Processed {len(player_matches)} players")
 print(f"  - Collected data for {len(all_match_ids)} unique matches")
-print(f"  - Data saved to {output_folder}")
-print(f"  - Log file: {log_file}")
\ No newline at end of file
+print(f"  - Match jobs: {queue.counts(KIND_MATCH, region)}")
+print(f"  - Data saved to {store.root} ({len(store)} matches stored)")
+print(f"  - Log file: {log_file}")
+print(f"  - Metrics: {metrics.snapshot()['counters']}")
+
+store.close()
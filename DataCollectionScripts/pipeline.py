@@ -0,0 +1,48 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import RiotClient
+from src.job_queue import JobQueue
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+from src.match_sync import MatchSync
+from src.metrics import start_reporting_from_env
+from src.pipeline import Pipeline
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
+load_dotenv()
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
+    print("❌ Error: RIOT_API_KEY not found in .env file")
+    exit(1)
+
+# Read region and concurrency from env or use defaults
+region = os.getenv("REGION", "na1")
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
+backfill_pages = int(os.getenv("BACKFILL_PAGES", "0"))
+
+os.makedirs("data", exist_ok=True)
+client = RiotClient(API_KEYS, pool_size=max_in_flight + 2)
+store = MatchStore()
+
+# Ladder lookups, match listing and downloads all run at once, so this
+# replaces running puiid.py, match.py and match_data.py one after another
+metrics = start_reporting_from_env(client.metrics)
+print(f"🚀 Running the collection pipeline for {region} ({max_in_flight} downloads in flight)...")
+pipeline = Pipeline(client, region, JobQueue(), MatchSync(), store,
+                    max_in_flight=max_in_flight, backfill_pages=backfill_pages)
+summary = pipeline.run()
+metrics.stop_reporting()
+
+print("\n📊 PIPELINE SUMMARY")
+print("=" * 70)
+print(f"Players: {summary['players']}")
+print(f"New match IDs: {summary['new_match_ids']}")
+print(f"Matches saved: {summary['matches_saved']}")
+print(f"Failed downloads: {summary['failed']}")
+print(f"Time: {summary['seconds']:.0f}s")
+print(f"Matches stored in total: {len(store)}")
+print("=" * 70)
+store.close()
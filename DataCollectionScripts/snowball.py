@@ -0,0 +1,58 @@
+import os
+import sys
+import csv
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import RiotClient
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+from src.match_sync import MatchSync
+from src.metrics import start_reporting_from_env
+from src.snowball import SnowballCrawler
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
+load_dotenv()
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
+    print("❌ Error: RIOT_API_KEY not found in .env file")
+    exit(1)
+
+# Read region and crawl limits from env or use defaults
+region = os.getenv("REGION", "na1")
+max_depth = int(os.getenv("MAX_DEPTH", "2"))
+max_matches = int(os.getenv("MAX_MATCHES", "100000"))
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
+
+# Seed the crawl with the challenger players found by puiid.py
+input_path = "data/all_challenger_puuids.csv"
+if not os.path.exists(input_path):
+    print(f"❌ Error: Input file {input_path} not found")
+    print("Please run the puiid.py script first to generate the challenger player data")
+    exit(1)
+
+with open(input_path, "r") as csvfile:
+    seeds = [row["puuid"] for row in csv.DictReader(csvfile) if row.get("puuid")]
+print(f"✅ Loaded {len(seeds)} seed players from {input_path}")
+
+client = RiotClient(API_KEYS, pool_size=max_in_flight)
+store = MatchStore()
+crawler = SnowballCrawler(client, region, store, MatchSync(), max_depth=max_depth,
+                          max_matches=max_matches, max_in_flight=max_in_flight)
+crawler.seed(seeds)
+
+print(f"🕸️ Snowball crawl from {len(seeds)} players (depth ≤ {max_depth}, up to {max_matches} matches)...")
+# Metrics snapshots go to data/metrics.json (METRICS_PORT also serves them over HTTP)
+metrics = start_reporting_from_env(client.metrics)
+summary = crawler.run()
+metrics.stop_reporting()
+
+print("\n📊 SNOWBALL CRAWL SUMMARY")
+print("=" * 70)
+print(f"Matches saved: {summary['matches_saved']}")
+print(f"Players expanded: {summary['players_expanded']}")
+print(f"Players left in frontier: {summary['frontier']}")
+print(f"Matches stored in total: {len(store)}")
+print("=" * 70)
+
+store.close()
@@ -0,0 +1,52 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import RiotClient
+from src.crawler import download_queued_timelines
+from src.job_queue import JobQueue, KIND_TIMELINE
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+from src.metrics import start_reporting_from_env
+from src.timeline_store import TimelineStore
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
+load_dotenv()
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
+    print("❌ Error: RIOT_API_KEY not found in .env file")
+    exit(1)
+
+# Read region from env or use default
+region = os.getenv("REGION", "na1")
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
+
+client = RiotClient(API_KEYS, pool_size=max_in_flight)
+
+# Queue a timeline download for every stored match of this region that doesn't have one yet
+store = MatchStore()
+timelines = TimelineStore()
+prefix = f"{region.upper()}_"
+match_ids = [m for m in store.match_ids() if m.startswith(prefix) and m not in timelines]
+store.close()
+
+queue = JobQueue()
+# Nothing else uses the job table while this runs, so jobs a crashed run had claimed can be picked up again at once
+queue.recover(older_than=0)
+queue.enqueue_many(KIND_TIMELINE, region, match_ids)
+print(f"🔍 {len(match_ids)} stored matches have no timeline yet")
+print(f"📋 Timeline jobs: {queue.counts(KIND_TIMELINE, region)}")
+
+# Metrics snapshots go to data/metrics.json (METRICS_PORT also serves them over HTTP)
+metrics = start_reporting_from_env(client.metrics)
+saved = download_queued_timelines(client, region, queue, timelines, max_in_flight=max_in_flight)
+metrics.stop_reporting()
+
+print("\n✅ Timeline collection complete!")
+print(f"📊 Summary:")
+print(f"  - Downloaded {saved} timelines")
+print(f"  - Timeline jobs: {queue.counts(KIND_TIMELINE, region)}")
+print(f"  - Data saved to {timelines.root} ({len(timelines)} timelines stored)")
+
+timelines.close()
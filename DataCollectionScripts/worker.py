@@ -0,0 +1,95 @@
+import os
+import socket
+import sys
+from multiprocessing import Pool
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_scraper import RiotClient
+from src.coordinator import DEFAULT_COORDINATOR_PATH, Coordinator, Worker
+from src.job_queue import DONE, DEAD, JobQueue, KIND_MATCH
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+
+# Load API keys from .env (RIOT_API_KEYS=key1,key2,... spreads requests over several keys)
+load_dotenv()
+API_KEYS = KeyPool.from_env()
+if not API_KEYS:
+    print("❌ Error: RIOT_API_KEY not found in .env file")
+    exit(1)
+
+# Read region from env or use default
+region = os.getenv("REGION", "na1")
+# Worker processes to start; they share one SQLite coordinator, so every worker runs on this host
+workers = int(os.getenv("WORKERS", "1"))
+max_in_flight = int(os.getenv("MAX_IN_FLIGHT", "8"))
+# SQLite's WAL needs shared memory, so this file must sit on a local disk, not a network share
+coordinator_path = os.getenv("COORDINATOR_PATH", DEFAULT_COORDINATOR_PATH)
+# SEED=0 skips handing the queued match jobs to the coordinator
+seed = os.getenv("SEED", "1") == "1"
+host = socket.gethostname()
+worker_stores = os.path.join("data", "match_data", "workers")
+
+
+def run_worker(index):
+    """Run one worker process with its share of the API keys and a store of its own"""
+    # Each key has its own rate limit, so workers only share a key when there are fewer keys than workers
+    keys = API_KEYS.keys[index::workers] if len(API_KEYS) >= workers else API_KEYS.keys
+    client = RiotClient(KeyPool(keys), pool_size=max_in_flight)
+    worker_id = f"{host}-{index}"
+    coordinator = Coordinator(coordinator_path)
+    store = MatchStore(os.path.join(worker_stores, worker_id))
+    try:
+        return Worker(client, coordinator, store, worker_id=worker_id, max_in_flight=max_in_flight).run()
+    finally:
+        store.close()
+        coordinator.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    store = MatchStore()
+    coordinator = Coordinator(coordinator_path)
+    queue = JobQueue()
+
+    if seed:
+        # Queued match downloads from the crawl job table go to the coordinator
+        open_ids = [match_id for match_id, state in queue.states(KIND_MATCH, region).items()
+                    if state not in (DONE, DEAD) and match_id not in store]
+        added = coordinator.publish(region, open_ids)
+        print(f"📋 Handed {added} new match downloads to the coordinator ({len(open_ids)} open in the job table)")
+    print(f"📋 Coordinator: {coordinator.counts()} across {coordinator.shards} shards")
+
+    if len(API_KEYS) < workers:
+        print(f"⚠️ {workers} workers share {len(API_KEYS)} API key(s); add keys to scale past the key's rate limit")
+    print(f"🚀 Starting {workers} workers on {host}...")
+    with Pool(workers) as pool:
+        summaries = pool.map(run_worker, range(workers))
+
+    # Pack what the workers downloaded into the main store
+    merged = 0
+    for summary in summaries:
+        worker_store = MatchStore(os.path.join(worker_stores, summary['worker_id']))
+        merged += store.import_store(worker_store)
+        worker_store.close()
+
+    # Close the crawl jobs for matches that are now stored so the crawler doesn't fetch them again
+    stored_ids = [match_id for match_id, state in queue.states(KIND_MATCH, region).items()
+                  if state not in (DONE, DEAD) and match_id in store]
+    queue.complete_many(KIND_MATCH, region, stored_ids)
+
+    print("\n📊 WORKER SUMMARY")
+    print("=" * 70)
+    print(f"{'Worker':<30}{'Saved':<10}{'Failed':<10}{'Skipped':<10}{'Time':<10}")
+    print("-" * 70)
+    for summary in summaries:
+        print(f"{summary['worker_id']:<30}{summary['matches_saved']:<10}{summary['failed']:<10}"
+              f"{summary['skipped']:<10}{summary['seconds']:.0f}s")
+    print("=" * 70)
+    print(f"  - Coordinator: {coordinator.counts()}")
+    print(f"  - Merged {merged} matches into {store.root} ({len(store)} matches stored)")
+    print(f"  - Marked {len(stored_ids)} queued match jobs done")
+
+    queue.close()
+    coordinator.close()
+    store.close()
@@ -0,0 +1,145 @@
+"""
+End-to-end throughput benchmark against the local mock Riot API
+Usage: python benchmark.py [--in-flight 8] [--app-limits 500:10,30000:600] [--json results.json]
+
+Each pipeline stage runs in its own process so its peak RSS is its own.
+Reported per stage: wall time, API requests and requests/sec, matches/min,
+seconds spent throttled by the rate limiter versus working, and peak RSS.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import requests
+
+# Production-key limits, so the benchmark measures the pipeline rather than the dev-key cap
+BENCHMARK_APP_LIMITS = "500:10,30000:600"
+
+
+def serve(conn, players, matches, latency, jitter, app_limits, error_rate):
+    """Run the mock server in this process and send its port back through `conn`"""
+    from src.mock_server import MockRiotAPI, MockRiotServer
+
+    server = MockRiotServer(MockRiotAPI(players, matches), latency=latency, jitter=jitter,
+                            app_limits=app_limits, error_rate=error_rate)
+    conn.send(server.port)
+    server._server.serve_forever()
+
+
+def run_stage(conn, stage, workdir, app_limits, in_flight):
+    """Run one stage in this process and send (counts, throttled seconds, peak RSS KB) back"""
+    from src.api_scraper import RiotClient
+    from src.bulk_parser import bulk_parse
+    from src.crawler import download_queued_matches, resolve_ladder_puuids, sync_match_ids
+    from src.job_queue import JobQueue
+    from src.ladder import LadderSnapshots
+    from src.match_store import MatchStore
+    from src.match_sync import MatchSync
+    from src.rate_limiter import RateLimiter
+
+    db_path = os.path.join(workdir, "crawl.sqlite")
+    limiter = RateLimiter(app_limits)
+    client = RiotClient("benchmark-key", limiter=limiter, pool_size=in_flight)
+    queue = JobQueue(db_path)
+    counts = {}
+    if stage == "ladder":
+        ladder = LadderSnapshots(db_path)
+        counts['players'] = len(resolve_ladder_puuids(client, "na1", queue, ladder))
+        ladder.close()
+    elif stage == "match_ids":
+        sync = MatchSync(db_path)
+        ladder = LadderSnapshots(db_path)
+        puuids = [row[0] for row in ladder.players("na1")]
+        ladder.close()
+        counts['match_ids'] = sync_match_ids(client, "na1", queue, sync, puuids)
+        sync.close()
+    elif stage == "download":
+        store = MatchStore(os.path.join(workdir, "store"))
+        counts['matches'] = download_queued_matches(client, "na1", queue, store, max_in_flight=in_flight)
+        store.close()
+    elif stage == "parse":
+        store = MatchStore(os.path.join(workdir, "store"))
+        counts['matches'] = bulk_parse(store, output_dir=os.path.join(workdir, "parsed"))['matches']
+        store.close()
+    queue.close()
+    client.close()
+    conn.send((counts, limiter.throttled_seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def server_stats(base_url):
+    return requests.get(f"{base_url}/_stats", timeout=5).json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collection pipeline against a mock Riot API")
+    parser.add_argument("--players", type=int, default=1000, help="Players in the mock universe")
+    parser.add_argument("--matches", type=int, default=2000, help="Matches in the mock universe")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Latency standard deviation (s)")
+    parser.add_argument("--app-limits", default=BENCHMARK_APP_LIMITS, help="App rate limits to enforce")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--in-flight", type=int, default=8, help="Concurrent match downloads")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    server = context.Process(target=serve, daemon=True, args=(
+        sender, args.players, args.matches, args.latency, args.jitter, args.app_limits, args.error_rate))
+    server.start()
+    base_url = f"http://127.0.0.1:{receiver.recv()}"
+    # Child processes read this when they import src.api_scraper
+    os.environ["RIOT_API_URL_TEMPLATE"] = base_url + "/{host}"
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in ("ladder", "match_ids", "download", "parse"):
+            concurrency = args.in_flight if stage == "download" else 1
+            before = server_stats(base_url)
+            started = time.perf_counter()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_stage,
+                                      args=(sender, stage, workdir, args.app_limits, args.in_flight))
+            process.start()
+            counts, throttled, peak_rss = receiver.recv()
+            process.join()
+            seconds = time.perf_counter() - started
+            after = server_stats(base_url)
+            api_requests = after['requests'] - before['requests']
+            matches = counts.get('matches', 0)
+            results.append({
+                'stage': stage,
+                'seconds': round(seconds, 2),
+                'requests': api_requests,
+                'rate_limited': after['rate_limited'] - before['rate_limited'],
+                'requests_per_sec': round(api_requests / seconds, 1),
+                'matches_per_min': round(matches / seconds * 60, 1),
+                # Summed over every worker thread, so compare against seconds * concurrency
+                'sleep_seconds': round(throttled, 2),
+                'work_seconds': round(max(0.0, seconds * concurrency - throttled), 2),
+                'peak_rss_mb': round(peak_rss / 1024, 1),
+                **counts,
+            })
+            print(f"⏱️ {stage}: {seconds:.1f}s")
+    server.terminate()
+
+    print(f"\n{'stage':<10} {'secs':>7} {'reqs':>6} {'req/s':>7} {'matches/min':>12} "
+          f"{'sleep s':>8} {'work s':>8} {'429s':>5} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['stage']:<10} {r['seconds']:>7.1f} {r['requests']:>6} {r['requests_per_sec']:>7.1f} "
+              f"{r['matches_per_min']:>12.1f} {r['sleep_seconds']:>8.1f} {r['work_seconds']:>8.1f} "
+              f"{r['rate_limited']:>5} {r['peak_rss_mb']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'settings': vars(args), 'stages': results}, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,136 @@
 """
 League of Legends Match Analyzer
 Main entry point for the application
+
+Usage:
+  python main.py                       interactive: prompts for one summoner
+  python main.py --batch players.txt   refresh many accounts at once
 """
+import argparse
 import os
-from src.api_scraper import fetch_summoner_data, fetch_match_history, save_match_data
+import time
+from dotenv import load_dotenv
+from src.api_scraper import (REGION_ROUTING, RiotClient, fetch_summoner_data, fetch_match_history,
+                             fetch_match_histories, resolve_players, MatchDataWriter)
+from src.key_pool import KeyPool
+from src.player_features import DEFAULT_FEATURES_PATH, PlayerFeatures
+from src.response_cache import ResponseCache
+
+DEFAULT_OUTPUT_FILE = "data/lol_match_data.csv"
+
+def read_players(path, default_region='na1'):
+    """
+    Read the players to refresh from a text file
+    
+    One player per line, as a Riot ID (gameName#tagLine) or a PUUID,
+    optionally prefixed with its region ("euw1,Name#EUW"). Blank lines and
+    lines starting with # are ignored.
+    
+    Args:
+        path (str): Path to the player list
+        default_region (str): Region of players listed without one (default: na1)
+    
+    Returns:
+        list: (region, player) tuples in file order, without repeats
+    """
+    players = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            region, _, player = line.rpartition(",")
+            players.append(((region.strip() or default_region).lower(), player.strip()))
+    return list(dict.fromkeys(players))
+
+def run_batch(players_file, region='na1', count=20, output_file=DEFAULT_OUTPUT_FILE, workers=8):
+    """
+    Append the recent matches of every listed player to the dataset
+    
+    Players are resolved to PUUIDs concurrently, then grouped by routing
+    value so a game shared by several tracked accounts is downloaded once.
+    Rows already in the output file are skipped, using the row index kept
+    beside it, and games every lister already has a row for are not
+    downloaded again. Every player's rolling features are brought up to date.
+    
+    Args:
+        players_file (str): Player list, as read by read_players
+        region (str): Region of players listed without one (default: na1)
+        count (int): Recent matches to list per player (default: 20)
+        output_file (str): CSV file to append rows to (default: data/lol_match_data.csv)
+        workers (int): Requests in flight at once (default: 8)
+    
+    Returns:
+        dict: Summary counts, or None if no API key is configured
+    """
+    load_dotenv()
+    api_keys = KeyPool.from_env()
+    if not api_keys:
+        print("❌ Error: RIOT_API_KEY not found in .env file")
+        return None
+    
+    players = read_players(players_file, region)
+    print(f"📋 {len(players)} players listed in {players_file}")
+    client = RiotClient(api_keys, pool_size=workers, cache=ResponseCache())
+    started = time.time()
+    
+    # Resolve Riot IDs to PUUIDs several lookups at a time
+    resolved = resolve_players(api_keys, players, client=client, max_workers=workers)
+    failed = [player for player, puuid in resolved.items() if not puuid]
+    for player_region, player in failed:
+        print(f"⚠️ Couldn't resolve {player} ({player_region})")
+    print(f"✅ Resolved {len(resolved) - len(failed)} of {len(players)} players in {time.time() - started:.1f}s")
+    
+    # Match IDs are unique across a routing value, so dedupe within each
+    by_routing = {}
+    for (player_region, _), puuid in resolved.items():
+        if puuid:
+            routing = REGION_ROUTING.get(player_region, 'americas')
+            by_routing.setdefault(routing, (player_region, []))[1].append(puuid)
+    
+    features = PlayerFeatures.load()
+    with MatchDataWriter(output_file, append=True, dedupe=True, features=features) as writer:
+        for i, (routing, (routing_region, puuids)) in enumerate(by_routing.items()):
+            group_started = time.time()
+            matches_before = client.metrics.snapshot()['counters'].get('matches_saved', 0)
+            print(f"🔍 [{i + 1}/{len(by_routing)}] {routing}: fetching {count} matches each for {len(puuids)} players...")
+            fetch_match_histories(api_keys, puuids, routing_region, count, client=client, writer=writer,
+                                  max_in_flight=workers)
+            matches = client.metrics.snapshot()['counters'].get('matches_saved', 0) - matches_before
+            print(f"   {matches} unique matches in {time.time() - group_started:.1f}s | "
+                  f"{writer.rows_written} rows written, {writer.rows_skipped} already saved")
+    
+    features.save()
+    seconds = time.time() - started
+    counters = client.metrics.snapshot()['counters']
+    client.close()
+    summary = {
+        'players': len(players),
+        'resolved': len(players) - len(failed),
+        'failed': len(failed),
+        'matches': counters.get('matches_saved', 0),
+        'rows_written': writer.rows_written,
+        'rows_skipped': writer.rows_skipped,
+        'requests': counters.get('requests', 0),
+        'seconds': seconds,
+    }
+    
+    print("\n📊 BATCH SUMMARY")
+    print("=" * 70)
+    print(f"  - Players: {summary['resolved']} resolved, {summary['failed']} failed")
+    print(f"  - Matches: {summary['matches']} unique matches downloaded")
+    print(f"  - Rows: {summary['rows_written']} appended to {output_file}, {summary['rows_skipped']} already there")
+    print(f"  - Features: {len(features)} players in {DEFAULT_FEATURES_PATH}")
+    print(f"  - Time: {seconds:.1f}s | {summary['matches'] / seconds * 60:.0f} matches/min | "
+          f"{summary['requests']} API requests")
+    print("=" * 70)
+    return summary
 
 def main():
     print("League of Legends Match Analyzer")
     
     # Get API key and summoner name
-    api_key = input("Enter your Riot API key: ")
+    api_key = input("Enter your Riot API key (comma-separate several to pool them): ")
     summoner_name = input("Enter summoner name: ")
     region = input("Enter region (e.g., na1, euw1, kr): ") or "na1"
     match_count = int(input("Number of matches to fetch (max 100): ") or "10")
@@ -17,26 +138,40 @@ def main():
     # Create data directory if it doesn't exist
     os.makedirs("data", exist_ok=True)
     
+    # One client keeps its connections open across every request below and
+    # serves summoner lookups and finished matches from the on-disk cache
+    client = RiotClient(KeyPool(key.strip() for key in api_key.split(",")), cache=ResponseCache())
+    
     # Fetch summoner data
     print(f"Fetching data for summoner: {summoner_name}")
-    summoner_data = fetch_summoner_data(api_key, summoner_name, region)
+    summoner_data = fetch_summoner_data(api_key, summoner_name, region, client=client)
     
     if not summoner_data:
         print("Failed to fetch summoner data. Please check your API key and summoner name.")
         return
     
-    # Fetch match history
+    # Fetch match history, writing each match to CSV as it arrives
+    output_file = DEFAULT_OUTPUT_FILE
     print(f"Fetching match history for {summoner_name}...")
-    match_data = fetch_match_history(api_key, summoner_data['puuid'], region, match_count)
+    with MatchDataWriter(output_file, append=False) as writer:
+        fetch_match_history(api_key, summoner_data['puuid'], region, match_count, client=client, writer=writer)
     
-    if not match_data:
+    if not writer.rows_written:
         print("Failed to fetch match data.")
         return
     
-    # Save match data to CSV
-    output_file = "data/lol_match_data.csv"
-    save_match_data(match_data, output_file)
     print(f"Match data saved to {output_file}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch League of Legends match histories")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Refresh every player listed in FILE (Riot IDs or PUUIDs, optionally region,player)")
+    parser.add_argument("--region", default="na1", help="Region of players listed without one")
+    parser.add_argument("--count", type=int, default=20, help="Recent matches to list per player (max 100)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_FILE, help="CSV file to append rows to")
+    parser.add_argument("--workers", type=int, default=8, help="Requests in flight at once")
+    args = parser.parse_args()
+    if args.batch:
+        run_batch(args.batch, args.region, args.count, args.output, args.workers)
+    else:
+        main()
\ No newline at end of file
@@ -1,29 +1,33 @@
-import json
-import pandas as pd
+"""
+Parse every stored match into columnar participant tables, index them, and update the rollups and player features
+Usage: python parse.py [workers] [--core]
+  --core  only extract the columns the index, rollups and notebook use (much faster)
+"""
+import sys
 
-# Load the JSON match file
-with open("match_data/NA1_5263238906.json", "r") as f:
-    match_data = json.load(f)
+from src.bulk_parser import CORE_PROJECTION, DEFAULT_PARSED_PATH, bulk_parse
+from src.match_index import DEFAULT_INDEX_PATH, MatchIndex
+from src.player_features import DEFAULT_FEATURES_PATH, PlayerFeatures
+from src.rollups import DEFAULT_ROLLUP_PATH, ChampionRollups
 
-participants = match_data["info"]["participants"]
-match_id = match_data["metadata"]["matchId"]
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--core"]
+    workers = int(args[0]) if args else None
+    projection = CORE_PROJECTION if "--core" in sys.argv else None
+    summary = bulk_parse(workers=workers, projection=projection)
+    print(f"✅ Parsed {summary['matches']} new matches ({summary['rows']} participant rows) into {DEFAULT_PARSED_PATH}")
 
-rows = []
-for p in participants:
-    rows.append({
-        "match_id": match_id,
-        "summoner_name": p.get("summonerName", "unknown"),
-        "puuid": p["puuid"],
-        "champion": p["championName"],
-        "kills": p["kills"],
-        "deaths": p["deaths"],
-        "assists": p["assists"],
-        "win": p["win"],
-        "role": p["teamPosition"],
-        "team_id": p["teamId"]
-    })
+    index = MatchIndex()
+    added = index.update()
+    print(f"🗂️ Indexed {added} new participant rows into {DEFAULT_INDEX_PATH} ({len(index)} in total)")
+    index.close()
 
-# Convert to DataFrame
-df = pd.DataFrame(rows)
-df.to_csv("parsed_match_data.csv", index=False)
-print("✅ Saved parsed match data to parsed_match_data.csv")
\ No newline at end of file
+    rollups = ChampionRollups.load()
+    added = rollups.update_from_parsed()
+    rollups.save()
+    print(f"📈 Rolled up {added} new participant rows into {DEFAULT_ROLLUP_PATH}")
+
+    features = PlayerFeatures.load()
+    added = features.update_from_parsed()
+    features.save()
+    print(f"🧮 Added {added} new games to the rolling features of {len(features)} players in {DEFAULT_FEATURES_PATH}")
@@ -2,10 +2,21 @@
 API Scraper for Riot Games API
 Fetches summoner data and match history
 """
+import os
+import asyncio
 import requests
 import pandas as pd
-import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+
+from src.async_downloader import download_matches
+from src.key_pool import AUTH_FAILURE_STATUSES, KeyPool
+from src.match_model import ParticipantBatch, ParticipantRecord
+from src.metrics import default_metrics
+from src.rate_limiter import default_limiter, rate_limited_get
+from src.row_index import RowIndex
 
 # Base URLs for different Riot API endpoints
 REGION_ROUTING = {
@@ -27,7 +38,157 @@ REGION_ROUTING = {
     'vn2': 'sea',
 }
 
-def fetch_summoner_data(api_key, summoner_name, region='na1'):
+# account-v1 isn't served from the sea routing host; those accounts live on asia
+ACCOUNT_ROUTING = {'sea': 'asia'}
+
+# Base URL of the API; {host} is the routing value (e.g. na1, americas).
+# Set RIOT_API_URL_TEMPLATE=http://127.0.0.1:8080/{host} to use the local mock server.
+API_URL_TEMPLATE = os.getenv("RIOT_API_URL_TEMPLATE", "https://{host}.api.riotgames.com")
+
+
+class RiotClient:
+    """
+    Reusable HTTP client for the Riot API
+
+    Keeps one keep-alive connection pool per routing host (na1, americas, ...)
+    so repeated calls skip the TCP and TLS handshake, asks for gzip-compressed
+    responses, and paces every request through the rate limiter of the key
+    it is sent with. Given a KeyPool, each request goes to the key with the
+    most budget left, and a request refused with 401/403 is retried once on
+    each other active key.
+    """
+
+    def __init__(self, api_key, limiter=None, pool_size=10, timeout=10, cache=None, metrics=None):
+        """
+        Args:
+            api_key (str or KeyPool): Riot API key, or a pool of keys
+            limiter (RateLimiter): Rate limiter for a single key (default: shared limiter);
+                ignored for a KeyPool, whose keys each have their own
+            pool_size (int): Keep-alive connections kept per host (default: 10)
+            timeout (float): Request timeout in seconds (default: 10)
+            cache (ResponseCache): On-disk cache for slowly-changing endpoints (default: none)
+            metrics (Metrics): Where request metrics are recorded (default: shared metrics)
+        """
+        if isinstance(api_key, KeyPool):
+            self.keys = api_key
+        else:
+            self.keys = KeyPool([api_key], limiters={api_key: limiter or default_limiter})
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache
+        self.metrics = metrics or default_metrics
+        self._sessions = {}
+
+    def session_for(self, host):
+        """
+        Get the pooled session for a routing host, creating it on first use
+
+        Args:
+            host (str): Platform or regional routing value (e.g. na1, americas)
+
+        Returns:
+            requests.Session: Session dedicated to that host
+        """
+        session = self._sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip"})
+            session = self._sessions.setdefault(host, session)
+        return session
+
+    def url(self, host, path):
+        """Build the full URL for an API path on a routing host"""
+        return API_URL_TEMPLATE.format(host=host) + path
+
+    def get(self, host, path, params=None):
+        """
+        GET an API path, waiting for the rate limiter and retrying 429s
+
+        Args:
+            host (str): Platform or regional routing value (e.g. na1, americas)
+            path (str): API path starting with /
+            params (dict): Query string parameters
+
+        Returns:
+            requests.Response: The response received (or served from the cache)
+        """
+        url = self.url(host, path)
+        cacheable = self.cache is not None and self.cache.cacheable(url)
+        cached, headers = None, None
+        if cacheable:
+            cached, fresh = self.cache.lookup(url, params)
+            if fresh:
+                self.metrics.incr('cache_hits')
+                return cached
+            if cached is not None and "ETag" in cached.headers:
+                headers = {"If-None-Match": cached.headers["ETag"]}
+
+        refused = []
+        while True:
+            key, limiter = self.keys.choose(url, exclude=refused)
+            response = rate_limited_get(url, headers={**(headers or {}), "X-Riot-Token": key}, params=params,
+                                        limiter=limiter, session=self.session_for(host),
+                                        timeout=self.timeout, metrics=self.metrics)
+            if self.keys.record(key, response.status_code):
+                self.metrics.incr('keys_disabled')
+            if response.status_code not in AUTH_FAILURE_STATUSES:
+                break
+            refused.append(key)
+            if not set(self.keys.active_keys()) - set(refused):
+                break
+
+        if cached is not None and response.status_code == 304:
+            self.metrics.incr('cache_revalidated')
+            self.cache.refresh(url, params)
+            return cached
+        if cacheable and response.status_code == 200:
+            self.cache.store(url, params, response)
+        return response
+
+    def get_json(self, host, path, params=None):
+        """
+        GET an API path and decode the JSON body
+
+        Raises:
+            requests.exceptions.HTTPError: If the response is not successful
+
+        Returns:
+            dict or list: Decoded response body
+        """
+        response = self.get(host, path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        """Close every pooled connection"""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+
+_clients = {}
+
+
+def get_client(api_key):
+    """
+    Get the shared client for an API key so connection pools are reused
+
+    Args:
+        api_key (str): Riot API key
+
+    Returns:
+        RiotClient: Client shared by every caller using this key
+    """
+    if api_key not in _clients:
+        _clients[api_key] = RiotClient(api_key)
+    return _clients[api_key]
+
+
+def fetch_summoner_data(api_key, summoner_name, region='na1', client=None):
     """
     Fetch basic summoner data using the Riot API
     
@@ -35,19 +196,15 @@ def fetch_summoner_data(api_key, summoner_name, region='na1'):
         api_key (str): Riot API key
         summoner_name (str): Summoner name to look up
         region (str): Region code (default: na1)
+        client (RiotClient): Client to send requests through (default: shared client for api_key)
         
     Returns:
         dict: Summoner data or None if request failed
     """
-    url = f"https://{region}.api.riotgames.com/lol/summoner/v4/summoners/by-name/{summoner_name}"
-    headers = {
-        "X-Riot-Token": api_key
-    }
+    client = client or get_client(api_key)
     
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return client.get_json(region, f"/lol/summoner/v4/summoners/by-name/{summoner_name}")
     except requests.exceptions.RequestException as e:
         print(f"Error fetching summoner data: {e}")
         if hasattr(e, 'response') and e.response:
@@ -55,7 +212,61 @@ def fetch_summoner_data(api_key, summoner_name, region='na1'):
             print(f"Response: {e.response.text}")
         return None
 
-def fetch_match_history(api_key, puuid, region='na1', count=10):
+def fetch_account(api_key, game_name, tag_line, region='na1', client=None):
+    """
+    Fetch a Riot account by Riot ID
+    
+    Args:
+        api_key (str): Riot API key
+        game_name (str): Game name, the part of the Riot ID before the #
+        tag_line (str): Tag line, the part after the #
+        region (str): Region code of the account (default: na1)
+        client (RiotClient): Client to send requests through (default: shared client for api_key)
+        
+    Returns:
+        dict: Account data (puuid, gameName, tagLine) or None if request failed
+    """
+    client = client or get_client(api_key)
+    routing = REGION_ROUTING.get(region, 'americas')
+    routing = ACCOUNT_ROUTING.get(routing, routing)
+    
+    try:
+        return client.get_json(routing, f"/riot/account/v1/accounts/by-riot-id/{quote(game_name)}/{quote(tag_line)}")
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching account {game_name}#{tag_line}: {e}")
+        return None
+
+def resolve_players(api_key, players, client=None, max_workers=8):
+    """
+    Resolve players given as Riot IDs or PUUIDs to PUUIDs, several lookups at a time
+    
+    A player containing a # is a Riot ID (gameName#tagLine) and costs an
+    account lookup; anything else is taken to be a PUUID already.
+    
+    Args:
+        api_key (str): Riot API key
+        players (iterable): (region, player) tuples
+        client (RiotClient): Client to send requests through (default: shared client for api_key)
+        max_workers (int): Lookups in flight at once (default: 8)
+        
+    Returns:
+        dict: (region, player) -> PUUID, or None for players that couldn't be resolved
+    """
+    client = client or get_client(api_key)
+    players = list(dict.fromkeys(players))
+    
+    def resolve(player):
+        region, name = player
+        if "#" not in name:
+            return name
+        game_name, _, tag_line = name.rpartition("#")
+        account = fetch_account(api_key, game_name, tag_line, region, client=client)
+        return account.get('puuid') if account else None
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(players, executor.map(resolve, players)))
+
+def fetch_match_history(api_key, puuid, region='na1', count=10, client=None, writer=None):
     """
     Fetch match history for a summoner
     
@@ -64,52 +275,124 @@ def fetch_match_history(api_key, puuid, region='na1', count=10):
         puuid (str): Player's PUUID from summoner data
         region (str): Region code (default: na1)
         count (int): Number of matches to fetch (default: 10)
+        client (RiotClient): Client to send requests through (default: shared client for api_key)
+        writer (MatchDataWriter): Write rows here as each match arrives instead of keeping them (default: none)
+        
+    Returns:
+        list: List of ParticipantRecords (number of rows written if writer is given)
+    """
+    return fetch_match_histories(api_key, [puuid], region, count, client=client, writer=writer)[puuid]
+
+def fetch_match_histories(api_key, puuids, region='na1', count=10, client=None, writer=None, max_in_flight=1):
+    """
+    Fetch the match histories of several summoners, downloading each match once
+    
+    Match IDs from every player's history are merged, so a game shared by
+    several tracked players is fetched and scanned only once. Every tracked
+    player found in a downloaded match gets a row for it, even if the game
+    was past the end of their own `count` most recent matches.
+    
+    With a writer, rows are streamed to it as each match is processed
+    (in download order) and not held in memory. A match is not downloaded
+    at all if the writer already has a row of it for every player who
+    listed it. With max_in_flight above 1, match ID lists and matches are
+    requested that many at a time.
+    
+    Args:
+        api_key (str): Riot API key
+        puuids (iterable): PUUIDs of the players to track
+        region (str): Region code (default: na1)
+        count (int): Number of matches to list per player (default: 10)
+        client (RiotClient): Client to send requests through (default: shared client for api_key)
+        writer (MatchDataWriter): Write rows here instead of returning them (default: none)
+        max_in_flight (int): Requests in flight at once; the client's pool_size should be at least this (default: 1)
         
     Returns:
-        list: List of match data dictionaries
+        dict: PUUID -> list of ParticipantRecords, newest first
+            (PUUID -> number of rows written if writer is given)
     """
+    client = client or get_client(api_key)
+    puuids = list(dict.fromkeys(puuids))
+    
     # Convert region to routing value
     routing = REGION_ROUTING.get(region, 'americas')
     
-    # Get match IDs
-    match_ids_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-    headers = {
-        "X-Riot-Token": api_key
-    }
+    # Get every player's match IDs, keeping the first occurrence of each
     params = {
         "start": 0,
         "count": count
     }
     
-    try:
-        response = requests.get(match_ids_url, headers=headers, params=params)
-        response.raise_for_status()
-        match_ids = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching match IDs: {e}")
-        return []
-    
-    # Fetch details for each match
-    match_data_list = []
-    for match_id in match_ids:
-        match_url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-        
+    def list_match_ids(puuid):
         try:
-            response = requests.get(match_url, headers=headers)
-            response.raise_for_status()
-            match_data = response.json()
-            
-            # Process match data to extract relevant information
-            processed_data = process_match_data(match_data, puuid)
-            match_data_list.append(processed_data)
-            
-            # Sleep to avoid rate limiting
-            time.sleep(1.2)
+            return client.get_json(routing, f"/lol/match/v5/matches/by-puuid/{puuid}/ids", params=params)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching match data for {match_id}: {e}")
-            continue
+            print(f"Error fetching match IDs: {e}")
+            return []
+    
+    # Match ID -> the players who listed it
+    unique_match_ids = {}
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for puuid, match_ids in zip(puuids, executor.map(list_match_ids, puuids)):
+            for match_id in match_ids:
+                unique_match_ids.setdefault(match_id, []).append(puuid)
     
-    return match_data_list
+    if writer is not None:
+        unique_match_ids = {match_id: listers for match_id, listers in unique_match_ids.items()
+                            if not writer.has_rows(game_id_of(match_id), listers)}
+    
+    # Fetch each match once and pull out a row for every tracked player in it
+    histories = {puuid: [] for puuid in puuids}
+    written = dict.fromkeys(puuids, 0)
+    
+    def add_match(match_data):
+        client.metrics.record_matches()
+        for puuid, processed_data in process_match_data_for_players(match_data, histories).items():
+            if writer is not None:
+                if writer.write(processed_data):
+                    written[puuid] += 1
+            else:
+                histories[puuid].append(processed_data)
+    
+    if max_in_flight > 1:
+        def on_result(match_id, response, error):
+            # Runs on the event loop thread, so rows are added one match at a time
+            if error is None and not response.ok:
+                error = f"{response.status_code} {response.reason}"
+            if error is not None:
+                print(f"Error fetching match data for {match_id}: {error}")
+                return
+            add_match(response.json())
+        
+        asyncio.run(download_matches(client, routing, unique_match_ids, on_result, max_in_flight))
+    else:
+        for match_id in unique_match_ids:
+            try:
+                match_data = client.get_json(routing, f"/lol/match/v5/matches/{match_id}")
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching match data for {match_id}: {e}")
+                continue
+            add_match(match_data)
+    
+    if writer is not None:
+        writer.flush()
+        return written
+    for rows in histories.values():
+        rows.sort(key=lambda row: row.match_date, reverse=True)
+    return histories
+
+def game_id_of(match_id):
+    """
+    Get the game ID in a match ID
+    
+    Args:
+        match_id (str): Match ID, e.g. NA1_5000000000
+        
+    Returns:
+        int: The numeric game ID (the gameId of the match), or 0 if the ID has none
+    """
+    _, _, game_id = match_id.rpartition('_')
+    return int(game_id) if game_id.isdigit() else 0
 
 def process_match_data(match_data, puuid):
     """
@@ -120,69 +403,178 @@ def process_match_data(match_data, puuid):
         puuid (str): Player's PUUID to identify the player in the match
         
     Returns:
-        dict: Processed match data with relevant fields
+        ParticipantRecord: Processed match data with relevant fields
     """
-    # Extract basic match info
+    # Combine match info with player data (match info only if the player isn't in the match)
     match_info = match_data.get('info', {})
-    game_id = match_info.get('gameId', 0)
-    game_duration = match_info.get('gameDuration', 0)
-    game_mode = match_info.get('gameMode', '')
-    game_type = match_info.get('gameType', '')
+    rows = process_match_data_for_players(match_data, {puuid})
+    return rows.get(puuid) or ParticipantRecord.from_api(match_info)
+
+def process_match_data_for_players(match_data, puuids):
+    """
+    Extract rows for every tracked player in a match in one pass over its participants
     
-    # Find the player in the participants list
-    player_data = {}
+    Args:
+        match_data (dict): Raw match data from Riot API
+        puuids (set or dict): PUUIDs of the tracked players
+        
+    Returns:
+        dict: PUUID -> ParticipantRecord, for the tracked players who played in the match
+    """
+    match_info = match_data.get('info', {})
+    rows = {}
     for participant in match_info.get('participants', []):
-        if participant.get('puuid') == puuid:
-            player_data = {
-                'champion': participant.get('championName', ''),
-                'kills': participant.get('kills', 0),
-                'deaths': participant.get('deaths', 0),
-                'assists': participant.get('assists', 0),
-                'win': participant.get('win', False),
-                'position': participant.get('individualPosition', ''),
-                'gold_earned': participant.get('goldEarned', 0),
-                'damage_dealt': participant.get('totalDamageDealtToChampions', 0),
-                'vision_score': participant.get('visionScore', 0),
-                'cs': participant.get('totalMinionsKilled', 0) + participant.get('neutralMinionsKilled', 0),
-            }
-            break
-    
-    # Combine match info with player data
-    return {
-        'game_id': game_id,
-        'game_duration': game_duration,
-        'game_mode': game_mode,
-        'game_type': game_type,
-        'match_date': match_info.get('gameCreation', 0),
-        **player_data
-    }
+        puuid = participant.get('puuid')
+        if puuid in puuids and puuid not in rows:
+            rows[puuid] = ParticipantRecord.from_api(match_info, participant)
+    return rows
+
+# Rows buffered by MatchDataWriter before each append to the CSV
+WRITE_CHUNK_SIZE = 500
 
-def save_match_data(match_data_list, output_file):
+class MatchDataWriter:
     """
-    Save match data to a CSV file
+    Streams processed match rows to a CSV file in fixed-size chunks
     
-    Args:
-        match_data_list (list): List of processed match data dictionaries
-        output_file (str): Path to output CSV file
+    Records are buffered in a ParticipantBatch until `chunk_size` have
+    arrived, then the derived columns are computed for the whole chunk at
+    once and it is appended to the file, so memory stays flat however many
+    rows are written and a crash only loses the current chunk. Appending to an existing file
+    keeps its column order and never rewrites what is already there.
+    
+    With `dedupe`, rows whose (game_id, puuid) is already in the file or
+    was written earlier are skipped, so refreshing the same accounts again
+    only adds their new games. The keys live in a RowIndex beside the file
+    rather than in memory; only the current chunk's keys are held. Files
+    without a puuid column are keyed on game_id alone.
+    
+    With `features`, every row passed in also goes to that PlayerFeatures
+    store, which keeps its own record of the games it has seen.
     """
-    if not match_data_list:
-        print("No match data to save")
-        return
     
-    # Convert to DataFrame
-    df = pd.DataFrame(match_data_list)
+    def __init__(self, output_file, chunk_size=WRITE_CHUNK_SIZE, append=True, dedupe=False, features=None):
+        """
+        Args:
+            output_file (str): Path to output CSV file
+            chunk_size (int): Rows to buffer before each write (default: 500)
+            append (bool): Add to an existing file instead of replacing it (default: True)
+            dedupe (bool): Skip rows already in the file or written before (default: False)
+            features (PlayerFeatures): Also add every row to these rolling player features (default: none)
+        """
+        self.output_file = output_file
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.features = features
+        self._buffer = ParticipantBatch(capacity=chunk_size)
+        self._columns = None
+        self._key_fields = ('game_id', 'puuid')
+        self._index = None
+        self._pending = set()
+        if append and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            self._columns = list(pd.read_csv(output_file, nrows=0).columns)
+            self._key_fields = tuple(field for field in self._key_fields if field in self._columns)
+        # Without a game_id column there is nothing to recognise earlier rows by
+        if dedupe and 'game_id' in self._key_fields:
+            self._index = RowIndex(output_file, self._key_fields, clear=not append)
+    
+    def _key(self, game_id, puuid):
+        return (game_id, puuid if 'puuid' in self._key_fields else '')
+    
+    def has_rows(self, game_id, puuids):
+        """
+        Whether the file already has a row of this game for every one of these players
+        
+        Always False without `dedupe`, since nothing is recorded then.
+        """
+        if self._index is None:
+            return False
+        return all(self._key(game_id, puuid) in self._pending or self._key(game_id, puuid) in self._index
+                   for puuid in puuids)
+    
+    def write(self, row):
+        """
+        Add one ParticipantRecord, writing out the chunk once it is full
+        
+        Returns:
+            bool: True if the row was added, False if `dedupe` skipped it as already saved
+        """
+        if self.features is not None:
+            self.features.update(row)
+        if self._index is not None:
+            key = self._key(row.game_id, row.puuid)
+            if key in self._pending or key in self._index:
+                self.rows_skipped += 1
+                return False
+            self._pending.add(key)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+        return True
+    
+    def write_many(self, rows):
+        """Add several ParticipantRecords"""
+        for row in rows:
+            self.write(row)
     
-    # Convert match date from milliseconds to datetime
-    df['match_date'] = pd.to_datetime(df['match_date'], unit='ms')
+    def flush(self):
+        """Append the buffered rows to the file"""
+        if not len(self._buffer):
+            return
+        df = self._buffer.to_dataframe()
+        
+        # Convert match date from milliseconds to datetime
+        df['match_date'] = pd.to_datetime(df['match_date'], unit='ms')
+        
+        # Convert game duration from seconds to minutes
+        df['game_duration_minutes'] = df['game_duration'] / 60
+        
+        # Calculate KDA
+        df['kda'] = (df['kills'] + df['assists']) / df['deaths'].replace(0, 1)
+        
+        # Calculate CS per minute
+        df['cs_per_min'] = df['cs'] / df['game_duration_minutes']
+        
+        # The first chunk of a new file fixes the column order; later chunks follow it
+        header = self._columns is None
+        if header:
+            self._columns = list(df.columns)
+            os.makedirs(os.path.dirname(self.output_file) or ".", exist_ok=True)
+        df.reindex(columns=self._columns).to_csv(self.output_file, mode='w' if header else 'a',
+                                                  header=header, index=False)
+        if self._index is not None:
+            self._index.add(df)
+            self._pending.clear()
+        self.rows_written += len(df)
+        self._buffer.clear()
     
-    # Convert game duration from seconds to minutes
-    df['game_duration_minutes'] = df['game_duration'] / 60
+    def close(self):
+        """Write out any rows still buffered"""
+        self.flush()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
     
-    # Calculate KDA
-    df['kda'] = (df['kills'] + df['assists']) / df['deaths'].replace(0, 1)
+    def __enter__(self):
+        return self
     
-    # Calculate CS per minute
-    df['cs_per_min'] = df['cs'] / df['game_duration_minutes']
+    def __exit__(self, *exc_info):
+        self.close()
+
+def save_match_data(match_data_list, output_file, append=False):
+    """
+    Save match data to a CSV file
     
-    # Save to CSV
-    df.to_csv(output_file, index=False)
\ No newline at end of file
+    Args:
+        match_data_list (iterable): ParticipantRecords (a generator is streamed chunk by chunk)
+        output_file (str): Path to output CSV file
+        append (bool): Add to an existing file instead of replacing it (default: False)
+        
+    Returns:
+        int: Number of rows written
+    """
+    with MatchDataWriter(output_file, append=append) as writer:
+        writer.write_many(match_data_list)
+    if not writer.rows_written:
+        print("No match data to save")
+    return writer.rows_written
\ No newline at end of file
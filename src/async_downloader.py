@@ -0,0 +1,53 @@
+"""
+Concurrent match downloader
+Keeps a fixed number of match requests in flight over keep-alive connections
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+MATCH_PATH = "/lol/match/v5/matches/{match_id}"
+TIMELINE_PATH = "/lol/match/v5/matches/{match_id}/timeline"
+
+
+async def download_matches(client, routing, match_ids, on_result, max_in_flight=8, path=MATCH_PATH):
+    """
+    Download matches concurrently, calling `on_result` as each one finishes
+
+    Requests run on a thread pool through the client's pooled sessions, so
+    the rate limiter still paces every call. `on_result` always runs on the
+    event loop thread, so it can write files without extra locking.
+
+    Args:
+        client (RiotClient): Client to send requests through; its pool_size
+            should be at least max_in_flight
+        routing (str): Regional routing value (e.g. americas)
+        match_ids (iterable): Match IDs to download
+        on_result (callable): Called as on_result(match_id, response, error)
+        max_in_flight (int): Maximum number of requests in flight (default: 8)
+        path (str): API path to fetch per match (default: MATCH_PATH; TIMELINE_PATH for timelines)
+
+    Returns:
+        int: Number of matches attempted
+    """
+    loop = asyncio.get_running_loop()
+    pending = iter(match_ids)
+    attempted = 0
+
+    async def worker(executor):
+        # Workers share one iterator, so each match ID is taken exactly once
+        nonlocal attempted
+        for match_id in pending:
+            attempted += 1
+            call = functools.partial(client.get, routing, path.format(match_id=match_id))
+            try:
+                response = await loop.run_in_executor(executor, call)
+            except Exception as e:
+                on_result(match_id, None, e)
+            else:
+                on_result(match_id, response, None)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        await asyncio.gather(*(worker(executor) for _ in range(max_in_flight)))
+    return attempted
@@ -0,0 +1,214 @@
+"""
+Bulk match parser
+Turns stored match documents into columnar participant tables
+"""
+import glob
+import json
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.extract import Projection
+from src.match_model import compact_frame, patch_from_version
+from src.match_store import MatchStore
+
+DEFAULT_PARSED_PATH = "data/parsed"
+
+# Match-level fields copied onto every participant row
+MATCH_FIELDS = {
+    'gameId': 'game_id',
+    'gameCreation': 'game_creation',
+    'gameDuration': 'game_duration',
+    'gameVersion': 'game_version',
+    'gameMode': 'game_mode',
+    'gameType': 'game_type',
+    'queueId': 'queue_id',
+    'mapId': 'map_id',
+    'platformId': 'platform_id',
+}
+
+# Only the columns the match index, rollups and notebook read; parses several
+# times faster than flattening every field (see parse_batch)
+CORE_PROJECTION = Projection(
+    "match_id=metadata.matchId",
+    *(f"{column}=info.{key}" for key, column in MATCH_FIELDS.items()),
+    "info.participants[*].{puuid,championId,championName,teamId,teamPosition,individualPosition,win,"
+    "kills,deaths,assists,goldEarned,totalDamageDealtToChampions,visionScore,"
+    "totalMinionsKilled,neutralMinionsKilled,champLevel,timePlayed}",
+)
+
+
+def participant_rows(match_data):
+    """
+    Flatten a match document into one row per participant
+
+    Every scalar participant field is kept under its API name, and the
+    scalar entries of `challenges` are kept as challenges_<name>. Nested
+    structures such as perks are dropped.
+
+    Args:
+        match_data (dict): Raw match document from match-v5
+
+    Returns:
+        list: List of row dictionaries
+    """
+    info = match_data.get('info', {})
+    match_fields = {'match_id': match_data.get('metadata', {}).get('matchId', '')}
+    for key, column in MATCH_FIELDS.items():
+        match_fields[column] = info.get(key)
+    match_fields['patch'] = patch_from_version(info.get('gameVersion'))
+
+    rows = []
+    for participant in info.get('participants', []):
+        row = dict(match_fields)
+        for key, value in participant.items():
+            if key == 'challenges' and isinstance(value, dict):
+                for name, stat in value.items():
+                    if not isinstance(stat, (dict, list)):
+                        row[f'challenges_{name}'] = stat
+            elif not isinstance(value, (dict, list)):
+                row[key] = value
+        rows.append(row)
+    return rows
+
+
+def parse_batch(raw_documents, projection=None):
+    """
+    Parse a batch of raw match documents (runs in a worker process)
+
+    Args:
+        raw_documents (list): List of (match_id, JSON bytes) tuples
+        projection (Projection): Only extract these columns; must include
+            match_id, queue_id and game_version (default: every scalar field)
+
+    Returns:
+        tuple: (match IDs in the batch, DataFrame with one row per participant, in compact dtypes)
+    """
+    match_ids = [match_id for match_id, _ in raw_documents]
+    if projection is not None:
+        df = pd.DataFrame(projection.extract_many(raw_documents))
+        df['patch'] = df['game_version'].map(patch_from_version)
+        return match_ids, compact_frame(df)
+    rows = []
+    for _, raw in raw_documents:
+        rows.extend(participant_rows(json.loads(raw)))
+    return match_ids, compact_frame(pd.DataFrame(rows))
+
+
+def _open_manifest(output_dir):
+    manifest = sqlite3.connect(os.path.join(output_dir, "_manifest.sqlite"))
+    manifest.execute("CREATE TABLE IF NOT EXISTS parsed (match_id TEXT PRIMARY KEY, file TEXT) WITHOUT ROWID")
+    return manifest
+
+
+def _write_partitions(match_ids, df, output_dir, manifest):
+    """Write a parsed batch as one parquet file per (patch, queue) and record it"""
+    files = {}
+    if not df.empty:
+        for (patch, queue_id), part in df.groupby(['patch', 'queue_id'], dropna=False, observed=True):
+            queue_label = 'unknown' if pd.isna(queue_id) else int(queue_id)
+            folder = os.path.join(output_dir, f"patch={patch}", f"queue={queue_label}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"part-{uuid.uuid4().hex[:12]}.parquet")
+            part.dropna(axis=1, how='all').to_parquet(path, index=False)
+            files.update((match_id, path) for match_id in part['match_id'].unique())
+    # Matches without participants are recorded too, so they are not re-parsed
+    with manifest:
+        manifest.executemany(
+            "INSERT OR REPLACE INTO parsed (match_id, file) VALUES (?, ?)",
+            [(match_id, files.get(match_id)) for match_id in match_ids],
+        )
+    return len(df)
+
+
+def bulk_parse(store=None, output_dir=DEFAULT_PARSED_PATH, workers=None, batch_size=500, projection=None):
+    """
+    Parse every stored match that has not been parsed yet
+
+    Batches of raw documents are spread across a process pool; each parsed
+    batch is written as parquet files partitioned by patch and queue.
+
+    Args:
+        store (MatchStore): Store to read from (default: the default store)
+        output_dir (str): Folder for the participant tables (default: data/parsed)
+        workers (int): Worker processes (default: one per CPU)
+        batch_size (int): Matches per batch (default: 500)
+        projection (Projection): Only extract these columns, e.g. CORE_PROJECTION (default: every scalar field)
+
+    Returns:
+        dict: Counts of matches and participant rows parsed
+    """
+    # An empty store is falsy (MatchStore has __len__), so test for None
+    own_store = store is None
+    if own_store:
+        store = MatchStore()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _open_manifest(output_dir)
+    already_parsed = {row[0] for row in manifest.execute("SELECT match_id FROM parsed")}
+
+    def batches():
+        batch = []
+        for match_id, raw in store.scan_raw():
+            if match_id in already_parsed:
+                continue
+            batch.append((match_id, raw))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    matches = rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a couple of batches per worker queued so memory stays bounded
+        max_pending = (workers or os.cpu_count() or 1) * 2
+        pending = []
+        for batch in batches():
+            matches += len(batch)
+            pending.append(executor.submit(parse_batch, batch, projection))
+            if len(pending) >= max_pending:
+                rows += _write_partitions(*pending.pop(0).result(), output_dir, manifest)
+        for future in pending:
+            rows += _write_partitions(*future.result(), output_dir, manifest)
+
+    manifest.close()
+    if own_store:
+        store.close()
+    return {'matches': matches, 'rows': rows}
+
+
+def load_participants(columns=None, patch=None, queue_id=None, parsed_dir=DEFAULT_PARSED_PATH):
+    """
+    Load parsed participant rows, reading only the requested columns
+
+    Args:
+        columns (list): Columns to load (default: all)
+        patch (str): Only load this patch (e.g. "14.1")
+        queue_id (int): Only load this queue (e.g. 420)
+        parsed_dir (str): Folder written by bulk_parse
+
+    Returns:
+        pd.DataFrame: Participant rows
+    """
+    pattern = os.path.join(
+        parsed_dir,
+        f"patch={patch}" if patch else "patch=*",
+        f"queue={queue_id}" if queue_id is not None else "queue=*",
+        "*.parquet",
+    )
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        if columns is None:
+            frames.append(pd.read_parquet(path))
+            continue
+        # Files only hold columns that had values, so ask for the ones present
+        available = set(pq.read_schema(path).names)
+        wanted = [c for c in columns if c in available]
+        frames.append(pd.read_parquet(path, columns=wanted).reindex(columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,397 @@
+"""
+Sharded crawl coordinator
+Hands match downloads to worker processes by a hash of the match ID, with heartbeats and lease expiry
+"""
+import asyncio
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+
+from src.api_scraper import REGION_ROUTING
+from src.async_downloader import download_matches
+from src.crawler import PERMANENT_STATUSES
+from src.job_queue import DEAD, DONE, FAILED, IN_PROGRESS, PENDING
+
+DEFAULT_COORDINATOR_PATH = "data/coordinator.sqlite"
+
+# Match IDs are split into this many shards; workers hold whole shards
+DEFAULT_SHARDS = 64
+
+# Seconds without a heartbeat after which a worker counts as gone and its shards and work are reassigned
+DEFAULT_LEASE_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    match_id TEXT PRIMARY KEY,
+    region TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_retry_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS work_ready ON work (shard, state, next_retry_at);
+CREATE INDEX IF NOT EXISTS work_worker ON work (state, worker_id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    worker_id TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def shard_of(match_id, shards=DEFAULT_SHARDS):
+    """
+    Get the shard a match ID belongs to
+
+    Uses CRC32 rather than hash(), which differs between processes.
+
+    Args:
+        match_id (str): Match ID (e.g. NA1_5263238906)
+        shards (int): Number of shards
+
+    Returns:
+        int: Shard number in [0, shards)
+    """
+    return zlib.crc32(match_id.encode()) % shards
+
+
+class Coordinator:
+    """
+    Shared table of match downloads partitioned into shards
+
+    Every match ID falls in one shard by hash, and every shard is leased
+    to at most one live worker, so two workers never claim the same match.
+    Workers heartbeat to keep their leases; each one takes an even share of
+    the shards, so a new worker gets shards released by the others and a
+    worker that stops heartbeating has its shards and in-progress matches
+    handed on. This is a local stand-in for a coordination service: an
+    SQLite file in WAL mode that the worker processes on one host open.
+    WAL relies on shared memory, so the file must not sit on a network
+    share; spreading workers over several hosts needs a real service.
+    """
+
+    def __init__(self, path=DEFAULT_COORDINATOR_PATH, shards=DEFAULT_SHARDS, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=5, base_backoff=30):
+        """
+        Args:
+            path (str): SQLite database file (default: data/coordinator.sqlite)
+            shards (int): Shards to create if the database is new (default: 64)
+            lease_seconds (float): Heartbeat timeout (default: 60)
+            max_attempts (int): Attempts before a match is marked dead (default: 5)
+            base_backoff (float): Seconds to wait after the first failure; doubles with every further failure
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            existing = self._conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+            if not existing:
+                self._conn.executemany("INSERT INTO shards (shard) VALUES (?)", [(s,) for s in range(shards)])
+            self._conn.execute("COMMIT")
+        # An existing database keeps the shard count it was created with
+        self.shards = existing or shards
+
+    def publish(self, region, match_ids):
+        """
+        Add match downloads, ignoring ones already known
+
+        Args:
+            region (str): Platform region the matches belong to (e.g. na1)
+            match_ids (iterable): Match IDs
+
+        Returns:
+            int: Number of new matches added
+        """
+        now = time.time()
+        rows = [(match_id, region, shard_of(match_id, self.shards), now) for match_id in match_ids]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO work (match_id, region, shard, updated_at) VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def heartbeat(self, worker_id, host=None, pid=None):
+        """Record that a worker is alive and extend the leases on its shards"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (worker_id, host, pid, now, now),
+            )
+            self._conn.execute(
+                "UPDATE shards SET lease_until = ? WHERE worker_id = ? AND lease_until > ?",
+                (now + self.lease_seconds, worker_id, now),
+            )
+            self._conn.execute("COMMIT")
+
+    def join(self, worker_id, host=None, pid=None):
+        """
+        Register a worker that is starting up
+
+        A worker restarted under the same ID heartbeats again straight away,
+        so matches its previous run left in progress would never count as
+        abandoned; they go back to pending here instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)",
+                (worker_id, host, pid, now, now),
+            )
+            self._conn.execute(
+                "UPDATE work SET state = ?, worker_id = NULL, updated_at = ? WHERE state = ? AND worker_id = ?",
+                (PENDING, now, IN_PROGRESS, worker_id),
+            )
+            self._conn.execute("COMMIT")
+
+    def rebalance(self, worker_id):
+        """
+        Bring a worker's shards to its even share of the live workers
+
+        Also returns in-progress matches of workers that stopped
+        heartbeating to pending, so their shards' new owners pick them up.
+
+        Returns:
+            list: Shards the worker holds afterwards
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            live = self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at > ?", (now - self.lease_seconds,)).fetchone()[0]
+            self._conn.execute(
+                "UPDATE work SET state = ?, worker_id = NULL, updated_at = ? WHERE state = ? AND worker_id IN "
+                "(SELECT worker_id FROM workers WHERE heartbeat_at <= ?)",
+                (PENDING, now, IN_PROGRESS, now - self.lease_seconds),
+            )
+            share = math.ceil(self.shards / max(live, 1))
+            owned = [row[0] for row in self._conn.execute(
+                "SELECT shard FROM shards WHERE worker_id = ? AND lease_until > ? ORDER BY shard", (worker_id, now))]
+            if len(owned) > share:
+                self._conn.executemany(
+                    "UPDATE shards SET worker_id = NULL, lease_until = 0 WHERE shard = ?",
+                    [(shard,) for shard in owned[share:]],
+                )
+                owned = owned[:share]
+            elif len(owned) < share:
+                free = [row[0] for row in self._conn.execute(
+                    "SELECT shard FROM shards WHERE worker_id IS NULL OR lease_until <= ? ORDER BY shard LIMIT ?",
+                    (now, share - len(owned)),
+                )]
+                self._conn.executemany(
+                    "UPDATE shards SET worker_id = ?, lease_until = ? WHERE shard = ?",
+                    [(worker_id, now + self.lease_seconds, shard) for shard in free],
+                )
+                owned += free
+            self._conn.execute("COMMIT")
+        return owned
+
+    def claim(self, worker_id, limit=100):
+        """
+        Take up to `limit` ready matches from the worker's shards and mark them in progress
+
+        Returns:
+            list: (match_id, region) tuples
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT w.match_id, w.region FROM shards s JOIN work w ON w.shard = s.shard "
+                "WHERE s.worker_id = ? AND s.lease_until > ? AND w.state IN (?, ?) AND w.next_retry_at <= ? "
+                "LIMIT ?",
+                (worker_id, now, PENDING, FAILED, now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE work SET state = ?, worker_id = ?, updated_at = ? WHERE match_id = ?",
+                [(IN_PROGRESS, worker_id, now, match_id) for match_id, _ in rows],
+            )
+            self._conn.execute("COMMIT")
+        return rows
+
+    def complete(self, match_id):
+        """Mark a match downloaded"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE work SET state = ?, last_error = NULL, updated_at = ? WHERE match_id = ?",
+                (DONE, time.time(), match_id),
+            )
+
+    def fail(self, match_id, error, retry=True):
+        """
+        Record a failed download and schedule the next attempt with exponential backoff
+
+        Returns:
+            str: The match's new state (FAILED or DEAD)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM work WHERE match_id = ?", (match_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            state = FAILED if retry and attempts < self.max_attempts else DEAD
+            self._conn.execute(
+                "UPDATE work SET state = ?, worker_id = NULL, attempts = ?, next_retry_at = ?, last_error = ?, "
+                "updated_at = ? WHERE match_id = ?",
+                (state, attempts, now + self.base_backoff * 2 ** (attempts - 1), str(error), now, match_id),
+            )
+        return state
+
+    def has_open(self):
+        """True while any match is pending, failed or in progress"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM work WHERE state IN (?, ?, ?) LIMIT 1", (PENDING, FAILED, IN_PROGRESS)
+            ).fetchone() is not None
+
+    def counts(self):
+        """Get the number of matches in each state"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM work GROUP BY state").fetchall())
+
+    def workers(self):
+        """
+        Get the workers that are currently heartbeating
+
+        Returns:
+            list: (worker_id, host, pid, heartbeat_at, shards held) tuples
+        """
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT w.worker_id, w.host, w.pid, w.heartbeat_at, "
+                "(SELECT COUNT(*) FROM shards s WHERE s.worker_id = w.worker_id AND s.lease_until > ?) "
+                "FROM workers w WHERE w.heartbeat_at > ? ORDER BY w.worker_id",
+                (now, now - self.lease_seconds),
+            ).fetchall()
+
+    def leave(self, worker_id):
+        """Release a worker's shards and unfinished matches so others take them over at once"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("UPDATE shards SET worker_id = NULL, lease_until = 0 WHERE worker_id = ?", (worker_id,))
+            self._conn.execute(
+                "UPDATE work SET state = ?, worker_id = NULL WHERE state = ? AND worker_id = ?",
+                (PENDING, IN_PROGRESS, worker_id),
+            )
+            self._conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+
+class Worker:
+    """
+    Downloads matches from the shards a Coordinator leases to it
+
+    A background thread heartbeats every third of the lease, so a long
+    batch never loses its shards. Between batches the worker rebalances,
+    then claims the next batch from its shards; it stops once no match is
+    left open anywhere, waiting while others still have work in progress
+    that could come back to it.
+    """
+
+    def __init__(self, client, coordinator, store, worker_id=None, max_in_flight=8, batch_size=None,
+                 idle_seconds=2.0):
+        """
+        Args:
+            client (RiotClient): Client to send requests through (ideally with its own API key)
+            coordinator (Coordinator): Shared work table
+            store (MatchStore): Store this worker writes matches to (one writer per store)
+            worker_id (str): Unique worker name (default: <host>-<pid>)
+            max_in_flight (int): Concurrent downloads (default: 8)
+            batch_size (int): Matches claimed at a time (default: 25 per request in flight)
+            idle_seconds (float): Wait between claims when none of the worker's shards has ready work
+        """
+        self.client = client
+        self.coordinator = coordinator
+        self.store = store
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f"{self.host}-{os.getpid()}"
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size or max_in_flight * 25
+        self.idle_seconds = idle_seconds
+        self.counts = {'matches_saved': 0, 'failed': 0, 'skipped': 0}
+        self._stopped = threading.Event()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.coordinator.lease_seconds / 3):
+            self.coordinator.heartbeat(self.worker_id, self.host, os.getpid())
+
+    def _on_result(self, match_id, response, error):
+        if error is not None:
+            self.coordinator.fail(match_id, error)
+            self.counts['failed'] += 1
+        elif response.status_code == 200:
+            self.store.put(match_id, response.json())
+            self.coordinator.complete(match_id)
+            self.client.metrics.record_matches()
+            self.counts['matches_saved'] += 1
+        else:
+            self.coordinator.fail(match_id, f"Status {response.status_code}",
+                                  retry=response.status_code not in PERMANENT_STATUSES)
+            self.counts['failed'] += 1
+
+    def run(self):
+        """
+        Work until no match is left open
+
+        Returns:
+            dict: Counts of matches saved, failed and skipped (already stored), and seconds taken
+        """
+        started = time.time()
+        self.coordinator.join(self.worker_id, self.host, os.getpid())
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        try:
+            while True:
+                shards = self.coordinator.rebalance(self.worker_id)
+                self.client.metrics.set_gauge(f"worker.{self.worker_id}.shards", len(shards))
+                claimed = self.coordinator.claim(self.worker_id, limit=self.batch_size)
+                if not claimed:
+                    if not self.coordinator.has_open():
+                        break
+                    time.sleep(self.idle_seconds)
+                    continue
+
+                by_routing = {}
+                for match_id, region in claimed:
+                    if match_id in self.store:
+                        self.coordinator.complete(match_id)
+                        self.counts['skipped'] += 1
+                        continue
+                    by_routing.setdefault(REGION_ROUTING.get(region, 'americas'), []).append(match_id)
+                for routing, match_ids in by_routing.items():
+                    asyncio.run(download_matches(self.client, routing, match_ids, self._on_result,
+                                                 max_in_flight=self.max_in_flight))
+        finally:
+            self._stopped.set()
+            heartbeat.join()
+            self.coordinator.leave(self.worker_id)
+        return dict(self.counts, worker_id=self.worker_id, seconds=time.time() - started)
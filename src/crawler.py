@@ -0,0 +1,227 @@
+"""
+Region crawler
+Runs the ladder -> PUUID -> match IDs -> match download stages for many platform regions at once
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.api_scraper import REGION_ROUTING, RiotClient
+from src.async_downloader import TIMELINE_PATH, download_matches
+from src.job_queue import JobQueue, KIND_MATCH, KIND_MATCH_IDS, KIND_TIMELINE
+from src.ladder import LADDER_QUEUES, LadderSnapshots
+from src.match_store import MatchStore
+from src.match_sync import MatchSync
+
+LADDER_QUEUE = LADDER_QUEUES[0]
+
+# Errors that retrying won't fix
+PERMANENT_STATUSES = (400, 404)
+
+
+def resolve_ladder_puuids(client, region, queue, ladder=None):
+    """
+    Get the PUUIDs of a region's apex solo queue ladder
+
+    Takes a ladder snapshot, which reads the challenger, grandmaster and
+    master lists and only looks up summoners whose entry has no PUUID and
+    who aren't known from an earlier snapshot or the job table.
+
+    Args:
+        client (RiotClient): Client to send requests through
+        region (str): Platform region (e.g. na1)
+        queue (JobQueue): Crawl job table, shared with the ladder for PUUID lookups
+        ladder (LadderSnapshots): Ladder history to record the snapshot in (default: the crawl database's)
+
+    Returns:
+        list: PUUIDs in ladder order
+    """
+    own_ladder = ladder is None
+    if own_ladder:
+        ladder = LadderSnapshots()
+    try:
+        ladder.take_snapshot(client, region, LADDER_QUEUE, jobs=queue)
+        return [row[0] for row in ladder.players(region, LADDER_QUEUE)]
+    finally:
+        if own_ladder:
+            ladder.close()
+
+
+def sync_match_ids(client, region, queue, sync, puuids, backfill_pages=0):
+    """
+    List new match IDs for each player and queue them for download
+
+    Args:
+        client (RiotClient): Client to send requests through
+        region (str): Platform region (e.g. na1)
+        queue (JobQueue): Crawl job table
+        sync (MatchSync): Per-player high-water marks
+        puuids (list): Players to sync
+        backfill_pages (int): Pages of older history to read per player (default: 0)
+
+    Returns:
+        int: Number of new match IDs found
+    """
+    resuming = queue.has_open(KIND_MATCH_IDS, region)
+    queue.enqueue_many(KIND_MATCH_IDS, region, puuids, reset=not resuming)
+
+    new_matches = 0
+    for jobs in queue.drain(KIND_MATCH_IDS, region):
+        for puuid, _ in jobs:
+            try:
+                match_ids = sync.sync_player(client, region, puuid, backfill_pages=backfill_pages)
+                queue.complete(KIND_MATCH_IDS, region, puuid, result=match_ids)
+                queue.enqueue_many(KIND_MATCH, region, match_ids)
+                new_matches += len(match_ids)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                queue.fail(KIND_MATCH_IDS, region, puuid, f"Status {status}", retry=status not in PERMANENT_STATUSES)
+            except requests.exceptions.RequestException as e:
+                queue.fail(KIND_MATCH_IDS, region, puuid, str(e))
+    return new_matches
+
+
+def download_queued_matches(client, region, queue, store, max_in_flight=8):
+    """
+    Download every queued match for a region into the shared store
+
+    Args:
+        client (RiotClient): Client to send requests through
+        region (str): Platform region (e.g. na1)
+        queue (JobQueue): Crawl job table
+        store (MatchStore): Store the match documents are written to
+        max_in_flight (int): Concurrent requests for this region (default: 8)
+
+    Returns:
+        int: Number of matches saved
+    """
+    routing = REGION_ROUTING.get(region, 'americas')
+    saved = 0
+
+    def on_result(match_id, response, error):
+        nonlocal saved
+        if error is not None:
+            queue.fail(KIND_MATCH, region, match_id, str(error))
+        elif response.status_code == 200:
+            store.put(match_id, response.json())
+            queue.complete(KIND_MATCH, region, match_id)
+            client.metrics.record_matches()
+            saved += 1
+        else:
+            queue.fail(KIND_MATCH, region, match_id, f"Status {response.status_code}",
+                       retry=response.status_code not in PERMANENT_STATUSES)
+
+    for jobs in queue.drain(KIND_MATCH, region, batch_size=max_in_flight * 50):
+        match_ids = [match_id for match_id, _ in jobs]
+        asyncio.run(download_matches(client, routing, match_ids, on_result, max_in_flight=max_in_flight))
+    return saved
+
+
+def download_queued_timelines(client, region, queue, timelines, max_in_flight=8):
+    """
+    Download every queued match timeline for a region into the timeline store
+
+    Args:
+        client (RiotClient): Client to send requests through
+        region (str): Platform region (e.g. na1)
+        queue (JobQueue): Crawl job table
+        timelines (TimelineStore): Store the timelines are written to
+        max_in_flight (int): Concurrent requests for this region (default: 8)
+
+    Returns:
+        int: Number of timelines saved
+    """
+    routing = REGION_ROUTING.get(region, 'americas')
+    saved = 0
+
+    def on_result(match_id, response, error):
+        nonlocal saved
+        if error is not None:
+            queue.fail(KIND_TIMELINE, region, match_id, str(error))
+        elif response.status_code == 200:
+            timelines.put(match_id, response.json())
+            queue.complete(KIND_TIMELINE, region, match_id)
+            client.metrics.incr('timelines_saved')
+            saved += 1
+        else:
+            queue.fail(KIND_TIMELINE, region, match_id, f"Status {response.status_code}",
+                       retry=response.status_code not in PERMANENT_STATUSES)
+
+    for jobs in queue.drain(KIND_TIMELINE, region, batch_size=max_in_flight * 50):
+        match_ids = [match_id for match_id, _ in jobs]
+        asyncio.run(download_matches(client, routing, match_ids, on_result,
+                                     max_in_flight=max_in_flight, path=TIMELINE_PATH))
+    return saved
+
+
+def crawl_region(client, region, queue, sync, store, backfill_pages=0, max_in_flight=8, ladder=None):
+    """
+    Run every crawl stage for one platform region
+
+    Returns:
+        dict: Summary with the region, player count, new match IDs, matches saved and seconds taken
+    """
+    started = time.time()
+    print(f"[{region}] 🔍 Reading the apex ladder...")
+    puuids = resolve_ladder_puuids(client, region, queue, ladder)
+    print(f"[{region}] 📋 Syncing match IDs for {len(puuids)} players...")
+    new_matches = sync_match_ids(client, region, queue, sync, puuids, backfill_pages=backfill_pages)
+    print(f"[{region}] ⬇️ Downloading {new_matches} new matches...")
+    saved = download_queued_matches(client, region, queue, store, max_in_flight=max_in_flight)
+    summary = {
+        'region': region,
+        'players': len(puuids),
+        'new_match_ids': new_matches,
+        'matches_saved': saved,
+        'seconds': time.time() - started,
+    }
+    print(f"[{region}] ✅ Done: {saved} matches saved in {summary['seconds']:.0f}s")
+    return summary
+
+
+def crawl_regions(api_key, regions, backfill_pages=0, max_in_flight=8, limiter=None):
+    """
+    Crawl several platform regions at the same time
+
+    Each region runs on its own thread with its own client and slice of the
+    job table, writing into one shared match store. All clients share one
+    rate limiter, whose buckets are kept per host: every platform host gets
+    its own budget, while platforms behind the same regional host (e.g. na1
+    and br1 on americas) correctly share that host's match-v5 budget.
+
+    Args:
+        api_key (str or KeyPool): Riot API key, or a pool of keys shared by every region
+        regions (list): Platform regions to crawl (e.g. ['na1', 'euw1', 'kr'])
+        backfill_pages (int): Pages of older history to read per player (default: 0)
+        max_in_flight (int): Concurrent match downloads per region (default: 8)
+        limiter (RateLimiter): Limiter shared by every region for a single key (default: shared limiter)
+
+    Returns:
+        list: One summary dict per region
+    """
+    queue = JobQueue()
+    # Every region shares this one queue, so jobs a crashed run had claimed can be picked up again at once
+    queue.recover(older_than=0)
+    sync = MatchSync()
+    store = MatchStore()
+    ladder = LadderSnapshots()
+
+    def run(region):
+        client = RiotClient(api_key, limiter=limiter, pool_size=max_in_flight)
+        try:
+            return crawl_region(client, region, queue, sync, store,
+                                backfill_pages=backfill_pages, max_in_flight=max_in_flight, ladder=ladder)
+        except requests.exceptions.RequestException as e:
+            print(f"[{region}] ❌ Crawl failed: {e}")
+            return {'region': region, 'error': str(e)}
+        finally:
+            client.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+            return list(executor.map(run, regions))
+    finally:
+        ladder.close()
+        store.close()
@@ -0,0 +1,150 @@
+"""
+Projected field extraction
+Pulls a declared set of fields out of raw match documents straight into columns
+"""
+import json
+import re
+
+try:
+    # Optional: orjson decodes match documents about twice as fast as the json module
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# alias=path, where path is dotted keys with at most one list[*] followed by .{key,key.sub,...}
+SPEC_PATTERN = re.compile(r'^(?:(?P<alias>\w+)=)?(?P<path>[\w.]+?)(?:\[\*\]\.\{(?P<fields>[^{}]+)\})?$')
+
+
+def _get(value, keys):
+    """Follow `keys` into nested dicts, returning None where the path stops"""
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class Projection:
+    """
+    Compiled set of fields to pull from each document
+
+    Specs name a dotted path, optionally with an alias:
+
+        "match_id=metadata.matchId"
+        "info.gameDuration"
+        "info.participants[*].{puuid,championName,kills,challenges.kda}"
+
+    At most one spec may select from a list with [*]; it yields one row
+    per list item, and the scalar paths are repeated on every row. Without
+    one, every document is a single row. Columns are named after the alias,
+    or else the last key of the path.
+
+    Documents are decoded with the C parser (orjson when installed) and
+    only the projected values are read out. Nothing is flattened into
+    per-row dictionaries; results go straight into one list per column.
+    """
+
+    def __init__(self, *specs):
+        """
+        Args:
+            *specs (str): Field specs as described above
+
+        Raises:
+            ValueError: If a spec can't be parsed, two specs use [*], or two columns share a name
+        """
+        self.scalars = []    # (column, keys)
+        self.rows_path = None
+        self.row_fields = []    # (column, keys within each list item)
+        for spec in specs:
+            found = SPEC_PATTERN.match(spec.replace(" ", ""))
+            if not found:
+                raise ValueError(f"Can't parse field spec {spec!r}")
+            keys = tuple(found.group('path').split('.'))
+            if found.group('fields') is None:
+                self.scalars.append((found.group('alias') or keys[-1], keys))
+                continue
+            if self.rows_path is not None or found.group('alias'):
+                raise ValueError(f"Only one unaliased [*] spec is allowed: {spec!r}")
+            self.rows_path = keys
+            for field in found.group('fields').split(','):
+                alias, _, path = field.rpartition('=')
+                subkeys = tuple(path.split('.'))
+                self.row_fields.append((alias or subkeys[-1], subkeys))
+        self.columns = [column for column, _ in self.scalars + self.row_fields]
+        duplicates = {column for column in self.columns if self.columns.count(column) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate column(s): {', '.join(sorted(duplicates))}")
+
+    def extract(self, raw):
+        """
+        Extract the projected fields of one document
+
+        Args:
+            raw (bytes or str): JSON document
+
+        Returns:
+            dict: Column -> list of values
+        """
+        return self.extract_many([raw])
+
+    def extract_many(self, raw_documents, columns=None):
+        """
+        Extract the projected fields of many documents into shared columns
+
+        Args:
+            raw_documents (iterable): JSON documents (bytes or str), or
+                (match_id, JSON bytes) tuples as yielded by MatchStore.scan_raw
+            columns (dict): Column lists to append to (default: new ones)
+
+        Returns:
+            dict: Column -> list of values, one entry per row
+        """
+        columns = columns if columns is not None else {column: [] for column in self.columns}
+        scalars = [(columns[column], keys) for column, keys in self.scalars]
+        # Single-key fields are the common case and need no _get call
+        direct = [(columns[column], keys[0]) for column, keys in self.row_fields if len(keys) == 1]
+        nested = [(columns[column], keys) for column, keys in self.row_fields if len(keys) > 1]
+        for raw in raw_documents:
+            if isinstance(raw, tuple):
+                raw = raw[1]
+            document = _loads(raw)
+            if self.rows_path is None:
+                items = None
+                count = 1
+            else:
+                items = _get(document, self.rows_path)
+                items = [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+                count = len(items)
+            for column, keys in scalars:
+                column.extend([_get(document, keys)] * count)
+            if items:
+                for column, key in direct:
+                    column.extend([item.get(key) for item in items])
+                for column, keys in nested:
+                    column.extend([_get(item, keys) for item in items])
+        return columns
+
+    def scan_store(self, store, batch_size=1000, skip=None):
+        """
+        Extract the projected fields of every stored match, a batch at a time
+
+        Args:
+            store (MatchStore): Store to read
+            batch_size (int): Documents per batch (default: 1000)
+            skip (set): Match IDs to leave out (default: none)
+
+        Yields:
+            tuple: (match IDs in the batch, column dict)
+        """
+        batch = []
+        for match_id, raw in store.scan_raw():
+            if skip and match_id in skip:
+                continue
+            batch.append((match_id, raw))
+            if len(batch) >= batch_size:
+                yield [m for m, _ in batch], self.extract_many(batch)
+                batch = []
+        if batch:
+            yield [m for m, _ in batch], self.extract_many(batch)
+
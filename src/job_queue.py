@@ -0,0 +1,339 @@
+"""
+Crawl job queue
+Stores pipeline work items in a local SQLite table so crawls survive crashes
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from src.metrics import default_metrics
+
+DEFAULT_DB_PATH = "data/crawl.sqlite"
+
+# Kinds of work item in the collection pipeline
+KIND_PUUID = "puuid"            # summoner ID -> PUUID resolution
+KIND_MATCH_IDS = "match_ids"    # PUUID -> list of match IDs
+KIND_MATCH = "match"            # match ID -> match document
+KIND_TIMELINE = "timeline"      # match ID -> match timeline
+
+# Job states
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"    # will be retried once next_retry_at has passed
+DEAD = "dead"        # gave up after max_attempts or a permanent error
+
+# A claimed job not finished within this many seconds is taken to be abandoned
+# by a crashed process and may be claimed again
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    kind TEXT NOT NULL,
+    region TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT,
+    result TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_retry_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, region, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (kind, region, state, next_retry_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable queue of crawl work items
+
+    Each job is identified by (kind, region, key) and carries a state, an
+    attempt count and the time it may next be retried. Failed jobs back off
+    exponentially and are retried until max_attempts is reached. Claiming a
+    job leases it for `lease_seconds`; a job still in progress after that
+    (its process died) can be claimed again, while jobs other live
+    processes are working on are left alone.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, max_attempts=5, base_backoff=30, metrics=None,
+                 lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Args:
+            path (str): SQLite database file (default: data/crawl.sqlite)
+            max_attempts (int): Attempts before a job is marked dead (default: 5)
+            base_backoff (float): Seconds to wait after the first failure;
+                doubles with every further failure (default: 30)
+            metrics (Metrics): Where queue depth is reported while draining (default: shared metrics)
+            lease_seconds (float): How long a claimed job is reserved for its claimer (default: 900)
+        """
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics or default_metrics
+        self.base_backoff = base_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def recover(self, older_than=None):
+        """
+        Return jobs left in progress by a crashed run to pending
+
+        Only call this with older_than=0 when no other process is using the
+        queue; single-process scripts do so at startup so a rerun picks up
+        the jobs the crashed run had claimed straight away.
+
+        Args:
+            older_than (float): Only jobs claimed at least this many seconds ago (default: lease_seconds)
+
+        Returns:
+            int: Number of jobs returned to pending
+        """
+        cutoff = time.time() - (self.lease_seconds if older_than is None else older_than)
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET state = ? WHERE state = ? AND updated_at <= ?", (PENDING, IN_PROGRESS, cutoff)
+            ).rowcount
+
+    def enqueue_many(self, kind, region, items, reset=False):
+        """
+        Add jobs, leaving existing jobs alone unless `reset` is set
+
+        Args:
+            kind (str): Job kind (KIND_PUUID, KIND_MATCH_IDS, KIND_MATCH or KIND_TIMELINE)
+            region (str): Platform or routing value the job belongs to
+            items (iterable): Keys, or (key, payload) tuples; payloads are
+                JSON-encoded and replace any stored payload
+            reset (bool): Put existing jobs back to pending with no attempts
+
+        Returns:
+            int: Number of rows inserted or updated
+        """
+        rows = []
+        for item in items:
+            key, payload = item if isinstance(item, tuple) else (item, None)
+            rows.append((kind, region, key, None if payload is None else json.dumps(payload), time.time()))
+        if reset:
+            conflict = ("DO UPDATE SET payload = COALESCE(excluded.payload, payload), state = 'pending', "
+                        "attempts = 0, next_retry_at = 0, last_error = NULL, updated_at = excluded.updated_at")
+        else:
+            conflict = "DO UPDATE SET payload = COALESCE(excluded.payload, payload)"
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.executemany(
+                "INSERT INTO jobs (kind, region, key, payload, updated_at) VALUES (?, ?, ?, ?, ?) "
+                f"ON CONFLICT (kind, region, key) {conflict}",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def enqueue(self, kind, region, key, payload=None, reset=False):
+        """Add a single job (see enqueue_many)"""
+        return self.enqueue_many(kind, region, [(key, payload)], reset=reset)
+
+    def claim(self, kind, region, limit=100):
+        """
+        Take up to `limit` jobs that are ready to run and mark them in progress
+
+        Jobs whose lease has run out count as ready.
+
+        Args:
+            kind (str): Job kind
+            region (str): Platform or routing value
+            limit (int): Maximum number of jobs to claim (default: 100)
+
+        Returns:
+            list: List of (key, payload) tuples
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT key, payload FROM jobs WHERE kind = ? AND region = ? "
+                "AND ((state IN (?, ?) AND next_retry_at <= ?) OR (state = ? AND updated_at <= ?)) "
+                "ORDER BY next_retry_at LIMIT ?",
+                (kind, region, PENDING, FAILED, now, IN_PROGRESS, now - self.lease_seconds, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE kind = ? AND region = ? AND key = ?",
+                [(IN_PROGRESS, now, kind, region, key) for key, _ in rows],
+            )
+            self._conn.execute("COMMIT")
+        return [(key, None if payload is None else json.loads(payload)) for key, payload in rows]
+
+    def complete(self, kind, region, key, result=None):
+        """
+        Mark a job done, optionally storing its result
+
+        Args:
+            kind (str): Job kind
+            region (str): Platform or routing value
+            key (str): Job key
+            result: JSON-serialisable result to keep with the job
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, last_error = NULL, updated_at = ? "
+                "WHERE kind = ? AND region = ? AND key = ?",
+                (DONE, None if result is None else json.dumps(result), time.time(), kind, region, key),
+            )
+
+    def complete_many(self, kind, region, keys):
+        """Mark several jobs done in one transaction"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, last_error = NULL, updated_at = ? WHERE kind = ? AND region = ? AND key = ?",
+                [(DONE, now, kind, region, key) for key in keys],
+            )
+            self._conn.execute("COMMIT")
+
+    def fail(self, kind, region, key, error, retry=True):
+        """
+        Record a failed attempt and schedule the next one with exponential backoff
+
+        Args:
+            kind (str): Job kind
+            region (str): Platform or routing value
+            key (str): Job key
+            error (str): Description of what went wrong
+            retry (bool): False for permanent errors (e.g. 404) to give up immediately
+
+        Returns:
+            str: The job's new state (FAILED or DEAD)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE kind = ? AND region = ? AND key = ?",
+                (kind, region, key),
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            state = FAILED if retry and attempts < self.max_attempts else DEAD
+            next_retry_at = now + self.base_backoff * 2 ** (attempts - 1)
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = ?, next_retry_at = ?, last_error = ?, updated_at = ? "
+                "WHERE kind = ? AND region = ? AND key = ?",
+                (state, attempts, next_retry_at, str(error), now, kind, region, key),
+            )
+        return state
+
+    def release(self, kind, region, key):
+        """Put a claimed job back to pending without counting an attempt"""
+        self.release_many(kind, region, [key])
+
+    def release_many(self, kind, region, keys):
+        """Put several claimed jobs back to pending in one transaction; finished jobs are left alone"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE jobs SET state = ? WHERE kind = ? AND region = ? AND key = ? AND state = ?",
+                [(PENDING, kind, region, key, IN_PROGRESS) for key in keys],
+            )
+            self._conn.execute("COMMIT")
+
+    def results(self, kind, region, keys=None):
+        """
+        Get the stored results of finished jobs
+
+        Args:
+            kind (str): Job kind
+            region (str): Platform or routing value
+            keys (iterable): Only return these keys (default: every done job)
+
+        Returns:
+            dict: Mapping of key to decoded result
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, result FROM jobs WHERE kind = ? AND region = ? AND state = ?",
+                (kind, region, DONE),
+            ).fetchall()
+        wanted = None if keys is None else set(keys)
+        return {key: None if result is None else json.loads(result)
+                for key, result in rows if wanted is None or key in wanted}
+
+    def states(self, kind, region):
+        """Get a mapping of key to state for every job of a kind"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT key, state FROM jobs WHERE kind = ? AND region = ?", (kind, region)
+            ).fetchall())
+
+    def counts(self, kind, region):
+        """Get the number of jobs in each state"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE kind = ? AND region = ? GROUP BY state",
+                (kind, region),
+            ).fetchall())
+
+    def has_open(self, kind, region):
+        """Whether any job is still pending, in progress or waiting to retry"""
+        counts = self.counts(kind, region)
+        return any(counts.get(state) for state in (PENDING, IN_PROGRESS, FAILED))
+
+    def next_retry_in(self, kind, region):
+        """
+        Seconds until the next job may be claimed
+
+        That is the next failed job's retry time or the next lease to run
+        out on a job still in progress, whichever comes first.
+
+        Returns:
+            float: Seconds to wait (0 if a job is ready now), or None if nothing is waiting
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(CASE WHEN state = ? THEN updated_at + ? ELSE next_retry_at END) FROM jobs "
+                "WHERE kind = ? AND region = ? AND state IN (?, ?, ?)",
+                (IN_PROGRESS, self.lease_seconds, kind, region, PENDING, FAILED, IN_PROGRESS),
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def drain(self, kind, region, batch_size=100, max_wait=300):
+        """
+        Yield batches of claimed jobs until nothing is left to run
+
+        Waits out backoffs and other claimers' leases shorter than
+        `max_wait`; jobs with longer waits are left for the next run. If the
+        caller stops early, the jobs of the batch it was given that it
+        hadn't finished go back to pending.
+
+        Args:
+            kind (str): Job kind
+            region (str): Platform or routing value
+            batch_size (int): Jobs claimed per batch (default: 100)
+            max_wait (float): Longest backoff to sleep through in seconds (default: 300)
+
+        Yields:
+            list: List of (key, payload) tuples
+        """
+        while True:
+            jobs = self.claim(kind, region, batch_size)
+            counts = self.counts(kind, region)
+            for state in (PENDING, IN_PROGRESS, FAILED, DONE, DEAD):
+                self.metrics.set_gauge(f"queue.{kind}.{region}.{state}", counts.get(state, 0))
+            if jobs:
+                try:
+                    yield jobs
+                except BaseException:
+                    self.release_many(kind, region, [key for key, _ in jobs])
+                    raise
+                continue
+            wait = self.next_retry_in(kind, region)
+            if wait is None or wait > max_wait:
+                return
+            time.sleep(wait)
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
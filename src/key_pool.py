@@ -0,0 +1,114 @@
+"""
+API key pool
+Spreads requests over several Riot API keys, each with its own rate limit budget
+"""
+import os
+import threading
+
+from src.rate_limiter import DEFAULT_APP_LIMITS, RateLimiter
+
+# Consecutive 401/403 responses after which a key is taken out of rotation.
+# More than one, so a single endpoint that answers 403 for every key
+# (e.g. a deprecated one) doesn't knock a working key out.
+KEY_FAILURE_LIMIT = 3
+
+# Statuses that mean the key itself was refused
+AUTH_FAILURE_STATUSES = (401, 403)
+
+
+class NoActiveKeysError(RuntimeError):
+    """Every key in the pool has been taken out of rotation"""
+
+
+class KeyPool:
+    """
+    Set of API keys with separate quota state per key
+
+    Riot counts application and method limits per key, so each key gets
+    its own RateLimiter. Every request goes to the active key with the most
+    budget left for that endpoint: the one that can send soonest, then the
+    one with the most requests left in its tightest window. Keys that keep
+    answering 401/403 are disabled.
+    """
+
+    def __init__(self, keys, app_limits=DEFAULT_APP_LIMITS, limiters=None):
+        """
+        Args:
+            keys (iterable): Riot API keys
+            app_limits (str): Limits each key starts with until the API reports its own
+            limiters (dict): Key -> RateLimiter to use instead of a new one (default: none)
+        """
+        self.keys = [key for key in dict.fromkeys(keys) if key]
+        limiters = limiters or {}
+        self.limiters = {key: limiters.get(key) or RateLimiter(app_limits) for key in self.keys}
+        self.disabled = {}    # key -> reason it was taken out of rotation
+        self._failures = {key: 0 for key in self.keys}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, app_limits=DEFAULT_APP_LIMITS):
+        """
+        Build a pool from RIOT_API_KEYS (comma-separated), falling back to RIOT_API_KEY
+
+        Returns:
+            KeyPool: Pool of the configured keys (empty if none are set)
+        """
+        keys = os.getenv("RIOT_API_KEYS") or os.getenv("RIOT_API_KEY") or ""
+        return cls([key.strip() for key in keys.split(",")], app_limits=app_limits)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def active_keys(self):
+        """Keys still in rotation"""
+        with self._lock:
+            return [key for key in self.keys if key not in self.disabled]
+
+    def choose(self, url, exclude=()):
+        """
+        Pick the key to send a request to `url` with
+
+        Args:
+            url (str): Full request URL
+            exclude (iterable): Keys not to pick, e.g. ones already refused for this request
+
+        Raises:
+            NoActiveKeysError: If every key has been disabled
+
+        Returns:
+            tuple: (key, RateLimiter for that key)
+        """
+        active = self.active_keys()
+        if not active:
+            raise NoActiveKeysError(f"All {len(self.keys)} API keys were refused: {self.disabled}")
+        candidates = [key for key in active if key not in exclude] or active
+        if len(candidates) == 1:
+            key = candidates[0]
+        else:
+            def budget(key):
+                wait, left = self.limiters[key].headroom(url)
+                return wait, -left
+            key = min(candidates, key=budget)
+        return key, self.limiters[key]
+
+    def record(self, key, status):
+        """
+        Record the status a key got back, disabling it after repeated auth failures
+
+        Returns:
+            bool: True if this response took the key out of rotation
+        """
+        with self._lock:
+            if status not in AUTH_FAILURE_STATUSES:
+                self._failures[key] = 0
+                return False
+            self._failures[key] += 1
+            if self._failures[key] < KEY_FAILURE_LIMIT or key in self.disabled:
+                return False
+            self.disabled[key] = f"Status {status}"
+        print(f"🔑 API key ...{key[-6:]} disabled after {KEY_FAILURE_LIMIT} x status {status}")
+        return True
+
+    def throttled_seconds(self):
+        """Seconds spent waiting for every key's limiter"""
+        return sum(limiter.throttled_seconds for limiter in self.limiters.values())
@@ -0,0 +1,257 @@
+"""
+Apex ladder snapshots
+Records challenger, grandmaster and master ladders as diffs against the previous snapshot
+"""
+import sqlite3
+import threading
+import time
+
+import requests
+
+from src.job_queue import DEFAULT_DB_PATH, KIND_PUUID
+
+# Apex tiers, highest first; a player listed in two tiers mid-promotion keeps the higher one
+APEX_TIERS = ('challenger', 'grandmaster', 'master')
+
+# Ranked queues with an apex ladder
+LADDER_QUEUES = ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR')
+
+# Kinds of ladder change
+ADDED = "added"
+REMOVED = "removed"
+UPDATED = "updated"    # LP, tier or games played changed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ladder_players (
+    region TEXT NOT NULL,
+    queue TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    summoner_id TEXT,
+    tier TEXT NOT NULL,
+    league_points INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (region, queue, puuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ladder_players_summoner ON ladder_players (region, summoner_id);
+CREATE TABLE IF NOT EXISTS ladder_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    region TEXT NOT NULL,
+    queue TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    players INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    updated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ladder_changes (
+    snapshot_id INTEGER NOT NULL,
+    puuid TEXT NOT NULL,
+    change TEXT NOT NULL,
+    tier TEXT,
+    league_points INTEGER,
+    lp_change INTEGER,
+    games_played INTEGER,
+    PRIMARY KEY (snapshot_id, puuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ladder_changes_puuid ON ladder_changes (puuid, snapshot_id);
+"""
+
+
+class LadderSnapshots:
+    """
+    History of the apex ladders of each region and queue
+
+    A snapshot reads the three apex league lists (three calls per queue)
+    and takes PUUIDs from the league entries. Only entries without one,
+    and not known from an earlier snapshot or the crawl job table, cost a
+    summoner lookup. The current ladder is kept in full; each snapshot only
+    stores what changed since the previous one: players added, players
+    removed and players whose tier, LP or games played moved.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        """
+        Args:
+            path (str): SQLite database file (default: the crawl database)
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def fetch_entries(self, client, region, queue):
+        """
+        Read every apex league list of a queue
+
+        Args:
+            client (RiotClient): Client to send requests through
+            region (str): Platform region (e.g. na1)
+            queue (str): Ranked queue (e.g. RANKED_SOLO_5x5)
+
+        Returns:
+            list: League entries, each with a `tier` field added
+        """
+        entries = []
+        for tier in APEX_TIERS:
+            league = client.get_json(region, f"/lol/league/v4/{tier}leagues/by-queue/{queue}")
+            entries.extend(dict(entry, tier=tier.upper()) for entry in league.get("entries", []))
+        return entries
+
+    def _resolve_puuids(self, client, region, entries, jobs):
+        """Fill in missing PUUIDs from earlier snapshots, the job table or summoner lookups"""
+        missing = {entry["summonerId"] for entry in entries if not entry.get("puuid") and entry.get("summonerId")}
+        if not missing:
+            return
+        with self._lock:
+            known = dict(self._conn.execute(
+                "SELECT summoner_id, puuid FROM ladder_players WHERE region = ? AND summoner_id IS NOT NULL",
+                (region,),
+            ).fetchall())
+        if jobs is not None:
+            known.update((k, v) for k, v in jobs.results(KIND_PUUID, region, missing).items() if v)
+        for summoner_id in missing - set(known):
+            try:
+                known[summoner_id] = client.get_json(region, f"/lol/summoner/v4/summoners/{summoner_id}").get("puuid")
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Failed to resolve summoner {summoner_id}: {e}")
+                continue
+            if jobs is not None and known[summoner_id]:
+                jobs.enqueue(KIND_PUUID, region, summoner_id)
+                jobs.complete(KIND_PUUID, region, summoner_id, result=known[summoner_id])
+        for entry in entries:
+            if not entry.get("puuid"):
+                entry["puuid"] = known.get(entry.get("summonerId"))
+
+    def take_snapshot(self, client, region, queue=LADDER_QUEUES[0], jobs=None):
+        """
+        Read a ladder and record how it changed since the previous snapshot
+
+        Args:
+            client (RiotClient): Client to send requests through
+            region (str): Platform region (e.g. na1)
+            queue (str): Ranked queue (default: RANKED_SOLO_5x5)
+            jobs (JobQueue): Crawl job table to share PUUID lookups with (default: none)
+
+        Returns:
+            dict: Snapshot ID, player count, and lists of added, removed and
+                updated PUUIDs; `active` holds the players to sync match IDs
+                for (new players and those who played since the last snapshot)
+        """
+        entries = self.fetch_entries(client, region, queue)
+        self._resolve_puuids(client, region, entries, jobs)
+
+        ladder = {}
+        for entry in entries:
+            if entry.get("puuid") and entry["puuid"] not in ladder:
+                ladder[entry["puuid"]] = entry
+
+        with self._lock:
+            previous = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT puuid, tier, league_points, wins, losses FROM ladder_players WHERE region = ? AND queue = ?",
+                (region, queue),
+            )}
+            changes = []
+            for puuid, entry in ladder.items():
+                lp, wins, losses = entry.get("leaguePoints", 0), entry.get("wins", 0), entry.get("losses", 0)
+                if puuid not in previous:
+                    changes.append((puuid, ADDED, entry["tier"], lp, None, None))
+                    continue
+                old_tier, old_lp, old_wins, old_losses = previous[puuid]
+                games = wins + losses - old_wins - old_losses
+                if entry["tier"] != old_tier or lp != old_lp or games:
+                    changes.append((puuid, UPDATED, entry["tier"], lp, lp - old_lp, games))
+            changes.extend((puuid, REMOVED, None, None, None, None) for puuid in previous if puuid not in ladder)
+            counts = {kind: sum(1 for change in changes if change[1] == kind) for kind in (ADDED, REMOVED, UPDATED)}
+
+            with self._conn:
+                snapshot_id = self._conn.execute(
+                    "INSERT INTO ladder_snapshots (region, queue, taken_at, players, added, removed, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (region, queue, time.time(), len(ladder), counts[ADDED], counts[REMOVED], counts[UPDATED]),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO ladder_changes (snapshot_id, puuid, change, tier, league_points, lp_change, games_played) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(snapshot_id, *change) for change in changes],
+                )
+                self._conn.executemany(
+                    "DELETE FROM ladder_players WHERE region = ? AND queue = ? AND puuid = ?",
+                    [(region, queue, change[0]) for change in changes if change[1] == REMOVED],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ladder_players "
+                    "(region, queue, puuid, summoner_id, tier, league_points, wins, losses, snapshot_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(region, queue, puuid, ladder[puuid].get("summonerId"), ladder[puuid]["tier"],
+                      ladder[puuid].get("leaguePoints", 0), ladder[puuid].get("wins", 0),
+                      ladder[puuid].get("losses", 0), snapshot_id)
+                     for puuid, kind, *_ in changes if kind != REMOVED],
+                )
+
+        by_kind = {kind: [change[0] for change in changes if change[1] == kind] for kind in (ADDED, REMOVED, UPDATED)}
+        active = by_kind[ADDED] + [change[0] for change in changes if change[1] == UPDATED and change[5]]
+        return {'snapshot_id': snapshot_id, 'region': region, 'queue': queue, 'players': len(ladder),
+                **by_kind, 'active': active}
+
+    def players(self, region, queue=LADDER_QUEUES[0]):
+        """
+        Get the current ladder
+
+        Returns:
+            list: (puuid, tier, league_points, wins, losses) tuples, highest tier and LP first
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT puuid, tier, league_points, wins, losses FROM ladder_players WHERE region = ? AND queue = ? "
+                "ORDER BY CASE tier WHEN 'CHALLENGER' THEN 0 WHEN 'GRANDMASTER' THEN 1 ELSE 2 END, league_points DESC",
+                (region, queue),
+            ).fetchall()
+
+    def snapshots(self, region, queue=LADDER_QUEUES[0]):
+        """
+        Get the recorded snapshots of a ladder, newest first
+
+        Returns:
+            list: (id, taken_at, players, added, removed, updated) tuples
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, taken_at, players, added, removed, updated FROM ladder_snapshots "
+                "WHERE region = ? AND queue = ? ORDER BY id DESC",
+                (region, queue),
+            ).fetchall()
+
+    def changes(self, snapshot_id):
+        """
+        Get what changed in one snapshot
+
+        Returns:
+            list: (puuid, change, tier, league_points, lp_change, games_played) tuples
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT puuid, change, tier, league_points, lp_change, games_played FROM ladder_changes "
+                "WHERE snapshot_id = ?",
+                (snapshot_id,),
+            ).fetchall()
+
+    def history(self, puuid):
+        """
+        Get a player's recorded ladder changes across every region and queue
+
+        Returns:
+            list: (taken_at, region, queue, change, tier, league_points, lp_change, games_played) tuples, oldest first
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.taken_at, s.region, s.queue, c.change, c.tier, c.league_points, c.lp_change, c.games_played "
+                "FROM ladder_changes c JOIN ladder_snapshots s ON s.id = c.snapshot_id "
+                "WHERE c.puuid = ? ORDER BY c.snapshot_id",
+                (puuid,),
+            ).fetchall()
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
@@ -0,0 +1,239 @@
+"""
+Analytical match index
+Embedded SQLite index over parsed participant rows for filtered and aggregated queries
+"""
+import glob
+import os
+import sqlite3
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.bulk_parser import DEFAULT_PARSED_PATH
+
+DEFAULT_INDEX_PATH = "data/match_index.sqlite"
+
+# Index column -> parsed participant column it is read from
+INDEX_COLUMNS = {
+    'match_id': 'match_id',
+    'puuid': 'puuid',
+    'game_creation': 'game_creation',
+    'game_duration': 'game_duration',
+    'patch': 'patch',
+    'queue_id': 'queue_id',
+    'platform_id': 'platform_id',
+    'champion': 'championName',
+    'champion_id': 'championId',
+    'position': 'teamPosition',
+    'team_id': 'teamId',
+    'win': 'win',
+    'kills': 'kills',
+    'deaths': 'deaths',
+    'assists': 'assists',
+    'gold_earned': 'goldEarned',
+    'damage_to_champions': 'totalDamageDealtToChampions',
+    'vision_score': 'visionScore',
+    'minions_killed': 'totalMinionsKilled',
+    'neutral_minions_killed': 'neutralMinionsKilled',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    match_id TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    game_creation INTEGER,
+    game_date TEXT,
+    game_duration INTEGER,
+    patch TEXT,
+    queue_id INTEGER,
+    platform_id TEXT,
+    champion TEXT,
+    champion_id INTEGER,
+    position TEXT,
+    team_id INTEGER,
+    win INTEGER,
+    kills INTEGER,
+    deaths INTEGER,
+    assists INTEGER,
+    gold_earned INTEGER,
+    damage_to_champions INTEGER,
+    vision_score INTEGER,
+    minions_killed INTEGER,
+    neutral_minions_killed INTEGER,
+    PRIMARY KEY (match_id, puuid)
+);
+CREATE INDEX IF NOT EXISTS participants_puuid ON participants (puuid, game_creation);
+CREATE INDEX IF NOT EXISTS participants_champion ON participants (champion, patch, queue_id);
+CREATE INDEX IF NOT EXISTS participants_patch ON participants (patch, queue_id, position);
+CREATE INDEX IF NOT EXISTS participants_position ON participants (position, champion);
+CREATE INDEX IF NOT EXISTS participants_date ON participants (game_date);
+CREATE TABLE IF NOT EXISTS ingested_files (file TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+# Filters accepted by participants() and the aggregate queries
+FILTER_COLUMNS = ('puuid', 'champion', 'patch', 'queue_id', 'position', 'platform_id')
+
+
+def _where(filters, start_date=None, end_date=None):
+    """Build a WHERE clause from column filters (None = any, list = one of)"""
+    clauses, params = [], []
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if start_date is not None:
+        clauses.append("game_date >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append("game_date <= ?")
+        params.append(str(end_date))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class MatchIndex:
+    """
+    Queryable index of parsed participant rows
+
+    update() copies the key columns of every new parquet file written by
+    bulk_parse into an SQLite table indexed by PUUID, champion, patch,
+    queue, position and date. Queries run inside SQLite and only their
+    results are loaded into pandas, so the full corpus never has to fit in
+    memory.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        """
+        Args:
+            path (str): SQLite database file (default: data/match_index.sqlite)
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def update(self, parsed_dir=DEFAULT_PARSED_PATH):
+        """
+        Add every parsed file not indexed yet
+
+        Args:
+            parsed_dir (str): Folder written by bulk_parse
+
+        Returns:
+            int: Number of participant rows added
+        """
+        done = {row[0] for row in self._conn.execute("SELECT file FROM ingested_files")}
+        paths = sorted(glob.glob(os.path.join(parsed_dir, "patch=*", "queue=*", "*.parquet")))
+        added = 0
+        for path in paths:
+            relative = os.path.relpath(path, parsed_dir)
+            if relative in done:
+                continue
+            # Files only hold columns that had values, so ask for the ones present
+            available = set(pq.read_schema(path).names)
+            wanted = [source for source in INDEX_COLUMNS.values() if source in available]
+            df = pd.read_parquet(path, columns=wanted).reindex(columns=list(INDEX_COLUMNS.values()))
+            df.columns = list(INDEX_COLUMNS)
+            df['game_date'] = pd.to_datetime(df['game_creation'], unit='ms').dt.strftime('%Y-%m-%d')
+            df['win'] = df['win'].astype('float').astype('Int64')
+            df = df.astype(object).where(df.notna(), None)
+            columns = list(df.columns)
+            with self._conn:
+                cursor = self._conn.executemany(
+                    f"INSERT OR IGNORE INTO participants ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    df.itertuples(index=False, name=None),
+                )
+                added += cursor.rowcount
+                self._conn.execute("INSERT INTO ingested_files (file) VALUES (?)", (relative,))
+        return added
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+
+    def query(self, sql, params=()):
+        """
+        Run any SQL against the index (the table is `participants`)
+
+        Returns:
+            pd.DataFrame: Query result
+        """
+        return pd.read_sql_query(sql, self._conn, params=params)
+
+    def participants(self, columns=None, start_date=None, end_date=None, limit=None, **filters):
+        """
+        Get participant rows matching the filters
+
+        Args:
+            columns (list): Columns to return (default: all)
+            start_date (str): Earliest game date, YYYY-MM-DD (default: any)
+            end_date (str): Latest game date, YYYY-MM-DD (default: any)
+            limit (int): Maximum rows to return (default: no limit)
+            **filters: puuid, champion, patch, queue_id, position or platform_id;
+                a list matches any of its values
+
+        Returns:
+            pd.DataFrame: Matching rows, newest first
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        where, params = _where(filters, start_date, end_date)
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM participants{where} ORDER BY game_creation DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, params)
+
+    def aggregate(self, group_by=('champion',), min_games=1, start_date=None, end_date=None, **filters):
+        """
+        Get per-group game counts, win rate and average performance
+
+        Args:
+            group_by (tuple): Columns to group by (default: champion)
+            min_games (int): Drop groups with fewer games (default: 1)
+            start_date (str): Earliest game date, YYYY-MM-DD (default: any)
+            end_date (str): Latest game date, YYYY-MM-DD (default: any)
+            **filters: Same filters as participants()
+
+        Returns:
+            pd.DataFrame: One row per group, most played first
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        where, params = _where(filters, start_date, end_date)
+        groups = ', '.join(group_by)
+        sql = f"""
+            SELECT {groups},
+                   COUNT(*) AS games,
+                   AVG(win) AS win_rate,
+                   AVG(kills) AS kills,
+                   AVG(deaths) AS deaths,
+                   AVG(assists) AS assists,
+                   SUM(kills + assists) * 1.0 / MAX(SUM(deaths), 1) AS kda,
+                   AVG(gold_earned) AS gold_earned,
+                   AVG(damage_to_champions) AS damage_to_champions,
+                   AVG(vision_score) AS vision_score,
+                   SUM(minions_killed + neutral_minions_killed) * 60.0 / MAX(SUM(game_duration), 1) AS cs_per_min
+            FROM participants{where}
+            GROUP BY {groups}
+            HAVING COUNT(*) >= ?
+            ORDER BY games DESC
+        """
+        return self.query(sql, params + [min_games])
+
+    def champion_stats(self, min_games=1, **filters):
+        """Per-champion win rate and averages (see aggregate)"""
+        return self.aggregate(('champion',), min_games=min_games, **filters)
+
+    def player_champions(self, puuid, min_games=1, **filters):
+        """A player's per-champion win rate and averages (see aggregate)"""
+        return self.aggregate(('champion',), min_games=min_games, puuid=puuid, **filters)
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
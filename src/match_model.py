@@ -0,0 +1,321 @@
+"""
+Match data model
+Slotted participant records and array-backed participant batches with interned category codes
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def _code_dtype(size):
+    """Smallest code dtype pandas uses for a categorical with `size` categories"""
+    if size < np.iinfo(np.int8).max:
+        return np.int8
+    if size < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+class CategoryTable:
+    """
+    Interning table mapping repeated values (champion names, roles, ...) to small integer codes
+
+    Codes are assigned in first-seen order and never change, so codes from
+    different batches sharing a table can be compared directly.
+    """
+
+    def __init__(self, values=()):
+        """
+        Args:
+            values (iterable): Values to assign the first codes to
+        """
+        self.values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.code(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """Get the code of a value, assigning the next free code if it is new"""
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = self._codes[value] = len(self.values)
+                    self.values.append(value)
+        return code
+
+    def value(self, code):
+        """Get the value a code stands for"""
+        return self.values[code]
+
+
+# Lane positions a participant can play; the rollups and player features
+# keep one fixed slot for each
+POSITIONS = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+
+# Tables shared by every batch in the process
+CHAMPIONS = CategoryTable()
+ROLES = CategoryTable(['', *POSITIONS, 'Invalid'])
+QUEUES = CategoryTable()
+PATCHES = CategoryTable()
+GAME_MODES = CategoryTable()
+GAME_TYPES = CategoryTable()
+
+# Record field -> numpy dtype, or the CategoryTable its values are interned in.
+# PUUIDs are nearly all distinct and a global table would grow for as long as
+# a crawl runs, so they are kept as plain strings in an object column
+FIELDS = {
+    'game_id': np.int64,
+    'game_duration': np.int32,
+    'game_mode': GAME_MODES,
+    'game_type': GAME_TYPES,
+    'match_date': np.int64,
+    'queue_id': QUEUES,
+    'patch': PATCHES,
+    'puuid': object,
+    'champion': CHAMPIONS,
+    'kills': np.int16,
+    'deaths': np.int16,
+    'assists': np.int16,
+    'win': np.bool_,
+    'position': ROLES,
+    'gold_earned': np.int32,
+    'damage_dealt': np.int32,
+    'vision_score': np.int16,
+    'cs': np.int16,
+}
+
+# Integer columns of the parsed participant tables are narrowed to int32 when they fit
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+# Columns of the parsed participant tables stored as pandas categoricals
+CATEGORY_COLUMNS = ('championName', 'teamPosition', 'individualPosition', 'lane', 'role',
+                    'patch', 'game_version', 'game_mode', 'game_type', 'platform_id')
+
+
+def patch_from_version(game_version):
+    """
+    Get the patch (e.g. "14.1") from a full game version (e.g. "14.1.555.5512")
+
+    Args:
+        game_version (str): gameVersion from match info
+
+    Returns:
+        str: Major.minor patch, or "unknown"
+    """
+    parts = (game_version or '').split('.')
+    return '.'.join(parts[:2]) if len(parts) >= 2 else 'unknown'
+
+
+class ParticipantRecord:
+    """One player's row for one match"""
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, game_id=0, game_duration=0, game_mode='', game_type='', match_date=0,
+                 queue_id=0, patch='unknown', puuid='', champion='', kills=0, deaths=0, assists=0, win=False,
+                 position='', gold_earned=0, damage_dealt=0, vision_score=0, cs=0):
+        self.game_id = game_id
+        self.game_duration = game_duration
+        self.game_mode = game_mode
+        self.game_type = game_type
+        self.match_date = match_date
+        self.queue_id = queue_id
+        self.patch = patch
+        self.puuid = puuid
+        self.champion = champion
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.win = win
+        self.position = position
+        self.gold_earned = gold_earned
+        self.damage_dealt = damage_dealt
+        self.vision_score = vision_score
+        self.cs = cs
+
+    @classmethod
+    def from_api(cls, match_info, participant=None):
+        """
+        Build a record from match-v5 data
+
+        Args:
+            match_info (dict): `info` of a match document
+            participant (dict): Entry of info.participants (default: none, match fields only)
+
+        Returns:
+            ParticipantRecord: The record
+        """
+        record = cls(
+            game_id=match_info.get('gameId', 0),
+            game_duration=match_info.get('gameDuration', 0),
+            game_mode=match_info.get('gameMode', ''),
+            game_type=match_info.get('gameType', ''),
+            match_date=match_info.get('gameCreation', 0),
+            queue_id=match_info.get('queueId', 0),
+            patch=patch_from_version(match_info.get('gameVersion')),
+        )
+        if participant is not None:
+            record.puuid = participant.get('puuid', '')
+            record.champion = participant.get('championName', '')
+            record.kills = participant.get('kills', 0)
+            record.deaths = participant.get('deaths', 0)
+            record.assists = participant.get('assists', 0)
+            record.win = participant.get('win', False)
+            record.position = participant.get('individualPosition', '')
+            record.gold_earned = participant.get('goldEarned', 0)
+            record.damage_dealt = participant.get('totalDamageDealtToChampions', 0)
+            record.vision_score = participant.get('visionScore', 0)
+            record.cs = participant.get('totalMinionsKilled', 0) + participant.get('neutralMinionsKilled', 0)
+        return record
+
+    def to_dict(self):
+        """Get the record as a plain dictionary"""
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, ParticipantRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"ParticipantRecord(game_id={self.game_id}, champion={self.champion!r}, position={self.position!r})"
+
+
+class ParticipantBatch:
+    """
+    Column store of participant records
+
+    Each field lives in one fixed-dtype numpy array; repeated strings
+    (champion, position, queue, patch, game mode and type) are stored as
+    codes into the shared CategoryTables, and PUUIDs as references to the
+    records' own strings. A row takes about 55 bytes plus its PUUID
+    string, instead of the ~470 of a dictionary of Python objects. Arrays grow
+    by doubling, and to_dataframe() hands views of them to pandas. Recent
+    pandas builds the frame on those views; older versions (such as the
+    pinned 1.3) copy the columns into consolidated blocks once.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Args:
+            capacity (int): Rows to allocate up front (default: 1024)
+        """
+        self._size = 0
+        self._columns = {field: np.zeros(capacity, dtype=self._dtype(kind)) for field, kind in FIELDS.items()}
+
+    @staticmethod
+    def _dtype(kind):
+        return _code_dtype(len(kind)) if isinstance(kind, CategoryTable) else kind
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._columns['game_id'])
+
+    def _reserve(self, rows):
+        """Make room for `rows` more rows and widen code arrays whose table outgrew them"""
+        capacity = self.capacity
+        needed = self._size + rows
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+        for field, kind in FIELDS.items():
+            column = self._columns[field]
+            dtype = self._dtype(kind)
+            if len(column) < capacity or column.dtype != dtype:
+                grown = np.zeros(capacity, dtype=dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[field] = grown
+
+    def append(self, record):
+        """Add one ParticipantRecord"""
+        self._reserve(1)
+        i = self._size
+        for field, kind in FIELDS.items():
+            value = getattr(record, field)
+            self._columns[field][i] = kind.code(value) if isinstance(kind, CategoryTable) else value
+        self._size += 1
+
+    def extend(self, records):
+        """Add several ParticipantRecords"""
+        for record in records:
+            self.append(record)
+
+    def __getitem__(self, i):
+        if not -self._size <= i < self._size:
+            raise IndexError(f"Row {i} out of range for a batch of {self._size}")
+        i %= self._size
+        values = {}
+        for field, kind in FIELDS.items():
+            value = self._columns[field][i]
+            if isinstance(value, np.generic):
+                value = value.item()
+            values[field] = kind.value(value) if isinstance(kind, CategoryTable) else value
+        return ParticipantRecord(**values)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def column(self, field):
+        """
+        Get a field's values (codes for categorical fields) without copying
+
+        Returns:
+            np.ndarray: View of the first len(batch) values
+        """
+        return self._columns[field][:self._size]
+
+    def clear(self):
+        """Drop every row, keeping the allocated arrays"""
+        self._size = 0
+
+    def to_dataframe(self):
+        """
+        Get the batch as a DataFrame built from views of the batch's own arrays
+
+        Categorical fields become pandas categoricals over the shared
+        tables. Depending on the pandas version the frame may share memory
+        with the batch, so it is only valid until the batch is cleared or
+        appended to.
+
+        Returns:
+            pd.DataFrame: One row per record
+        """
+        self._reserve(0)
+        data = {}
+        for field, kind in FIELDS.items():
+            column = self.column(field)
+            if isinstance(kind, CategoryTable):
+                column = pd.Categorical.from_codes(column, categories=list(kind.values))
+            data[field] = column
+        return pd.DataFrame(data, copy=False)
+
+
+def compact_frame(df):
+    """
+    Shrink a parsed participant table: repeated strings become categoricals and integers are narrowed
+
+    Args:
+        df (pd.DataFrame): Table from bulk_parser.participant_rows
+
+    Returns:
+        pd.DataFrame: The same rows with compact dtypes
+    """
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORY_COLUMNS:
+            df[column] = series.astype('category')
+        elif series.dtype == np.int64 and series.between(*INT32_RANGE).all():
+            # Not narrower than int32, so sums like kills + assists can't overflow
+            df[column] = series.astype(np.int32)
+    return df
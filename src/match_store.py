@@ -0,0 +1,253 @@
+"""
+Packed match store
+Keeps raw match documents in compressed, append-only segment files
+"""
+import glob
+import json
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+
+DEFAULT_STORE_PATH = "data/match_data/store"
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+# Each record is: header, match ID bytes, zlib-compressed JSON document
+RECORD_HEADER = struct.Struct("<HI")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    game_creation INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS player_matches (
+    puuid TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    PRIMARY KEY (puuid, match_id)
+) WITHOUT ROWID;
+"""
+
+
+class MatchStore:
+    """
+    Append-only store of raw match documents
+
+    Documents are compressed and appended to numbered segment files. An
+    SQLite index maps each match ID to its (segment, offset, length) for
+    random lookups, and maps every participant's PUUID to their matches so
+    per-player views need no files of their own. Sequential scans read the
+    segments front to back without touching the index.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_PATH, segment_max_bytes=SEGMENT_MAX_BYTES):
+        """
+        Args:
+            root (str): Directory holding the segments and index
+            segment_max_bytes (int): Size at which a new segment is started
+        """
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.executescript(SCHEMA)
+        segments = self.segment_numbers()
+        self._segment = segments[-1] if segments else 0
+        segment_end = self._index.execute(
+            "SELECT COALESCE(MAX(offset + length), 0) FROM matches WHERE segment = ?", (self._segment,)
+        ).fetchone()[0]
+        # Drop anything appended after the last indexed match (a write interrupted by a crash)
+        self._writer = self._open_truncated(self.segment_path(self._segment), segment_end)
+
+    def _open_truncated(self, path, size):
+        writer = open(path, "ab")
+        writer.truncate(size)
+        writer.seek(size)
+        return writer
+
+    def segment_path(self, number):
+        """Path of a segment file"""
+        return os.path.join(self.root, f"segment-{number:06d}.dat")
+
+    def segment_numbers(self):
+        """Sorted numbers of every segment file in the store"""
+        paths = glob.glob(os.path.join(self.root, "segment-*.dat"))
+        return sorted(int(os.path.basename(p)[8:14]) for p in paths)
+
+    def __contains__(self, match_id):
+        with self._lock:
+            row = self._index.execute("SELECT 1 FROM matches WHERE match_id = ?", (match_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._index.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def put(self, match_id, match_data):
+        """
+        Append a match document unless it is already stored
+
+        Args:
+            match_id (str): Match ID (e.g. NA1_5263238906)
+            match_data (dict): Raw match document from match-v5
+
+        Returns:
+            bool: True if the match was written, False if it was already stored
+        """
+        body = zlib.compress(json.dumps(match_data, separators=(",", ":")).encode())
+        key = match_id.encode()
+        record = RECORD_HEADER.pack(len(key), len(body)) + key + body
+        participants = match_data.get("metadata", {}).get("participants", [])
+        game_creation = match_data.get("info", {}).get("gameCreation")
+
+        with self._lock:
+            if self._index.execute("SELECT 1 FROM matches WHERE match_id = ?", (match_id,)).fetchone():
+                return False
+            if self._writer.tell() + len(record) > self.segment_max_bytes and self._writer.tell() > 0:
+                self._writer.close()
+                self._segment += 1
+                self._writer = open(self.segment_path(self._segment), "ab")
+            offset = self._writer.tell()
+            self._writer.write(record)
+            self._writer.flush()
+            with self._index:
+                self._index.execute(
+                    "INSERT INTO matches (match_id, segment, offset, length, game_creation) VALUES (?, ?, ?, ?, ?)",
+                    (match_id, self._segment, offset, len(record), game_creation),
+                )
+                self._index.executemany(
+                    "INSERT OR IGNORE INTO player_matches (puuid, match_id) VALUES (?, ?)",
+                    [(puuid, match_id) for puuid in participants],
+                )
+        return True
+
+    def get_raw(self, match_id):
+        """
+        Get the JSON bytes of a stored match
+
+        Returns:
+            bytes: Uncompressed JSON document, or None if the match is not stored
+        """
+        with self._lock:
+            row = self._index.execute(
+                "SELECT segment, offset, length FROM matches WHERE match_id = ?", (match_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        with open(self.segment_path(segment), "rb") as f:
+            f.seek(offset)
+            record = f.read(length)
+        key_length, _ = RECORD_HEADER.unpack_from(record)
+        return zlib.decompress(record[RECORD_HEADER.size + key_length:])
+
+    def get(self, match_id):
+        """
+        Get a stored match document
+
+        Returns:
+            dict: Match document, or None if the match is not stored
+        """
+        raw = self.get_raw(match_id)
+        return None if raw is None else json.loads(raw)
+
+    def scan_raw(self):
+        """
+        Read every stored match in write order
+
+        Yields:
+            tuple: (match_id, JSON bytes)
+        """
+        for number in self.segment_numbers():
+            with open(self.segment_path(number), "rb", buffering=1024 * 1024) as f:
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    key_length, body_length = RECORD_HEADER.unpack(header)
+                    key = f.read(key_length)
+                    body = f.read(body_length)
+                    if len(body) < body_length:
+                        break  # partial record left by a crash mid-write
+                    yield key.decode(), zlib.decompress(body)
+
+    def scan(self):
+        """
+        Read every stored match document in write order
+
+        Yields:
+            tuple: (match_id, match document)
+        """
+        for match_id, raw in self.scan_raw():
+            yield match_id, json.loads(raw)
+
+    def match_ids(self):
+        """Every stored match ID"""
+        with self._lock:
+            return [row[0] for row in self._index.execute("SELECT match_id FROM matches")]
+
+    def match_ids_for_player(self, puuid):
+        """
+        Get the stored matches a player took part in, newest first
+
+        Args:
+            puuid (str): Player's PUUID
+
+        Returns:
+            list: Match IDs
+        """
+        with self._lock:
+            rows = self._index.execute(
+                "SELECT p.match_id FROM player_matches p JOIN matches m ON m.match_id = p.match_id "
+                "WHERE p.puuid = ? ORDER BY m.game_creation DESC",
+                (puuid,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_json_dir(self, folder):
+        """
+        Pack a folder of <match_id>.json files (the old all_matches layout) into the store
+
+        Args:
+            folder (str): Folder of match JSON files
+
+        Returns:
+            int: Number of matches imported
+        """
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            match_id = os.path.basename(path)[:-len(".json")]
+            if match_id in self:
+                continue
+            with open(path, "r") as f:
+                if self.put(match_id, json.load(f)):
+                    imported += 1
+        return imported
+
+    def import_store(self, other):
+        """
+        Copy every match of another store (e.g. a crawl worker's) that this one doesn't have yet
+
+        Args:
+            other (MatchStore): Store to copy from
+
+        Returns:
+            int: Number of matches imported
+        """
+        imported = 0
+        for match_id, raw in other.scan_raw():
+            if match_id not in self and self.put(match_id, json.loads(raw)):
+                imported += 1
+        return imported
+
+    def close(self):
+        """Flush and close the segment file and index"""
+        with self._lock:
+            self._writer.close()
+            self._index.close()
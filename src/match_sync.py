@@ -0,0 +1,161 @@
+"""
+Incremental match-ID sync
+Remembers how far each player's match list has been read so reruns only fetch new games
+"""
+import sqlite3
+import threading
+import time
+
+from src.api_scraper import REGION_ROUTING
+from src.job_queue import DEFAULT_DB_PATH
+
+# Riot returns at most 100 IDs per call
+PAGE_SIZE = 100
+
+# Games still in progress at sync time only show up once they end, so each
+# forward sync looks back this far before the previous one
+SYNC_OVERLAP_SECONDS = 2 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS match_sync (
+    region TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    last_synced_at INTEGER,
+    last_match_id TEXT,
+    backfill_end_time INTEGER NOT NULL,
+    backfill_offset INTEGER NOT NULL DEFAULT 0,
+    backfill_done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (region, puuid)
+);
+CREATE TABLE IF NOT EXISTS player_match_ids (
+    region TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    PRIMARY KEY (region, puuid, match_id)
+) WITHOUT ROWID;
+"""
+
+
+class MatchSync:
+    """
+    Per-player high-water marks for matches/by-puuid/{puuid}/ids
+
+    Forward syncs ask only for games since the last sync (`startTime`) and
+    stop at the newest match already seen. History older than a player's
+    first sync is backfilled page by page with a fixed `endTime`, so
+    `start` offsets stay stable while new games keep arriving.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, queue=420, match_type="ranked"):
+        """
+        Args:
+            path (str): SQLite database file (default: the crawl database)
+            queue (int): Queue ID to list (default: 420, Ranked Solo 5v5)
+            match_type (str): Match type to list (default: ranked)
+        """
+        self.queue = queue
+        self.match_type = match_type
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _list_ids(self, client, routing, puuid, **params):
+        params.update({"queue": self.queue, "type": self.match_type, "count": PAGE_SIZE})
+        return client.get_json(routing, f"/lol/match/v5/matches/by-puuid/{puuid}/ids", params=params)
+
+    def sync_player(self, client, region, puuid, backfill_pages=0):
+        """
+        Fetch the match IDs a player has played since the last sync
+
+        The first sync of a player reads one page of their most recent
+        games. Raises requests.exceptions.HTTPError if a listing call fails;
+        progress is only saved once every call has succeeded.
+
+        Args:
+            client (RiotClient): Client to send requests through
+            region (str): Platform region (e.g. na1)
+            puuid (str): Player's PUUID
+            backfill_pages (int): Extra pages of older history to read (default: 0)
+
+        Returns:
+            list: Newly seen match IDs, newest first
+        """
+        routing = REGION_ROUTING.get(region, 'americas')
+        now = int(time.time())
+        with self._lock:
+            state = self._conn.execute(
+                "SELECT last_synced_at, last_match_id, backfill_end_time, backfill_offset, backfill_done "
+                "FROM match_sync WHERE region = ? AND puuid = ?",
+                (region, puuid),
+            ).fetchone()
+
+        new_ids = []
+        if state is None:
+            last_synced_at, last_match_id = None, None
+            backfill_end_time, backfill_offset, backfill_done = now, 0, False
+            backfill_pages = max(backfill_pages, 1)
+        else:
+            last_synced_at, last_match_id, backfill_end_time, backfill_offset, backfill_done = state
+            # Page forward through games since the last sync until we reach one we have
+            start = 0
+            while True:
+                page = self._list_ids(client, routing, puuid, start=start,
+                                      startTime=last_synced_at - SYNC_OVERLAP_SECONDS)
+                if last_match_id in page:
+                    new_ids.extend(page[:page.index(last_match_id)])
+                    break
+                new_ids.extend(page)
+                if len(page) < PAGE_SIZE:
+                    break
+                start += PAGE_SIZE
+
+        # Backfill older history below the fixed endTime anchor
+        backfill_ids = []
+        for _ in range(0 if backfill_done else backfill_pages):
+            page = self._list_ids(client, routing, puuid, start=backfill_offset, endTime=backfill_end_time)
+            backfill_ids.extend(page)
+            backfill_offset += len(page)
+            if len(page) < PAGE_SIZE:
+                backfill_done = True
+                break
+
+        if new_ids:
+            last_match_id = new_ids[0]
+        elif state is None and backfill_ids:
+            last_match_id = backfill_ids[0]
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_sync (region, puuid, last_synced_at, last_match_id, "
+                "backfill_end_time, backfill_offset, backfill_done) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (region, puuid, now, last_match_id,
+                 backfill_end_time, backfill_offset, int(backfill_done)),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO player_match_ids (region, puuid, match_id) VALUES (?, ?, ?)",
+                [(region, puuid, match_id) for match_id in new_ids + backfill_ids],
+            )
+        return new_ids + backfill_ids
+
+    def known_match_ids(self, region, puuid):
+        """
+        Get every match ID synced so far for a player, newest first
+
+        Args:
+            region (str): Platform region (e.g. na1)
+            puuid (str): Player's PUUID
+
+        Returns:
+            list: Match IDs
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT match_id FROM player_match_ids WHERE region = ? AND puuid = ?", (region, puuid)
+            ).fetchall()
+        # Match IDs are <PLATFORM>_<sequence>, so the sequence orders them by time
+        return sorted((row[0] for row in rows), key=lambda m: int(m.rsplit('_', 1)[-1]), reverse=True)
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
@@ -0,0 +1,279 @@
+"""
+Pipeline metrics
+Counts requests, latencies, rate limiting, queue depth and match throughput during a crawl
+"""
+import bisect
+import collections
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_PATH = "data/metrics.json"
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Matches/min is measured over this many trailing seconds
+THROUGHPUT_WINDOW = 5 * 60
+
+
+class Histogram:
+    """Counts of observed values per fixed bucket, plus their total"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty or past the last bound)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe store of everything worth watching during a crawl
+
+    The HTTP layer records a latency and status code per endpoint, 429s
+    with their Retry-After, and time spent throttled by the rate limiter.
+    Collection loops record queue depth and saved matches. `snapshot()`
+    returns it all as a dict; `start_reporting()` writes that to a JSON
+    file periodically and can serve it on a local /metrics endpoint.
+    """
+
+    def __init__(self, throughput_window=THROUGHPUT_WINDOW):
+        self.throughput_window = throughput_window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._latency = collections.defaultdict(Histogram)
+        self._statuses = collections.defaultdict(collections.Counter)
+        self._counters = collections.Counter()
+        self._gauges = {}
+        self._match_events = collections.deque()   # (second, matches saved in it)
+        self.alerts = []
+        self._throughput_low = False    # latched while below the floor, so each drop alerts once
+        self._reporter = None
+        self._server = None
+        self._path = DEFAULT_METRICS_PATH
+        self._stop = threading.Event()
+
+    def observe_request(self, method, status, seconds):
+        """Record one API response (status None for a connection error)"""
+        with self._lock:
+            self._latency[method].observe(seconds)
+            self._statuses[method][str(status)] += 1
+            self._counters['requests'] += 1
+
+    def record_rate_limit(self, method, retry_after, limit_type=None):
+        """Record a 429 and the Retry-After it asked for"""
+        with self._lock:
+            self._counters['rate_limited'] += 1
+            self._counters[f"rate_limited.{limit_type or 'unknown'}"] += 1
+            self._counters['retry_after_seconds'] += retry_after
+
+    def add_throttled(self, seconds):
+        """Record time a caller spent waiting for the rate limiter"""
+        if seconds:
+            with self._lock:
+                self._counters['throttled_seconds'] += seconds
+
+    def incr(self, name, amount=1):
+        """Add to a named counter"""
+        with self._lock:
+            self._counters[name] += amount
+
+    def set_gauge(self, name, value):
+        """Set a named value that goes up and down (e.g. queue depth)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def record_matches(self, count=1):
+        """Record matches saved, for the throughput figures"""
+        now = int(time.time())
+        with self._lock:
+            self._counters['matches_saved'] += count
+            if self._match_events and self._match_events[-1][0] == now:
+                self._match_events[-1][1] += count
+            else:
+                self._match_events.append([now, count])
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._match_events and self._match_events[0][0] <= now - self.throughput_window:
+            self._match_events.popleft()
+
+    def matches_per_minute(self):
+        """Matches saved per minute over the trailing throughput window"""
+        now = int(time.time())
+        with self._lock:
+            self._trim(now)
+            recent = sum(count for _, count in self._match_events)
+        window = min(self.throughput_window, max(1.0, time.time() - self.started_at))
+        return recent / window * 60
+
+    def snapshot(self):
+        """
+        Get every metric as a JSON-serialisable dict
+
+        Returns:
+            dict: Uptime, counters, gauges, throughput, per-endpoint latency and status counts
+        """
+        matches_per_minute = self.matches_per_minute()
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'uptime_seconds': time.time() - self.started_at,
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'matches_per_minute': matches_per_minute,
+                'endpoints': {
+                    method: {'latency': histogram.snapshot(), 'statuses': dict(self._statuses[method])}
+                    for method, histogram in self._latency.items()
+                },
+                'alerts': list(self.alerts),
+            }
+
+    def write_snapshot(self, path=DEFAULT_METRICS_PATH):
+        """Write the snapshot to a JSON file, replacing it atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+    def check_throughput(self, min_matches_per_minute):
+        """
+        Raise an alert when throughput drops below a floor
+
+        Only checked once a full throughput window has passed, so a crawl
+        that is still warming up doesn't alert. A drop alerts once; the
+        next alert needs throughput to recover to the floor first.
+
+        Returns:
+            bool: True if throughput is below the floor
+        """
+        if time.time() - self.started_at < self.throughput_window:
+            return False
+        rate = self.matches_per_minute()
+        message = f"Throughput {rate:.1f} matches/min is below {min_matches_per_minute}"
+        # The reporter thread and direct callers may both check; only one of them raises the alert
+        with self._lock:
+            if rate >= min_matches_per_minute:
+                self._throughput_low = False
+                return False
+            if self._throughput_low:
+                return True
+            self._throughput_low = True
+            self.alerts = (self.alerts + [{'timestamp': time.time(), 'message': message}])[-20:]
+        print(f"⚠️ {message}")
+        return True
+
+    def start_reporting(self, path=DEFAULT_METRICS_PATH, interval=30, port=None, min_matches_per_minute=None):
+        """
+        Write snapshots every `interval` seconds on a background thread
+
+        Args:
+            path (str): Snapshot file (default: data/metrics.json)
+            interval (float): Seconds between snapshots (default: 30)
+            port (int): Also serve the snapshot at http://127.0.0.1:<port>/metrics (default: off)
+            min_matches_per_minute (float): Alert when throughput drops below this (default: off)
+        """
+        self._stop.clear()
+        self._path = path
+
+        def report():
+            while not self._stop.wait(interval):
+                if min_matches_per_minute is not None:
+                    self.check_throughput(min_matches_per_minute)
+                self.write_snapshot(path)
+
+        self._reporter = threading.Thread(target=report, daemon=True)
+        self._reporter.start()
+        if port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop_reporting(self):
+        """Stop the background reporter and write one last snapshot"""
+        self._stop.set()
+        if self._reporter is not None:
+            self._reporter.join()
+            self._reporter = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.write_snapshot(self._path)
+
+    def _handler_class(self):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot(), indent=2).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+# Metrics shared by every caller in this process
+default_metrics = Metrics()
+
+
+def start_reporting_from_env(metrics=None):
+    """
+    Start reporting as configured by METRICS_PATH, METRICS_INTERVAL,
+    METRICS_PORT and MIN_MATCHES_PER_MINUTE
+
+    Returns:
+        Metrics: The metrics being reported
+    """
+    metrics = metrics or default_metrics
+    port = os.getenv("METRICS_PORT")
+    floor = os.getenv("MIN_MATCHES_PER_MINUTE")
+    return metrics.start_reporting(
+        path=os.getenv("METRICS_PATH", DEFAULT_METRICS_PATH),
+        interval=float(os.getenv("METRICS_INTERVAL", "30")),
+        port=int(port) if port else None,
+        min_matches_per_minute=float(floor) if floor else None,
+    )
@@ -0,0 +1,626 @@
+"""
+Local mock of the Riot API
+Serves synthetic league-v4, summoner-v4 and match-v5 (match and timeline) responses with Riot-style rate limiting
+"""
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.rate_limiter import endpoint_for, parse_rate_limits
+
+# Limits the mock enforces unless told otherwise (a development key's)
+MOCK_APP_LIMITS = "20:1,100:120"
+MOCK_METHOD_LIMITS = {
+    'league-v4.getChallengerLeague': "30:10,500:600",
+    'league-v4.getGrandmasterLeague': "30:10,500:600",
+    'league-v4.getMasterLeague': "30:10,500:600",
+    'summoner-v4.getBySummonerId': "1600:60",
+    'summoner-v4.getByPUUID': "1600:60",
+    'account-v1.getByRiotId': "1000:60",
+    'match-v5.getMatchIdsByPUUID': "2000:10",
+    'match-v5.getMatch': "2000:10",
+    'match-v5.getTimeline': "2000:10",
+}
+
+# Matches are spread over this many seconds before the server started
+HISTORY_SECONDS = 30 * 24 * 60 * 60
+
+CHAMPIONS = [
+    (266, "Aatrox"), (103, "Ahri"), (84, "Akali"), (12, "Alistar"), (32, "Amumu"),
+    (22, "Ashe"), (53, "Blitzcrank"), (63, "Brand"), (51, "Caitlyn"), (69, "Cassiopeia"),
+    (122, "Darius"), (119, "Draven"), (81, "Ezreal"), (114, "Fiora"), (86, "Garen"),
+    (39, "Irelia"), (202, "Jhin"), (222, "Jinx"), (145, "Kaisa"), (64, "LeeSin"),
+    (99, "Lux"), (21, "MissFortune"), (25, "Morgana"), (111, "Nautilus"), (555, "Pyke"),
+    (412, "Thresh"), (4, "TwistedFate"), (67, "Vayne"), (157, "Yasuo"), (238, "Zed"),
+]
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+# Integer stats every participant carries, with the upper bound of their random value
+PARTICIPANT_STATS = {
+    'allInPings': 5, 'assistMePings': 10, 'assists': 25, 'baronKills': 2, 'basicPings': 5,
+    'bountyLevel': 5, 'champExperience': 20000, 'champLevel': 18, 'championTransform': 0,
+    'commandPings': 20, 'consumablesPurchased': 15, 'damageDealtToBuildings': 15000,
+    'damageDealtToObjectives': 40000, 'damageDealtToTurrets': 12000, 'damageSelfMitigated': 50000,
+    'dangerPings': 5, 'deaths': 15, 'detectorWardsPlaced': 10, 'doubleKills': 4,
+    'dragonKills': 4, 'enemyMissingPings': 15, 'enemyVisionPings': 10, 'getBackPings': 10,
+    'goldEarned': 20000, 'goldSpent': 19000, 'holdPings': 5, 'inhibitorKills': 2,
+    'inhibitorTakedowns': 3, 'inhibitorsLost': 3, 'item0': 7000, 'item1': 7000, 'item2': 7000,
+    'item3': 7000, 'item4': 7000, 'item5': 7000, 'item6': 3400, 'itemsPurchased': 40,
+    'killingSprees': 5, 'kills': 20, 'largestCriticalStrike': 1500, 'largestKillingSpree': 10,
+    'largestMultiKill': 4, 'longestTimeSpentLiving': 1500, 'magicDamageDealt': 150000,
+    'magicDamageDealtToChampions': 40000, 'magicDamageTaken': 30000, 'needVisionPings': 10,
+    'neutralMinionsKilled': 250, 'nexusKills': 1, 'nexusLost': 1, 'nexusTakedowns': 1,
+    'objectivesStolen': 1, 'objectivesStolenAssists': 1, 'onMyWayPings': 15, 'pentaKills': 1,
+    'physicalDamageDealt': 250000, 'physicalDamageDealtToChampions': 40000,
+    'physicalDamageTaken': 40000, 'profileIcon': 6000, 'pushPings': 5, 'quadraKills': 1,
+    'sightWardsBoughtInGame': 0, 'spell1Casts': 300, 'spell2Casts': 200, 'spell3Casts': 200,
+    'spell4Casts': 50, 'summoner1Casts': 10, 'summoner1Id': 32, 'summoner2Casts': 10,
+    'summoner2Id': 14, 'summonerLevel': 800, 'timeCCingOthers': 100, 'timePlayed': 2400,
+    'totalAllyJungleMinionsKilled': 200, 'totalDamageDealt': 300000,
+    'totalDamageDealtToChampions': 60000, 'totalDamageShieldedOnTeammates': 15000,
+    'totalDamageTaken': 60000, 'totalEnemyJungleMinionsKilled': 50, 'totalHeal': 30000,
+    'totalHealsOnTeammates': 15000, 'totalMinionsKilled': 350, 'totalTimeCCDealt': 1500,
+    'totalTimeSpentDead': 600, 'totalUnitsHealed': 10, 'tripleKills': 2, 'trueDamageDealt': 40000,
+    'trueDamageDealtToChampions': 8000, 'trueDamageTaken': 5000, 'turretKills': 5,
+    'turretTakedowns': 8, 'turretsLost': 11, 'unrealKills': 0, 'visionClearedPings': 5,
+    'visionScore': 150, 'visionWardsBoughtInGame': 15, 'wardsKilled': 30, 'wardsPlaced': 80,
+}
+
+# Numeric fields of a participant's `challenges` block
+CHALLENGE_STATS = [
+    '12AssistStreakCount', 'abilityUses', 'acesBefore15Minutes', 'alliedJungleMonsterKills',
+    'baronTakedowns', 'blastConeOppositeOpponentCount', 'bountyGold', 'buffsStolen',
+    'completeSupportQuestInTime', 'controlWardsPlaced', 'damagePerMinute',
+    'damageTakenOnTeamPercentage', 'dancedWithRiftHerald', 'deathsByEnemyChamps',
+    'dodgeSkillShotsSmallWindow', 'doubleAces', 'dragonTakedowns', 'effectiveHealAndShielding',
+    'elderDragonKillsWithOpposingSoul', 'enemyChampionImmobilizations', 'enemyJungleMonsterKills',
+    'epicMonsterKillsNearEnemyJungler', 'epicMonsterSteals', 'firstTurretKilled', 'flawlessAces',
+    'fullTeamTakedown', 'gameLength', 'goldPerMinute', 'hadOpenNexus', 'immobilizeAndKillWithAlly',
+    'initialBuffCount', 'initialCrabCount', 'jungleCsBefore10Minutes', 'junglerTakedownsNearDamagedEpicMonster',
+    'kTurretsDestroyedBeforePlatesFall', 'kda', 'killAfterHiddenWithAlly', 'killParticipation',
+    'killedChampTookFullTeamDamageSurvived', 'killingSprees', 'killsNearEnemyTurret',
+    'killsOnOtherLanesEarlyJungleAsLaner', 'killsUnderOwnTurret', 'landSkillShotsEarlyGame',
+    'laneMinionsFirst10Minutes', 'lostAnInhibitor', 'maxKillDeficit', 'moreEnemyJungleThanOpponent',
+    'multiKillOneSpell', 'multikills', 'outnumberedKills', 'perfectDragonSoulsTaken', 'pickKillWithAlly',
+    'quickCleanse', 'quickFirstTurret', 'quickSoloKills', 'riftHeraldTakedowns', 'saveAllyFromDeath',
+    'scuttleCrabKills', 'skillshotsDodged', 'skillshotsHit', 'soloBaronKills', 'soloKills',
+    'stealthWardsPlaced', 'survivedSingleDigitHpCount', 'takedownOnFirstTurret', 'takedowns',
+    'takedownsAfterGainingLevelAdvantage', 'takedownsBeforeJungleMinionSpawn',
+    'takedownsFirstXMinutes', 'takedownsInAlcove', 'takedownsInEnemyFountain', 'teamBaronKills',
+    'teamDamagePercentage', 'teamElderDragonKills', 'teamRiftHeraldKills', 'turretPlatesTaken',
+    'turretTakedowns', 'turretsTakenWithRiftHerald', 'twentyMinionsIn3SecondsCount',
+    'unseenRecalls', 'visionScoreAdvantageLaneOpponent', 'visionScorePerMinute', 'wardTakedowns',
+    'wardTakedownsBefore20M', 'wardsGuarded',
+]
+
+ROUTES = [
+    (re.compile(r'^/riot/account/v1/accounts/by-riot-id/([^/]+)/([^/]+)$'), 'account'),
+    (re.compile(r'^/lol/league/v4/(challenger|grandmaster|master)leagues/by-queue/([^/]+)$'), 'league'),
+    (re.compile(r'^/lol/summoner/v4/summoners/by-puuid/([^/]+)$'), 'summoner_by_puuid'),
+    (re.compile(r'^/lol/summoner/v4/summoners/([^/]+)$'), 'summoner'),
+    (re.compile(r'^/lol/match/v5/matches/by-puuid/([^/]+)/ids$'), 'match_ids'),
+    (re.compile(r'^/lol/match/v5/matches/([^/]+)/timeline$'), 'timeline'),
+    (re.compile(r'^/lol/match/v5/matches/([^/]+)$'), 'match'),
+]
+
+LEAGUE_SIZES = {'challenger': 300, 'grandmaster': 700, 'master': 4000}
+
+
+def _seeded(*parts):
+    """Random generator that gives the same values for the same inputs"""
+    return random.Random(zlib.crc32("|".join(str(p) for p in parts).encode()))
+
+
+class FixedWindows:
+    """Counts requests in Riot-style fixed windows for one key"""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.windows = {}   # window seconds -> [started_at, count]
+
+    def hit(self, now):
+        """
+        Count a request if every window allows it
+
+        Returns:
+            float: 0 if the request was counted, else seconds until it would be
+        """
+        retry_after = 0.0
+        for limit, window in self.limits:
+            started, count = self.windows.get(window, (float('-inf'), 0))
+            if now - started < window and count >= limit:
+                retry_after = max(retry_after, started + window - now)
+        if retry_after:
+            return retry_after
+        for limit, window in self.limits:
+            started, count = self.windows.get(window, (float('-inf'), 0))
+            if now - started >= window:
+                started, count = now, 0
+            self.windows[window] = [started, count + 1]
+        return 0.0
+
+    def header(self):
+        return ",".join(f"{limit}:{window}" for limit, window in self.limits)
+
+    def count_header(self, now):
+        counts = []
+        for _, window in self.limits:
+            started, count = self.windows.get(window, (float('-inf'), 0))
+            counts.append(f"{count if now - started < window else 0}:{window}")
+        return ",".join(counts)
+
+
+class MockRiotAPI:
+    """
+    Synthetic player base and the responses it produces
+
+    Every platform shares one universe of `players` players, who play
+    `matches` games between them. Documents are generated on demand from
+    the match number, so the same ID always returns the same body.
+    """
+
+    def __init__(self, players=3000, matches=30000, seed=0):
+        """
+        Args:
+            players (int): Number of players in the universe (default: 3000)
+            matches (int): Number of matches they have played (default: 30000)
+            seed (int): Seed for who plays which match (default: 0)
+        """
+        self.players = players
+        self.matches = matches
+        self.started_at = int(time.time())
+        self.puuids = [self._puuid(i) for i in range(players)]
+        self.player_numbers = {puuid: i for i, puuid in enumerate(self.puuids)}
+        rng = random.Random(seed)
+        self.participants = [rng.sample(range(players), 10) for _ in range(matches)]
+        self.player_matches = [[] for _ in range(players)]
+        # Higher match numbers are newer, so lists are built newest first
+        for number in range(matches - 1, -1, -1):
+            for player in self.participants[number]:
+                self.player_matches[player].append(number)
+
+    def _puuid(self, number):
+        return hashlib.sha256(f"mock-player-{number}".encode()).hexdigest()
+
+    def summoner_id(self, number):
+        return f"mock-summoner-{number}"
+
+    def riot_id(self, number):
+        """Riot ID (gameName, tagLine) of a player"""
+        return f"MockPlayer{number}", "MOCK"
+
+    def account(self, number):
+        game_name, tag_line = self.riot_id(number)
+        return {'puuid': self.puuids[number], 'gameName': game_name, 'tagLine': tag_line}
+
+    def game_creation(self, number):
+        """Start of a match in epoch milliseconds"""
+        return (self.started_at - HISTORY_SECONDS + number * HISTORY_SECONDS // self.matches) * 1000
+
+    def match_number(self, match_id):
+        platform, _, sequence = match_id.partition("_")
+        if not sequence.isdigit():
+            return None
+        number = int(sequence) - 5000000000
+        return number if 0 <= number < self.matches else None
+
+    def league(self, tier, queue):
+        rng = _seeded("league", tier, queue)
+        size = min(LEAGUE_SIZES[tier], self.players)
+        offset = {'challenger': 0, 'grandmaster': 300, 'master': 1000}[tier] % self.players
+        entries = []
+        for i in range(size):
+            number = (offset + i) % self.players
+            wins = rng.randint(100, 400)
+            entries.append({
+                'summonerId': self.summoner_id(number),
+                'puuid': self.puuids[number],
+                'leaguePoints': rng.randint(0, 2000),
+                'rank': 'I',
+                'wins': wins,
+                'losses': wins - rng.randint(-20, 60),
+                'veteran': rng.random() < 0.3,
+                'inactive': False,
+                'freshBlood': rng.random() < 0.1,
+                'hotStreak': rng.random() < 0.2,
+            })
+        return {'tier': tier.upper(), 'leagueId': f"mock-league-{tier}", 'queue': queue,
+                'name': f"Mock {tier.title()}s", 'entries': entries}
+
+    def summoner(self, number):
+        rng = _seeded("summoner", number)
+        return {
+            'id': self.summoner_id(number),
+            'accountId': f"mock-account-{number}",
+            'puuid': self.puuids[number],
+            'profileIconId': rng.randint(1, 6000),
+            'revisionDate': (self.started_at - rng.randint(0, 86400)) * 1000,
+            'summonerLevel': rng.randint(30, 900),
+        }
+
+    def match_ids(self, number, query):
+        start_time = int(query.get('startTime', 0))
+        end_time = int(query.get('endTime', 2 ** 40))
+        ids = [self.match_id(m) for m in self.player_matches[number]
+               if start_time <= self.game_creation(m) // 1000 <= end_time]
+        start = int(query.get('start', 0))
+        count = min(int(query.get('count', 20)), 100)
+        return ids[start:start + count]
+
+    def match_id(self, number):
+        return f"NA1_{5000000000 + number}"
+
+    def match(self, number):
+        rng = _seeded("match", number)
+        duration = rng.randint(900, 2700)
+        creation = self.game_creation(number)
+        winner = rng.choice([100, 200])
+        puuids = [self.puuids[p] for p in self.participants[number]]
+        participants = []
+        for slot, player in enumerate(self.participants[number]):
+            team_id = 100 if slot < 5 else 200
+            champion_id, champion_name = rng.choice(CHAMPIONS)
+            participant = {name: rng.randint(0, high) for name, high in PARTICIPANT_STATS.items()}
+            participant.update({
+                'championId': champion_id,
+                'championName': champion_name,
+                'individualPosition': POSITIONS[slot % 5],
+                'teamPosition': POSITIONS[slot % 5],
+                'lane': POSITIONS[slot % 5],
+                'role': 'SOLO',
+                'participantId': slot + 1,
+                'puuid': self.puuids[player],
+                'riotIdGameName': f"Mock Player {player}",
+                'riotIdTagline': 'MOCK',
+                'summonerId': self.summoner_id(player),
+                'summonerName': f"Mock Player {player}",
+                'teamId': team_id,
+                'win': team_id == winner,
+                'firstBloodKill': False,
+                'firstTowerKill': False,
+                'gameEndedInEarlySurrender': False,
+                'gameEndedInSurrender': rng.random() < 0.3,
+                'teamEarlySurrendered': False,
+                'eligibleForProgression': True,
+                'challenges': {name: round(rng.random() * 100, 6) for name in CHALLENGE_STATS},
+                'perks': {
+                    'statPerks': {'defense': 5001, 'flex': 5008, 'offense': 5005},
+                    'styles': [
+                        {'description': 'primaryStyle', 'style': 8000, 'selections': [
+                            {'perk': 8000 + rng.randint(0, 99), 'var1': rng.randint(0, 3000),
+                             'var2': rng.randint(0, 100), 'var3': 0} for _ in range(4)]},
+                        {'description': 'subStyle', 'style': 8100, 'selections': [
+                            {'perk': 8100 + rng.randint(0, 99), 'var1': rng.randint(0, 3000),
+                             'var2': 0, 'var3': 0} for _ in range(2)]},
+                    ],
+                },
+            })
+            participants.append(participant)
+        teams = [{
+            'teamId': team_id,
+            'win': team_id == winner,
+            'bans': [{'championId': rng.choice(CHAMPIONS)[0], 'pickTurn': i + 1} for i in range(5)],
+            'objectives': {name: {'first': rng.random() < 0.5, 'kills': rng.randint(0, 11)}
+                           for name in ('baron', 'champion', 'dragon', 'horde', 'inhibitor',
+                                        'riftHerald', 'tower')},
+        } for team_id in (100, 200)]
+        return {
+            'metadata': {'dataVersion': '2', 'matchId': self.match_id(number), 'participants': puuids},
+            'info': {
+                'endOfGameResult': 'GameComplete',
+                'gameCreation': creation,
+                'gameDuration': duration,
+                'gameEndTimestamp': creation + (duration + 60) * 1000,
+                'gameId': 5000000000 + number,
+                'gameMode': 'CLASSIC',
+                'gameName': f"teambuilder-match-{5000000000 + number}",
+                'gameStartTimestamp': creation + 60000,
+                'gameType': 'MATCHED_GAME',
+                'gameVersion': f"14.{1 + number * 24 // self.matches}.{rng.randint(100, 999)}.1234",
+                'mapId': 11,
+                'participants': participants,
+                'platformId': 'NA1',
+                'queueId': 420,
+                'teams': teams,
+                'tournamentCode': '',
+            },
+        }
+
+    def timeline(self, number):
+        rng = _seeded("timeline", number)
+        duration = _seeded("match", number).randint(900, 2700)
+        players = self.participants[number]
+        totals = [[0, 0, 0] for _ in players]   # gold, xp, minions per participant
+        frames = []
+        for minute in range(duration // 60 + 2):
+            participant_frames = {}
+            for slot, stats in enumerate(totals):
+                if minute:
+                    stats[0] += rng.randint(250, 550)
+                    stats[1] += rng.randint(250, 600)
+                    stats[2] += rng.randint(0, 10)
+                participant_frames[str(slot + 1)] = {
+                    'championStats': {name: rng.randint(0, 3000) for name in (
+                        'abilityHaste', 'abilityPower', 'armor', 'armorPen', 'armorPenPercent',
+                        'attackDamage', 'attackSpeed', 'bonusArmorPenPercent', 'bonusMagicPenPercent',
+                        'ccReduction', 'cooldownReduction', 'health', 'healthMax', 'healthRegen',
+                        'lifesteal', 'magicPen', 'magicPenPercent', 'magicResist', 'movementSpeed',
+                        'omnivamp', 'physicalVamp', 'power', 'powerMax', 'powerRegen', 'spellVamp')},
+                    'currentGold': rng.randint(0, 3000),
+                    'damageStats': {name: rng.randint(0, 50000) * minute // 30 for name in (
+                        'magicDamageDone', 'magicDamageDoneToChampions', 'magicDamageTaken',
+                        'physicalDamageDone', 'physicalDamageDoneToChampions', 'physicalDamageTaken',
+                        'totalDamageDone', 'totalDamageDoneToChampions', 'totalDamageTaken',
+                        'trueDamageDone', 'trueDamageDoneToChampions', 'trueDamageTaken')},
+                    'goldPerSecond': 0 if minute == 0 else 2,
+                    'jungleMinionsKilled': stats[2] // 8,
+                    'level': min(18, 1 + stats[1] // 1000),
+                    'minionsKilled': stats[2],
+                    'participantId': slot + 1,
+                    'position': {'x': rng.randint(0, 14870), 'y': rng.randint(0, 14980)},
+                    'timeEnemySpentControlled': rng.randint(0, 200) * minute,
+                    'totalGold': 500 + stats[0],
+                    'xp': stats[1],
+                }
+            events = []
+            for _ in range(rng.randint(20, 45) if minute else 1):
+                kind = rng.choice(('ITEM_PURCHASED', 'SKILL_LEVEL_UP', 'WARD_PLACED', 'CHAMPION_KILL',
+                                   'ELITE_MONSTER_KILL', 'BUILDING_KILL', 'LEVEL_UP', 'ITEM_DESTROYED'))
+                event = {'type': kind, 'timestamp': minute * 60000 + rng.randint(0, 59999)}
+                if kind in ('ITEM_PURCHASED', 'ITEM_DESTROYED'):
+                    event.update({'participantId': rng.randint(1, 10), 'itemId': rng.randint(1000, 7000)})
+                elif kind in ('SKILL_LEVEL_UP', 'LEVEL_UP'):
+                    event.update({'participantId': rng.randint(1, 10), 'skillSlot': rng.randint(1, 4),
+                                  'levelUpType': 'NORMAL', 'level': rng.randint(2, 18)})
+                elif kind == 'WARD_PLACED':
+                    event.update({'creatorId': rng.randint(1, 10),
+                                  'wardType': rng.choice(('YELLOW_TRINKET', 'CONTROL_WARD', 'SIGHT_WARD'))})
+                elif kind == 'CHAMPION_KILL':
+                    event.update({'killerId': rng.randint(1, 10), 'victimId': rng.randint(1, 10),
+                                  'assistingParticipantIds': rng.sample(range(1, 11), 2),
+                                  'bounty': 300, 'killStreakLength': 0, 'shutdownBounty': 0,
+                                  'position': {'x': rng.randint(0, 14870), 'y': rng.randint(0, 14980)}})
+                elif kind == 'ELITE_MONSTER_KILL':
+                    event.update({'killerId': rng.randint(1, 10), 'killerTeamId': rng.choice((100, 200)),
+                                  'monsterType': rng.choice(('DRAGON', 'BARON_NASHOR', 'RIFTHERALD')),
+                                  'position': {'x': 9866, 'y': 4414}})
+                else:
+                    event.update({'killerId': rng.randint(0, 10), 'teamId': rng.choice((100, 200)),
+                                  'buildingType': 'TOWER_BUILDING', 'laneType': 'MID_LANE',
+                                  'towerType': 'OUTER_TURRET', 'position': {'x': 5846, 'y': 6396}})
+                events.append(event)
+            frames.append({'events': sorted(events, key=lambda e: e['timestamp']),
+                           'participantFrames': participant_frames, 'timestamp': minute * 60000})
+        return {
+            'metadata': {'dataVersion': '2', 'matchId': self.match_id(number),
+                         'participants': [self.puuids[p] for p in players]},
+            'info': {
+                'endOfGameResult': 'GameComplete',
+                'frameInterval': 60000,
+                'frames': frames,
+                'gameId': 5000000000 + number,
+                'participants': [{'participantId': slot + 1, 'puuid': self.puuids[p]}
+                                 for slot, p in enumerate(players)],
+            },
+        }
+
+    def respond(self, path, query):
+        """
+        Build the response for an API path
+
+        Returns:
+            tuple: (status, body) where body is JSON-serialisable
+        """
+        for pattern, route in ROUTES:
+            found = pattern.match(path)
+            if not found:
+                continue
+            if route == 'league':
+                return 200, self.league(found.group(1), found.group(2))
+            if route == 'account':
+                game_name, tag_line = unquote(found.group(1)), unquote(found.group(2))
+                number = game_name[len("MockPlayer"):]
+                if game_name.startswith("MockPlayer") and tag_line == "MOCK" and number.isdigit() \
+                        and int(number) < self.players:
+                    return 200, self.account(int(number))
+            elif route == 'summoner':
+                number = found.group(1).rpartition('-')[2]
+                if number.isdigit() and int(number) < self.players:
+                    return 200, self.summoner(int(number))
+            elif route == 'summoner_by_puuid':
+                if found.group(1) in self.player_numbers:
+                    return 200, self.summoner(self.player_numbers[found.group(1)])
+            elif route == 'match_ids':
+                if found.group(1) in self.player_numbers:
+                    return 200, self.match_ids(self.player_numbers[found.group(1)], query)
+            elif route in ('match', 'timeline'):
+                number = self.match_number(found.group(1))
+                if number is not None:
+                    return 200, getattr(self, route)(number)
+            return 404, {'status': {'message': 'Data not found', 'status_code': 404}}
+        return 404, {'status': {'message': 'Not found', 'status_code': 404}}
+
+
+class MockRiotServer:
+    """
+    HTTP server in front of MockRiotAPI
+
+    URLs look like http://127.0.0.1:<port>/<host>/lol/..., so pointing
+    RIOT_API_URL_TEMPLATE at http://127.0.0.1:<port>/{host} sends a
+    RiotClient here. Each request sleeps for a random latency, then is
+    counted against Riot-style application limits (per token and host) and
+    method limits (per token, host and method); requests over a limit get
+    a 429 with Retry-After and X-Rate-Limit-Type. Counters of what was
+    served are kept in `stats` and returned by GET /_stats.
+    """
+
+    def __init__(self, api=None, port=0, latency=0.08, jitter=0.03,
+                 app_limits=MOCK_APP_LIMITS, method_limits=None, error_rate=0.0, rejected_keys=()):
+        """
+        Args:
+            api (MockRiotAPI): Synthetic data to serve (default: MockRiotAPI())
+            port (int): Port to listen on; 0 picks a free one (default: 0)
+            latency (float): Mean seconds each response takes (default: 0.08)
+            jitter (float): Standard deviation of the latency (default: 0.03)
+            app_limits (str): Application limits, e.g. "20:1,100:120"
+            method_limits (dict): Method name -> limits string (default: MOCK_METHOD_LIMITS)
+            error_rate (float): Fraction of requests answered with a 500 (default: 0)
+            rejected_keys (iterable): API keys answered with a 403, like a revoked key (default: none)
+        """
+        self.api = api or MockRiotAPI()
+        self.latency = latency
+        self.jitter = jitter
+        self.app_limits = parse_rate_limits(app_limits)
+        self.method_limits = {name: parse_rate_limits(value)
+                              for name, value in (method_limits or MOCK_METHOD_LIMITS).items()}
+        self.error_rate = error_rate
+        self.rejected_keys = set(rejected_keys)
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'bytes': 0}
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url_template(self):
+        """Value for RIOT_API_URL_TEMPLATE"""
+        return f"http://127.0.0.1:{self.port}/{{host}}"
+
+    def _limit(self, token, host, method):
+        """Count a request; returns (retry_after, limit_type, headers)"""
+        with self._lock:
+            now = time.monotonic()
+            app = self._windows.setdefault((token, host), FixedWindows(self.app_limits))
+            method_windows = self._windows.setdefault(
+                (token, host, method), FixedWindows(self.method_limits.get(method, [])))
+            retry_after, limit_type = method_windows.hit(now), 'method'
+            if not retry_after:
+                retry_after, limit_type = app.hit(now), 'application'
+                if retry_after:
+                    # Riot doesn't count a rejected request against the method either
+                    for window in method_windows.windows.values():
+                        window[1] -= 1
+            headers = {
+                'X-App-Rate-Limit': app.header(),
+                'X-App-Rate-Limit-Count': app.count_header(now),
+                'X-Method-Rate-Limit': method_windows.header(),
+                'X-Method-Rate-Limit-Count': method_windows.count_header(now),
+            }
+            self.stats['requests'] += 1
+        return retry_after, limit_type, headers
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == '/_stats':
+                    with server._lock:
+                        stats = dict(server.stats)
+                    return self._send(200, stats, record=False)
+                _, host, path = parts.path.split('/', 2) if parts.path.count('/') >= 2 else ('', '', '')
+                path = '/' + path
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                token = self.headers.get('X-Riot-Token')
+                if not token:
+                    return self._send(401, {'status': {'message': 'Unauthorized', 'status_code': 401}})
+                if token in server.rejected_keys:
+                    return self._send(403, {'status': {'message': 'Forbidden', 'status_code': 403}})
+
+                time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+                retry_after, limit_type, headers = server._limit(token, host, endpoint_for(path)[1])
+                if retry_after:
+                    headers.update({'Retry-After': str(max(1, round(retry_after))),
+                                    'X-Rate-Limit-Type': limit_type})
+                    with server._lock:
+                        server.stats['rate_limited'] += 1
+                    return self._send(429, {'status': {'message': 'Rate limit exceeded',
+                                                       'status_code': 429}}, headers)
+                if server.error_rate and random.random() < server.error_rate:
+                    with server._lock:
+                        server.stats['errors'] += 1
+                    return self._send(500, {'status': {'message': 'Internal server error',
+                                                       'status_code': 500}}, headers)
+                status, body = server.api.respond(path, query)
+                self._send(status, body, headers)
+
+            def _send(self, status, body, headers=None, record=True):
+                data = json.dumps(body).encode()
+                extra = dict(headers or {})
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    data = gzip.compress(data, compresslevel=1)
+                    extra['Content-Encoding'] = 'gzip'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+                if not record:
+                    return
+                with server._lock:
+                    server.stats['bytes'] += len(data)
+                    if status == 200:
+                        server.stats['ok'] += 1
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the Riot API")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--players", type=int, default=3000)
+    parser.add_argument("--matches", type=int, default=30000)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--jitter", type=float, default=0.03)
+    parser.add_argument("--app-limits", default=MOCK_APP_LIMITS)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockRiotServer(MockRiotAPI(args.players, args.matches), port=args.port,
+                            latency=args.latency, jitter=args.jitter,
+                            app_limits=args.app_limits, error_rate=args.error_rate)
+    print(f"🧪 Mock Riot API on http://127.0.0.1:{server.port}")
+    print(f"   export RIOT_API_URL_TEMPLATE={server.url_template}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,167 @@
+"""
+Pipelined collector
+Runs ladder -> PUUID -> match IDs -> match download as concurrent stages joined by bounded queues
+"""
+import queue
+import threading
+import time
+
+import requests
+
+from src.api_scraper import REGION_ROUTING
+from src.crawler import PERMANENT_STATUSES, download_queued_matches, resolve_ladder_puuids
+from src.job_queue import KIND_MATCH, KIND_MATCH_IDS
+from src.ladder import LadderSnapshots
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Streams work from each collection stage to the next
+
+    Stages run on their own threads and hand work on through bounded
+    in-process queues instead of CSV files, so match listing starts with
+    the first resolved PUUID and downloads start with the first ID list.
+    Every stage sends through one client and so shares one rate limit
+    budget; a full queue makes the stage before it wait rather than run
+    ahead. Job states are still recorded in the crawl job table, so
+    failed downloads are retried at the end and a rerun skips finished
+    work.
+    """
+
+    def __init__(self, client, region, jobs, sync, store, max_in_flight=8,
+                 listing_workers=2, queue_size=1000, backfill_pages=0, ladder=None):
+        """
+        Args:
+            client (RiotClient): Client every stage sends through
+            region (str): Platform region (e.g. na1)
+            jobs (JobQueue): Crawl job table
+            sync (MatchSync): Per-player high-water marks
+            store (MatchStore): Store downloaded matches are written to
+            max_in_flight (int): Concurrent match downloads (default: 8)
+            listing_workers (int): Threads listing match IDs (default: 2)
+            queue_size (int): Capacity of each hand-off queue (default: 1000)
+            backfill_pages (int): Pages of older history to list per player (default: 0)
+            ladder (LadderSnapshots): Ladder history to snapshot into (default: the crawl database's)
+        """
+        self.client = client
+        self.region = region
+        self.routing = REGION_ROUTING.get(region, 'americas')
+        self.jobs = jobs
+        self.sync = sync
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.listing_workers = listing_workers
+        self.backfill_pages = backfill_pages
+        self.ladder = ladder
+        self.puuids = queue.Queue(maxsize=queue_size)
+        self.match_ids = queue.Queue(maxsize=queue_size)
+        self.counts = {'players': 0, 'new_match_ids': 0, 'matches_saved': 0, 'failed': 0}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def _report_depth(self):
+        metrics = self.client.metrics
+        metrics.set_gauge(f"pipeline.{self.region}.puuid_queue", self.puuids.qsize())
+        metrics.set_gauge(f"pipeline.{self.region}.match_queue", self.match_ids.qsize())
+
+    def resolve_players(self):
+        """Stage 1: snapshot the apex ladder and emit each player's PUUID"""
+        ladder = LadderSnapshots() if self.ladder is None else self.ladder
+        try:
+            puuids = resolve_ladder_puuids(self.client, self.region, self.jobs, ladder)
+            for puuid in puuids:
+                self._count('players')
+                self.puuids.put(puuid)
+                self._report_depth()
+        except requests.exceptions.RequestException as e:
+            print(f"[{self.region}] ❌ Failed to read the ladder: {e}")
+        finally:
+            if self.ladder is None:
+                ladder.close()
+            for _ in range(self.listing_workers):
+                self.puuids.put(_DONE)
+
+    def list_matches(self):
+        """Stage 2: list each player's new match IDs and emit the ones not stored yet"""
+        while True:
+            puuid = self.puuids.get()
+            if puuid is _DONE:
+                return
+            self.jobs.enqueue(KIND_MATCH_IDS, self.region, puuid, reset=True)
+            try:
+                match_ids = self.sync.sync_player(self.client, self.region, puuid, backfill_pages=self.backfill_pages)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                self.jobs.fail(KIND_MATCH_IDS, self.region, puuid, f"Status {status}",
+                               retry=status not in PERMANENT_STATUSES)
+                continue
+            except requests.exceptions.RequestException as e:
+                self.jobs.fail(KIND_MATCH_IDS, self.region, puuid, str(e))
+                continue
+            self.jobs.complete(KIND_MATCH_IDS, self.region, puuid, result=match_ids)
+            with self._lock:
+                new_ids = [m for m in match_ids if m not in self._seen]
+                self._seen.update(new_ids)
+            new_ids = [m for m in new_ids if m not in self.store]
+            self.jobs.enqueue_many(KIND_MATCH, self.region, new_ids)
+            self._count('new_match_ids', len(new_ids))
+            for match_id in new_ids:
+                self.match_ids.put(match_id)
+            self._report_depth()
+
+    def download_matches(self):
+        """Stage 3: download matches as their IDs arrive"""
+        while True:
+            match_id = self.match_ids.get()
+            if match_id is _DONE:
+                return
+            try:
+                response = self.client.get(self.routing, f"/lol/match/v5/matches/{match_id}")
+            except requests.exceptions.RequestException as e:
+                self.jobs.fail(KIND_MATCH, self.region, match_id, str(e))
+                self._count('failed')
+                continue
+            if response.status_code == 200:
+                self.store.put(match_id, response.json())
+                self.jobs.complete(KIND_MATCH, self.region, match_id)
+                self.client.metrics.record_matches()
+                self._count('matches_saved')
+            else:
+                self.jobs.fail(KIND_MATCH, self.region, match_id, f"Status {response.status_code}",
+                               retry=response.status_code not in PERMANENT_STATUSES)
+                self._count('failed')
+
+    def run(self):
+        """
+        Run every stage to completion, then retry failed or left-over downloads
+
+        Returns:
+            dict: Counts of players, new match IDs, matches saved and seconds taken
+        """
+        started = time.time()
+        resolver = threading.Thread(target=self.resolve_players, daemon=True)
+        listers = [threading.Thread(target=self.list_matches, daemon=True) for _ in range(self.listing_workers)]
+        downloaders = [threading.Thread(target=self.download_matches, daemon=True)
+                       for _ in range(self.max_in_flight)]
+        for thread in [resolver] + listers + downloaders:
+            thread.start()
+        resolver.join()
+        for thread in listers:
+            thread.join()
+        for _ in downloaders:
+            self.match_ids.put(_DONE)
+        for thread in downloaders:
+            thread.join()
+
+        # Downloads that failed above (or were left by an earlier run) go through the job queue's retries
+        swept = download_queued_matches(self.client, self.region, self.jobs, self.store,
+                                        max_in_flight=self.max_in_flight)
+        self._count('matches_saved', swept)
+        return dict(self.counts, region=self.region, seconds=time.time() - started)
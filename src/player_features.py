@@ -0,0 +1,393 @@
+"""
+Player features
+Rolling form over each player's most recent games, kept in fixed-size windows with running aggregates
+"""
+import glob
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.bulk_parser import DEFAULT_PARSED_PATH
+from src.match_model import POSITIONS, ParticipantRecord
+
+DEFAULT_FEATURES_PATH = "data/player_features.npz"
+
+# Games kept per player; champion counts are stored as int8, so at most 127
+DEFAULT_WINDOW = 20
+
+# Per-game stats kept in each window slot and summed per player
+STAT_COLUMNS = ['kills', 'deaths', 'assists', 'cs']
+
+# Parsed participant columns the features read
+SOURCE_COLUMNS = ['game_id', 'game_creation', 'game_duration', 'puuid', 'championName', 'individualPosition',
+                  'win', 'kills', 'deaths', 'assists', 'totalMinionsKilled', 'neutralMinionsKilled']
+
+
+class PlayerFeatures:
+    """
+    Rolling per-player form held as dense numpy arrays
+
+    Players get a compact code the first time they are seen, champions
+    likewise; arrays grow by doubling. Each player has `window` slots
+    holding their most recent games (game ID, date, champion, role, win,
+    kills, deaths, assists, CS, duration) and running aggregates over
+    whatever is in the slots:
+
+    - games, wins, stat sums and seconds played
+    - games per role and per champion
+    - sum of c*log2(c) over the champion counts, so champion pool entropy
+      is log2(n) - sum/n without looking at the counts
+
+    Adding a game touches one slot: while the window has room it takes the
+    next free one, after that it replaces the oldest game and subtracts it
+    from the aggregates. That keeps updates O(window) = O(1) whatever order
+    games arrive in, and a game older than everything in a full window, or
+    already in it, is ignored. Lookups read the aggregates directly, so
+    features for thousands of players are a few vectorized array ops.
+    save() and load() write the arrays to a single uncompressed .npz file.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, capacity=1024, champion_capacity=256):
+        """
+        Args:
+            window (int): Recent games kept per player (default: 20, at most 127)
+            capacity (int): Player codes to allocate up front (default: 1024)
+            champion_capacity (int): Champion codes to allocate up front (default: 256)
+        """
+        if not 0 < window <= np.iinfo(np.int8).max:
+            raise ValueError(f"Window must be between 1 and {np.iinfo(np.int8).max} games, not {window}")
+        self.window = window
+        self.puuids = []
+        self.champions = []
+        self.ingested = set()
+        self._players = {}
+        self._champions = {}
+        # c * log2(c) for every count a window can hold
+        self._clogc = np.array([0.0] + [c * math.log2(c) for c in range(1, window + 1)])
+        self._allocate(capacity, champion_capacity)
+
+    def _allocate(self, capacity, champion_capacity):
+        p, w = capacity, self.window
+        self.slot_game = np.zeros((p, w), dtype=np.int64)
+        self.slot_date = np.zeros((p, w), dtype=np.int64)
+        self.slot_stats = np.zeros((p, w, len(STAT_COLUMNS)), dtype=np.int32)
+        self.slot_seconds = np.zeros((p, w), dtype=np.int32)
+        self.slot_champion = np.full((p, w), -1, dtype=np.int32)
+        self.slot_role = np.full((p, w), -1, dtype=np.int8)
+        self.slot_win = np.zeros((p, w), dtype=np.int8)
+        self.games = np.zeros(p, dtype=np.int32)
+        self.wins = np.zeros(p, dtype=np.int32)
+        self.stat_sums = np.zeros((p, len(STAT_COLUMNS)), dtype=np.int64)
+        self.seconds = np.zeros(p, dtype=np.int64)
+        self.role_games = np.zeros((p, len(POSITIONS)), dtype=np.int16)
+        self.champion_games = np.zeros((p, champion_capacity), dtype=np.int8)
+        self.champion_clogc = np.zeros(p, dtype=np.float64)
+
+    @property
+    def capacity(self):
+        return len(self.games)
+
+    @staticmethod
+    def _array_names():
+        return ['slot_game', 'slot_date', 'slot_stats', 'slot_seconds', 'slot_champion', 'slot_role', 'slot_win',
+                'games', 'wins', 'stat_sums', 'seconds', 'role_games', 'champion_games', 'champion_clogc']
+
+    def _grow(self, players, champions):
+        """Reallocate every array with room for at least `players` player and `champions` champion codes"""
+        old = {name: getattr(self, name) for name in self._array_names()}
+        capacity, champion_capacity = self.capacity, self.champion_games.shape[1]
+        while capacity < players:
+            capacity *= 2
+        while champion_capacity < champions:
+            champion_capacity *= 2
+        self._allocate(capacity, champion_capacity)
+        for name, array in old.items():
+            new = getattr(self, name)
+            new[tuple(slice(0, n) for n in array.shape)] = array
+
+    def __len__(self):
+        return len(self.puuids)
+
+    def __contains__(self, puuid):
+        return puuid in self._players
+
+    def _player(self, puuid):
+        """Code of a player, assigning the next free code if they are new"""
+        code = self._players.get(puuid)
+        if code is None:
+            code = self._players[puuid] = len(self.puuids)
+            self.puuids.append(puuid)
+            if code >= self.capacity:
+                self._grow(code + 1, 0)
+        return code
+
+    def _champion(self, champion):
+        """Code of a champion name, assigning the next free code if it is new"""
+        code = self._champions.get(champion)
+        if code is None:
+            code = self._champions[champion] = len(self.champions)
+            self.champions.append(champion)
+            if code >= self.champion_games.shape[1]:
+                self._grow(0, code + 1)
+        return code
+
+    def _remove_slot(self, p, slot):
+        """Subtract the game in a slot from the player's aggregates"""
+        champion, role = self.slot_champion[p, slot], self.slot_role[p, slot]
+        self.games[p] -= 1
+        self.wins[p] -= self.slot_win[p, slot]
+        self.stat_sums[p] -= self.slot_stats[p, slot]
+        self.seconds[p] -= self.slot_seconds[p, slot]
+        if role >= 0:
+            self.role_games[p, role] -= 1
+        count = self.champion_games[p, champion]
+        self.champion_clogc[p] += self._clogc[count - 1] - self._clogc[count]
+        self.champion_games[p, champion] = count - 1
+
+    def add_game(self, puuid, game_id, match_date, game_duration, champion, position, win,
+                 kills, deaths, assists, cs):
+        """
+        Add one player's game to their window
+
+        Returns:
+            bool: True if the game was added, False if it was already in the
+                window or older than every game in a full one
+        """
+        if not puuid or not game_id:
+            return False
+        match_date = match_date or 0
+        p = self._player(puuid)
+        if (self.slot_game[p] == game_id).any():
+            return False
+        if self.games[p] < self.window:
+            slot = self.games[p]
+        else:
+            slot = self.slot_date[p].argmin()
+            if self.slot_date[p, slot] >= match_date:
+                return False
+            self._remove_slot(p, slot)
+
+        c = self._champion(champion or '')
+        role = POSITIONS.index(position) if position in POSITIONS else -1
+        stats = (kills or 0, deaths or 0, assists or 0, cs or 0)
+        win = 1 if win else 0
+        self.slot_game[p, slot] = game_id
+        self.slot_date[p, slot] = match_date
+        self.slot_stats[p, slot] = stats
+        self.slot_seconds[p, slot] = game_duration or 0
+        self.slot_champion[p, slot] = c
+        self.slot_role[p, slot] = role
+        self.slot_win[p, slot] = win
+
+        self.games[p] += 1
+        self.wins[p] += win
+        self.stat_sums[p] += stats
+        self.seconds[p] += game_duration or 0
+        if role >= 0:
+            self.role_games[p, role] += 1
+        count = self.champion_games[p, c]
+        self.champion_clogc[p] += self._clogc[count + 1] - self._clogc[count]
+        self.champion_games[p, c] = count + 1
+        return True
+
+    def update(self, record):
+        """
+        Add a ParticipantRecord to its player's window
+
+        Returns:
+            bool: True if the game was added
+        """
+        return self.add_game(record.puuid, record.game_id, record.match_date, record.game_duration,
+                             record.champion, record.position, record.win,
+                             record.kills, record.deaths, record.assists, record.cs)
+
+    def update_many(self, records):
+        """
+        Add several ParticipantRecords
+
+        Returns:
+            int: Number of games added
+        """
+        return sum(self.update(record) for record in records)
+
+    def update_match(self, match_data):
+        """
+        Add a raw match-v5 document to the window of every player in it
+
+        Returns:
+            int: Number of games added
+        """
+        match_info = match_data.get('info', {})
+        return self.update_many(ParticipantRecord.from_api(match_info, participant)
+                                for participant in match_info.get('participants', []))
+
+    def update_frame(self, df):
+        """
+        Add a batch of parsed participant rows
+
+        Args:
+            df (pd.DataFrame): Rows with the SOURCE_COLUMNS (as written by bulk_parse)
+
+        Returns:
+            int: Number of games added
+        """
+        df = df.dropna(subset=['puuid', 'game_id']).sort_values('game_creation', kind='stable')
+        if df.empty:
+            return 0
+        cs = df['totalMinionsKilled'].fillna(0) + df['neutralMinionsKilled'].fillna(0)
+        columns = zip(
+            df['puuid'].astype(object), df['game_id'].astype(np.int64), df['game_creation'].fillna(0).astype(np.int64),
+            df['game_duration'].fillna(0).astype(np.int64), df['championName'].astype(object).fillna(''),
+            df['individualPosition'].astype(object).fillna(''), df['win'].fillna(False).astype(bool),
+            *(df[column].fillna(0).astype(np.int64) for column in ('kills', 'deaths', 'assists')),
+            cs.astype(np.int64),
+        )
+        return sum(self.add_game(*row) for row in columns)
+
+    def update_from_parsed(self, parsed_dir=DEFAULT_PARSED_PATH):
+        """
+        Add every parsed file not read yet
+
+        Args:
+            parsed_dir (str): Folder written by bulk_parse
+
+        Returns:
+            int: Number of games added
+        """
+        added = 0
+        for path in sorted(glob.glob(os.path.join(parsed_dir, "patch=*", "queue=*", "*.parquet"))):
+            relative = os.path.relpath(path, parsed_dir)
+            if relative in self.ingested:
+                continue
+            # Files only hold columns that had values, so ask for the ones present
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in SOURCE_COLUMNS if c in available]
+            added += self.update_frame(pd.read_parquet(path, columns=columns).reindex(columns=SOURCE_COLUMNS))
+            self.ingested.add(relative)
+        return added
+
+    def save(self, path=DEFAULT_FEATURES_PATH):
+        """Write every array to one .npz file, replacing it atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        n, c = len(self.puuids), len(self.champions)
+        # Only the used player and champion codes are written
+        arrays = {name: getattr(self, name)[:n] for name in self._array_names()}
+        arrays['champion_games'] = self.champion_games[:n, :c]
+        temp_path = f"{path}.tmp.npz"
+        np.savez(temp_path, window=self.window, puuids=np.array(self.puuids, dtype=str),
+                 champions=np.array(self.champions, dtype=str),
+                 ingested=np.array(sorted(self.ingested), dtype=str), **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_FEATURES_PATH, window=DEFAULT_WINDOW):
+        """
+        Load saved features, or start empty ones if the file doesn't exist
+
+        Args:
+            path (str): File written by save()
+            window (int): Window of a new store; a saved one keeps its own (default: 20)
+
+        Returns:
+            PlayerFeatures: The loaded features
+        """
+        if not os.path.exists(path):
+            return cls(window)
+        with np.load(path) as data:
+            features = cls(int(data['window']))
+            features.puuids = data['puuids'].tolist()
+            features.champions = data['champions'].tolist()
+            features.ingested = set(data['ingested'].tolist())
+            features._players = {puuid: i for i, puuid in enumerate(features.puuids)}
+            features._champions = {champion: i for i, champion in enumerate(features.champions)}
+            features._grow(len(features.puuids), len(features.champions))
+            for name in cls._array_names():
+                saved = data[name]
+                getattr(features, name)[tuple(slice(0, n) for n in saved.shape)] = saved
+        return features
+
+    def table(self, puuids=None):
+        """
+        Rolling features of many players
+
+        Args:
+            puuids (iterable): Players to look up (default: every player);
+                unknown players get a row with 0 games
+
+        Returns:
+            pd.DataFrame: One row per player: games and wins in the window,
+                win rate, per-game kills/deaths/assists, KDA, CS per minute,
+                champion pool entropy (bits), distinct champions, share of
+                games per role, main role and last game date (epoch ms)
+        """
+        if puuids is None:
+            puuids = list(self.puuids)
+            codes = np.arange(len(puuids))
+        else:
+            puuids = list(puuids)
+            codes = np.array([self._players.get(puuid, -1) for puuid in puuids], dtype=np.int64)
+        known = codes >= 0
+        # Unknown players read the unused row past the last code, which is all zeros
+        if len(self.puuids) >= self.capacity:
+            self._grow(len(self.puuids) + 1, 0)
+        codes = np.where(known, codes, len(self.puuids))
+
+        games = self.games[codes].astype(np.float64)
+        sums = self.stat_sums[codes]
+        role_games = self.role_games[codes]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table = pd.DataFrame({
+                'puuid': puuids,
+                'games': self.games[codes],
+                'wins': self.wins[codes],
+                'win_rate': self.wins[codes] / games,
+                'kills': sums[:, 0] / games,
+                'deaths': sums[:, 1] / games,
+                'assists': sums[:, 2] / games,
+                'kda': (sums[:, 0] + sums[:, 2]) / np.maximum(sums[:, 1], 1),
+                'cs_per_min': sums[:, 3] / (self.seconds[codes] / 60),
+                'champion_entropy': np.log2(np.maximum(games, 1)) - self.champion_clogc[codes] / np.maximum(games, 1),
+                'champions': (self.champion_games[codes] > 0).sum(axis=1),
+                **{f'{role.lower()}_share': role_games[:, r] / games for r, role in enumerate(POSITIONS)},
+                'main_role': np.where(role_games.sum(axis=1) > 0, np.array(POSITIONS)[role_games.argmax(axis=1)], ''),
+                'last_played': self.slot_date[codes].max(axis=1),
+            })
+        return table
+
+    def get(self, puuid):
+        """
+        Rolling features of one player
+
+        Returns:
+            dict: The player's row of table(), or None if they have no games
+        """
+        if puuid not in self._players:
+            return None
+        return self.table([puuid]).iloc[0].to_dict()
+
+    def recent_games(self, puuid):
+        """
+        Games in a player's window, newest first
+
+        Returns:
+            pd.DataFrame: One row per game
+        """
+        p = self._players.get(puuid)
+        if p is None:
+            return pd.DataFrame(columns=['game_id', 'match_date', 'champion', 'position', 'win', *STAT_COLUMNS,
+                                         'game_duration'])
+        used = np.nonzero(self.slot_game[p])[0]
+        order = used[np.argsort(-self.slot_date[p, used], kind='stable')]
+        roles = self.slot_role[p, order]
+        return pd.DataFrame({
+            'game_id': self.slot_game[p, order],
+            'match_date': self.slot_date[p, order],
+            'champion': np.array(self.champions, dtype=object)[self.slot_champion[p, order]],
+            'position': np.where(roles >= 0, np.array(POSITIONS)[roles], ''),
+            'win': self.slot_win[p, order].astype(bool),
+            **{column: self.slot_stats[p, order, i] for i, column in enumerate(STAT_COLUMNS)},
+            'game_duration': self.slot_seconds[p, order],
+        })
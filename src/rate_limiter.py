@@ -0,0 +1,286 @@
+"""
+Rate limiter for the Riot Games API
+Paces requests using the rate limit headers returned by the API
+"""
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from src.metrics import default_metrics
+
+# Limits applied before the API has told us what the key allows
+# (these are the limits of a development key)
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+# Extra fraction of each window we wait so our clock never runs ahead of Riot's
+WINDOW_SAFETY_FACTOR = 0.05
+
+# Method names for the endpoints we call; method limits are tracked per name
+ENDPOINT_PATTERNS = [
+    (re.compile(r'^/lol/match/v5/matches/by-puuid/[^/]+/ids$'), 'match-v5.getMatchIdsByPUUID'),
+    (re.compile(r'^/lol/match/v5/matches/[^/]+/timeline$'), 'match-v5.getTimeline'),
+    (re.compile(r'^/lol/match/v5/matches/[^/]+$'), 'match-v5.getMatch'),
+    (re.compile(r'^/lol/summoner/v4/summoners/by-name/[^/]+$'), 'summoner-v4.getBySummonerName'),
+    (re.compile(r'^/lol/summoner/v4/summoners/by-puuid/[^/]+$'), 'summoner-v4.getByPUUID'),
+    (re.compile(r'^/lol/summoner/v4/summoners/[^/]+$'), 'summoner-v4.getBySummonerId'),
+    (re.compile(r'^/lol/league/v4/challengerleagues/by-queue/[^/]+$'), 'league-v4.getChallengerLeague'),
+    (re.compile(r'^/lol/league/v4/grandmasterleagues/by-queue/[^/]+$'), 'league-v4.getGrandmasterLeague'),
+    (re.compile(r'^/lol/league/v4/masterleagues/by-queue/[^/]+$'), 'league-v4.getMasterLeague'),
+    (re.compile(r'^/riot/account/v1/accounts/by-riot-id/[^/]+/[^/]+$'), 'account-v1.getByRiotId'),
+]
+
+
+def parse_rate_limits(header_value):
+    """
+    Parse a rate limit header such as "20:1,100:120"
+
+    Args:
+        header_value (str): Header value of comma-separated "count:seconds" pairs
+
+    Returns:
+        list: List of (count, seconds) tuples
+    """
+    limits = []
+    if not header_value:
+        return limits
+    for part in header_value.split(','):
+        count, _, seconds = part.strip().partition(':')
+        if count and seconds:
+            limits.append((int(count), int(seconds)))
+    return limits
+
+
+def endpoint_for(url):
+    """
+    Work out which host and API method a URL belongs to
+
+    Args:
+        url (str): Full request URL
+
+    Returns:
+        tuple: (host, method) where method is the endpoint name or the raw path
+    """
+    parts = urlsplit(url)
+    host, path = parts.netloc, parts.path
+    # A base URL with a path prefix (e.g. a local mock at /na1/lol/...) counts as part of the host
+    for root in ('/lol/', '/riot/'):
+        index = path.find(root)
+        if index > 0:
+            host, path = host + path[:index], path[index:]
+            break
+    for pattern, method in ENDPOINT_PATTERNS:
+        if pattern.match(path):
+            return host, method
+    return host, path
+
+
+class Bucket:
+    """
+    A single "count per window" allowance
+
+    Riot counts requests in fixed windows that start with the first request,
+    so the bucket refills completely when its window ends rather than
+    trickling tokens back in. That is the highest rate Riot will accept.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.count = 0
+        self.reset_at = 0.0
+
+    def wait_time(self, now):
+        """Seconds until this bucket can take another request"""
+        if now >= self.reset_at or self.count < self.limit:
+            return 0.0
+        return self.reset_at - now
+
+    def consume(self, now):
+        """Record a request made at time `now`"""
+        if now >= self.reset_at:
+            self.count = 0
+            self.reset_at = now + self.window * (1 + WINDOW_SAFETY_FACTOR)
+        self.count += 1
+
+    def sync(self, count, now):
+        """Adopt the count reported by the API if it is ahead of ours"""
+        if now >= self.reset_at:
+            self.reset_at = now + self.window * (1 + WINDOW_SAFETY_FACTOR)
+        self.count = max(self.count, count)
+
+
+class RateLimiter:
+    """
+    Shared rate limiter for every Riot API call
+
+    Application limits are tracked per routing host (e.g. na1 or americas)
+    and method limits per (host, method). Limits start at the development
+    key defaults and are replaced by whatever the API reports in its
+    X-App-Rate-Limit / X-Method-Rate-Limit headers.
+    """
+
+    def __init__(self, app_limits=DEFAULT_APP_LIMITS):
+        self.default_app_limits = parse_rate_limits(app_limits)
+        self._app_buckets = {}
+        self._method_buckets = {}
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+        # Total seconds callers have spent waiting (summed across threads)
+        self.throttled_seconds = 0.0
+
+    def _buckets_for(self, host, method):
+        if host not in self._app_buckets:
+            self._app_buckets[host] = [Bucket(c, w) for c, w in self.default_app_limits]
+        return self._app_buckets[host] + self._method_buckets.get((host, method), [])
+
+    def acquire(self, url):
+        """
+        Block until a request to `url` is allowed, then count it
+
+        Args:
+            url (str): Full request URL
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        host, method = endpoint_for(url)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                buckets = self._buckets_for(host, method)
+                wait = max(
+                    [b.wait_time(now) for b in buckets]
+                    + [self._blocked_until.get(host, 0.0) - now,
+                       self._blocked_until.get((host, method), 0.0) - now,
+                       0.0]
+                )
+                if wait <= 0:
+                    for bucket in buckets:
+                        bucket.consume(now)
+                    self.throttled_seconds += waited
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def headroom(self, url):
+        """
+        Report how much budget is left for a request to `url`, without counting one
+
+        Args:
+            url (str): Full request URL
+
+        Returns:
+            tuple: (seconds until a request is allowed, requests left in the tightest window)
+        """
+        host, method = endpoint_for(url)
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets_for(host, method)
+            wait = max(
+                [b.wait_time(now) for b in buckets]
+                + [self._blocked_until.get(host, 0.0) - now,
+                   self._blocked_until.get((host, method), 0.0) - now,
+                   0.0]
+            )
+            left = min([b.limit - b.count if now < b.reset_at else b.limit for b in buckets] or [float('inf')])
+        return wait, left
+
+    def update(self, url, headers):
+        """
+        Update limits and counts from the headers of a response
+
+        Args:
+            url (str): Full request URL
+            headers (Mapping): Response headers
+        """
+        host, method = endpoint_for(url)
+        with self._lock:
+            now = time.monotonic()
+            self._apply(self._app_buckets, host, headers,
+                        'X-App-Rate-Limit', 'X-App-Rate-Limit-Count', now)
+            self._apply(self._method_buckets, (host, method), headers,
+                        'X-Method-Rate-Limit', 'X-Method-Rate-Limit-Count', now)
+
+    def _apply(self, table, key, headers, limit_header, count_header, now):
+        limits = parse_rate_limits(headers.get(limit_header))
+        if not limits:
+            return
+        counts = {w: c for c, w in parse_rate_limits(headers.get(count_header))}
+        existing = {b.window: b for b in table.get(key, [])}
+        buckets = []
+        for limit, window in limits:
+            bucket = existing.get(window) or Bucket(limit, window)
+            bucket.limit = limit
+            if window in counts:
+                bucket.sync(counts[window], now)
+            buckets.append(bucket)
+        table[key] = buckets
+
+    def block(self, url, headers):
+        """
+        Stop requests after a 429 until Retry-After has passed
+
+        Application limit hits block the whole host; method and service
+        limit hits only block that method.
+
+        Args:
+            url (str): Full request URL
+            headers (Mapping): Headers of the 429 response
+
+        Returns:
+            float: Seconds requests will be held back
+        """
+        host, method = endpoint_for(url)
+        retry_after = float(headers.get('Retry-After', 10))
+        key = host if headers.get('X-Rate-Limit-Type') == 'application' else (host, method)
+        with self._lock:
+            until = time.monotonic() + retry_after
+            self._blocked_until[key] = max(self._blocked_until.get(key, 0.0), until)
+        return retry_after
+
+
+# Limiter shared by every caller in this process
+default_limiter = RateLimiter()
+
+
+def rate_limited_get(url, headers=None, params=None, limiter=None, session=None, max_retries=3,
+                     metrics=None, **kwargs):
+    """
+    GET a Riot API URL, waiting for the rate limiter and retrying 429s
+
+    Args:
+        url (str): Full request URL
+        headers (dict): Request headers (must include X-Riot-Token)
+        params (dict): Query string parameters
+        limiter (RateLimiter): Limiter to use (default: default_limiter)
+        session (requests.Session): Session to send through (default: requests)
+        max_retries (int): How many 429 responses to retry before giving up
+        metrics (Metrics): Where latency, status codes and throttling are recorded (default: default_metrics)
+
+    Returns:
+        requests.Response: The last response received
+    """
+    limiter = limiter or default_limiter
+    metrics = metrics or default_metrics
+    sender = session or requests
+    method = endpoint_for(url)[1]
+    for attempt in range(max_retries + 1):
+        metrics.add_throttled(limiter.acquire(url))
+        started = time.monotonic()
+        try:
+            response = sender.get(url, headers=headers, params=params, **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.observe_request(method, None, time.monotonic() - started)
+            raise
+        metrics.observe_request(method, response.status_code, time.monotonic() - started)
+        limiter.update(url, response.headers)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+        retry_after = limiter.block(url, response.headers)
+        metrics.record_rate_limit(method, retry_after, response.headers.get('X-Rate-Limit-Type'))
+        print(f"⏳ Rate limit exceeded. Waiting {retry_after:.0f} seconds before retrying...")
+    return response
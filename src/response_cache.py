@@ -0,0 +1,176 @@
+"""
+On-disk response cache for the Riot API
+Keeps responses from slowly-changing endpoints so reruns don't spend API budget on them
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.rate_limiter import endpoint_for
+
+DEFAULT_CACHE_PATH = "data/http_cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Seconds each endpoint's responses stay fresh; None keeps them forever.
+# Endpoints not listed here (e.g. match ID lists) are never cached.
+ENDPOINT_TTLS = {
+    'summoner-v4.getBySummonerId': None,     # summoner ID -> PUUID never changes
+    'summoner-v4.getByPUUID': None,
+    'summoner-v4.getBySummonerName': 24 * 60 * 60,
+    'account-v1.getByRiotId': 24 * 60 * 60,
+    'league-v4.getChallengerLeague': 10 * 60,
+    'league-v4.getGrandmasterLeague': 10 * 60,
+    'league-v4.getMasterLeague': 10 * 60,
+    'match-v5.getMatch': None,               # finished matches never change
+    'match-v5.getTimeline': None,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    expires_at REAL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+"""
+
+
+def cache_key(url, params=None):
+    """Key a request by its URL and sorted query parameters"""
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of successful GET responses
+
+    Each endpoint class has its own TTL (see ENDPOINT_TTLS). Stale entries
+    that carried an ETag are revalidated with If-None-Match rather than
+    refetched. When the cache grows past max_bytes the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        """
+        Args:
+            path (str): SQLite database file (default: data/http_cache.sqlite)
+            max_bytes (int): Size limit of stored bodies (default: 512 MB)
+            ttls (dict): Per-endpoint TTL overrides, merged over ENDPOINT_TTLS
+        """
+        self.max_bytes = max_bytes
+        self.ttls = dict(ENDPOINT_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def cacheable(self, url):
+        """Whether responses from this URL's endpoint are cached"""
+        return endpoint_for(url)[1] in self.ttls
+
+    def lookup(self, url, params=None):
+        """
+        Find a cached response
+
+        Args:
+            url (str): Full request URL
+            params (dict): Query string parameters
+
+        Returns:
+            tuple: (response, fresh) where response is None on a miss, and
+                fresh says whether it can be used without asking the API
+        """
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        headers, body, expires_at = row
+        response = self._build_response(url, json.loads(headers), zlib.decompress(body))
+        return response, expires_at is None or expires_at > now
+
+    def store(self, url, params, response):
+        """
+        Cache a successful response according to its endpoint's TTL
+
+        Args:
+            url (str): Full request URL
+            params (dict): Query string parameters
+            response (requests.Response): Response with status 200
+        """
+        ttl = self.ttls.get(endpoint_for(url)[1])
+        expires_at = None if ttl is None else time.time() + ttl
+        headers = {name: response.headers[name] for name in ("Content-Type", "ETag") if name in response.headers}
+        body = zlib.compress(response.content)
+        key = cache_key(url, params)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, headers, body, expires_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(headers), body, expires_at, len(body), time.time()),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url, params=None):
+        """Restart the TTL of an entry the API confirmed is unchanged (304)"""
+        ttl = self.ttls.get(endpoint_for(url)[1])
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?",
+                (expires_at, time.time(), cache_key(url, params)),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    return
+
+    def _build_response(self, url, headers, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = "utf-8"
+        response.from_cache = True
+        return response
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,306 @@
+"""
+Champion rollups
+Dense count/sum arrays for champion, role, duration and lane matchup stats, updated in vectorized batches
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.bulk_parser import DEFAULT_PARSED_PATH
+from src.match_model import POSITIONS
+
+DEFAULT_ROLLUP_PATH = "data/rollups.npz"
+
+# Game length buckets in minutes, matching the notebook's duration table
+DURATION_BINS = [20, 25, 30, 35, 40]
+DURATION_LABELS = ['<20', '20-25', '25-30', '30-35', '35-40', '>40']
+
+# Parsed participant columns the rollups read
+SOURCE_COLUMNS = ['match_id', 'championId', 'championName', 'teamPosition', 'teamId', 'win',
+                  'kills', 'deaths', 'assists', 'game_duration']
+
+# Per-champion sums kept alongside the game and win counts
+STAT_COLUMNS = ['kills', 'deaths', 'assists']
+
+
+class ChampionRollups:
+    """
+    Precomputed champion aggregates held as dense numpy arrays
+
+    Champions get a compact code the first time they are seen; arrays grow
+    when new champions appear. Kept per champion code:
+
+    - games/wins and kill/death/assist sums
+    - games/wins per role (champion x role)
+    - games/wins per game length bucket (champion x duration bucket)
+    - lane matchups: games/wins of champion A against champion B in the
+      same role on the other team (role x champion x champion)
+
+    update() adds a batch of participant rows with np.add.at, so nothing is
+    ever recomputed from scratch; save() and load() write the arrays to a
+    single uncompressed .npz file.
+    """
+
+    def __init__(self, capacity=256):
+        """
+        Args:
+            capacity (int): Champion codes to allocate up front (default: 256)
+        """
+        self.champion_ids = np.zeros(0, dtype=np.int32)
+        self.champion_names = np.zeros(0, dtype='<U32')
+        self.ingested = set()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        c, r, d = capacity, len(POSITIONS), len(DURATION_LABELS)
+        self.games = np.zeros(c, dtype=np.int64)
+        self.wins = np.zeros(c, dtype=np.int64)
+        self.stat_sums = np.zeros((c, len(STAT_COLUMNS)), dtype=np.int64)
+        self.role_games = np.zeros((c, r), dtype=np.int64)
+        self.role_wins = np.zeros((c, r), dtype=np.int64)
+        self.duration_games = np.zeros((c, d), dtype=np.int64)
+        self.duration_wins = np.zeros((c, d), dtype=np.int64)
+        self.matchup_games = np.zeros((r, c, c), dtype=np.int32)
+        self.matchup_wins = np.zeros((r, c, c), dtype=np.int32)
+
+    @property
+    def capacity(self):
+        return len(self.games)
+
+    def _grow(self, needed):
+        """Reallocate every array with room for at least `needed` champion codes"""
+        old = {name: getattr(self, name) for name in self._array_names()}
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self._allocate(capacity)
+        for name, array in old.items():
+            new = getattr(self, name)
+            new[tuple(slice(0, n) for n in array.shape)] = array
+
+    @staticmethod
+    def _array_names():
+        return ['games', 'wins', 'stat_sums', 'role_games', 'role_wins',
+                'duration_games', 'duration_wins', 'matchup_games', 'matchup_wins']
+
+    def _codes(self, champion_ids, champion_names):
+        """Map champion IDs to codes, assigning codes to champions not seen before"""
+        known = pd.Index(self.champion_ids)
+        codes = known.get_indexer(champion_ids)
+        if (codes < 0).any():
+            new = pd.unique(champion_ids[codes < 0])
+            names = pd.Series(champion_names).groupby(champion_ids).first()
+            self.champion_ids = np.concatenate([self.champion_ids, new.astype(np.int32)])
+            self.champion_names = np.concatenate(
+                [self.champion_names, names.reindex(new).fillna('').to_numpy(dtype='<U32')])
+            if len(self.champion_ids) > self.capacity:
+                self._grow(len(self.champion_ids))
+            codes = pd.Index(self.champion_ids).get_indexer(champion_ids)
+        return codes
+
+    def update(self, df):
+        """
+        Add a batch of participant rows
+
+        Args:
+            df (pd.DataFrame): Rows with at least the SOURCE_COLUMNS (as written by bulk_parse)
+
+        Returns:
+            int: Number of rows added
+        """
+        df = df.dropna(subset=['championId', 'win'])
+        if df.empty:
+            return 0
+        champions = self._codes(df['championId'].to_numpy(dtype=np.int64),
+                                df['championName'].astype(object).fillna('').to_numpy())
+        wins = df['win'].to_numpy(dtype=bool).astype(np.int64)
+        roles = pd.Categorical(df['teamPosition'], categories=POSITIONS).codes
+        minutes = df['game_duration'].fillna(0).to_numpy(dtype=np.float64) / 60
+        # right=True puts a game of exactly 20 minutes in '<20', as the notebook's pd.cut does
+        buckets = np.digitize(minutes, DURATION_BINS, right=True)
+        stats = df[STAT_COLUMNS].fillna(0).to_numpy(dtype=np.int64)
+
+        np.add.at(self.games, champions, 1)
+        np.add.at(self.wins, champions, wins)
+        np.add.at(self.stat_sums, champions, stats)
+        np.add.at(self.duration_games, (champions, buckets), 1)
+        np.add.at(self.duration_wins, (champions, buckets), wins)
+        has_role = roles >= 0
+        np.add.at(self.role_games, (champions[has_role], roles[has_role]), 1)
+        np.add.at(self.role_wins, (champions[has_role], roles[has_role]), wins[has_role])
+
+        # Pair each blue-side laner with the red-side player in the same role
+        lanes = pd.DataFrame({
+            'match_id': df['match_id'].to_numpy(), 'team': df['teamId'].to_numpy(),
+            'role': roles, 'champion': champions, 'win': wins,
+        })[has_role]
+        pairs = lanes[lanes['team'] == 100].merge(
+            lanes[lanes['team'] == 200], on=['match_id', 'role'], suffixes=('_a', '_b'))
+        role = pairs['role'].to_numpy()
+        a, b = pairs['champion_a'].to_numpy(), pairs['champion_b'].to_numpy()
+        win_a = pairs['win_a'].to_numpy()
+        np.add.at(self.matchup_games, (role, a, b), 1)
+        np.add.at(self.matchup_games, (role, b, a), 1)
+        np.add.at(self.matchup_wins, (role, a, b), win_a)
+        np.add.at(self.matchup_wins, (role, b, a), 1 - win_a)
+        return len(df)
+
+    def update_from_parsed(self, parsed_dir=DEFAULT_PARSED_PATH):
+        """
+        Add every parsed file not rolled up yet
+
+        Args:
+            parsed_dir (str): Folder written by bulk_parse
+
+        Returns:
+            int: Number of participant rows added
+        """
+        added = 0
+        for path in sorted(glob.glob(os.path.join(parsed_dir, "patch=*", "queue=*", "*.parquet"))):
+            relative = os.path.relpath(path, parsed_dir)
+            if relative in self.ingested:
+                continue
+            # Files only hold columns that had values, so ask for the ones present
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in SOURCE_COLUMNS if c in available]
+            added += self.update(pd.read_parquet(path, columns=columns).reindex(columns=SOURCE_COLUMNS))
+            self.ingested.add(relative)
+        return added
+
+    def save(self, path=DEFAULT_ROLLUP_PATH):
+        """Write every array to one .npz file, replacing it atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        n = len(self.champion_ids)
+        # Only the used champion codes are written
+        arrays = {name: getattr(self, name)[:, :n, :n] if name.startswith('matchup_') else getattr(self, name)[:n]
+                  for name in self._array_names()}
+        temp_path = f"{path}.tmp.npz"
+        np.savez(temp_path, champion_ids=self.champion_ids, champion_names=self.champion_names,
+                 ingested=np.array(sorted(self.ingested), dtype=str), **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_ROLLUP_PATH):
+        """
+        Load saved rollups, or start empty ones if the file doesn't exist
+
+        Returns:
+            ChampionRollups: The loaded rollups
+        """
+        rollups = cls()
+        if not os.path.exists(path):
+            return rollups
+        with np.load(path) as data:
+            rollups.champion_ids = data['champion_ids']
+            rollups.champion_names = data['champion_names']
+            rollups.ingested = set(data['ingested'].tolist())
+            rollups._allocate(max(rollups.capacity, len(rollups.champion_ids)))
+            for name in cls._array_names():
+                saved = data[name]
+                getattr(rollups, name)[tuple(slice(0, n) for n in saved.shape)] = saved
+        return rollups
+
+    def _code(self, champion):
+        """Code of a champion given by ID or name"""
+        if isinstance(champion, str):
+            matches = np.nonzero(self.champion_names == champion)[0]
+        else:
+            matches = np.nonzero(self.champion_ids == champion)[0]
+        if not len(matches):
+            raise KeyError(f"No games recorded for champion {champion!r}")
+        return matches[0]
+
+    def champion_table(self, min_games=1):
+        """
+        Per-champion games, win rate and average KDA
+
+        Returns:
+            pd.DataFrame: One row per champion, most played first
+        """
+        n = len(self.champion_ids)
+        games = self.games[:n]
+        sums = self.stat_sums[:n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table = pd.DataFrame({
+                'champion_id': self.champion_ids,
+                'champion': self.champion_names,
+                'games': games,
+                'win_rate': self.wins[:n] / games,
+                'kills': sums[:, 0] / games,
+                'deaths': sums[:, 1] / games,
+                'assists': sums[:, 2] / games,
+                'kda': (sums[:, 0] + sums[:, 2]) / np.maximum(sums[:, 1], 1),
+            })
+        return table[table['games'] >= min_games].sort_values('games', ascending=False, ignore_index=True)
+
+    def role_table(self, min_games=1):
+        """
+        Games and win rate per champion and role
+
+        Returns:
+            pd.DataFrame: One row per (champion, role) played
+        """
+        n = len(self.champion_ids)
+        champion, role = np.nonzero(self.role_games[:n] >= max(min_games, 1))
+        games = self.role_games[champion, role]
+        return pd.DataFrame({
+            'champion': self.champion_names[champion],
+            'role': np.array(POSITIONS)[role],
+            'games': games,
+            'win_rate': self.role_wins[champion, role] / games,
+        }).sort_values('games', ascending=False, ignore_index=True)
+
+    def duration_table(self, champion=None, min_games=1):
+        """
+        Games and win rate per champion and game length bucket
+
+        Args:
+            champion (int or str): Only this champion, given by ID or name (default: every champion)
+            min_games (int): Drop buckets with fewer games (default: 1)
+
+        Returns:
+            pd.DataFrame: One row per (champion, duration bucket) played, in bucket order for one champion
+        """
+        n = len(self.champion_ids)
+        if champion is None:
+            champions, buckets = np.nonzero(self.duration_games[:n] >= max(min_games, 1))
+        else:
+            code = self._code(champion)
+            buckets = np.nonzero(self.duration_games[code] >= max(min_games, 1))[0]
+            champions = np.full(len(buckets), code)
+        games = self.duration_games[champions, buckets]
+        table = pd.DataFrame({
+            'champion': self.champion_names[champions],
+            'duration_bucket': np.array(DURATION_LABELS)[buckets],
+            'games': games,
+            'win_rate': self.duration_wins[champions, buckets] / games,
+        })
+        if champion is None:
+            table = table.sort_values('games', ascending=False, ignore_index=True)
+        return table
+
+    def matchups(self, champion, role, min_games=1):
+        """
+        Win rate of a champion against every lane opponent in a role
+
+        Args:
+            champion (int or str): Champion ID or name
+            role (str): One of POSITIONS
+            min_games (int): Drop opponents with fewer games (default: 1)
+
+        Returns:
+            pd.DataFrame: One row per opponent, most played first
+        """
+        n = len(self.champion_ids)
+        code, r = self._code(champion), POSITIONS.index(role)
+        games = self.matchup_games[r, code, :n]
+        opponents = np.nonzero(games >= max(min_games, 1))[0]
+        return pd.DataFrame({
+            'opponent_id': self.champion_ids[opponents],
+            'opponent': self.champion_names[opponents],
+            'games': games[opponents],
+            'win_rate': self.matchup_wins[r, code, opponents] / games[opponents],
+        }).sort_values('games', ascending=False, ignore_index=True)
@@ -0,0 +1,116 @@
+"""
+Row index for match CSVs
+Persisted (game_id, puuid) keys of the rows in a CSV, so appends can skip rows already written without reading the file
+"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+# The index of data/lol_match_data.csv is data/lol_match_data.csv.rows.sqlite
+ROW_INDEX_SUFFIX = ".rows.sqlite"
+
+# CSV rows read at a time when the index is built from an existing file
+BUILD_CHUNK_SIZE = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_keys (
+    game_id INTEGER NOT NULL,
+    puuid TEXT NOT NULL,
+    PRIMARY KEY (game_id, puuid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class RowIndex:
+    """
+    SQLite index of the row keys in one CSV file
+
+    The index records the size the CSV had when it was last brought up to
+    date. If the file has since changed underneath it (rewritten, appended
+    to without the index, deleted) the keys are rebuilt from the file, a
+    chunk at a time, so memory stays flat whatever the file's size. Files
+    without a puuid column are keyed on game_id alone, with an empty puuid.
+    """
+
+    def __init__(self, csv_path, key_fields=('game_id', 'puuid'), clear=False):
+        """
+        Args:
+            csv_path (str): CSV file the index describes; the index sits beside it
+            key_fields (tuple): Columns the file's rows are keyed on (default: game_id and puuid)
+            clear (bool): Start empty because the file is about to be replaced (default: False)
+        """
+        self.csv_path = csv_path
+        self.key_fields = tuple(key_fields)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(csv_path + ROW_INDEX_SUFFIX, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if clear:
+            with self._lock:
+                self._conn.execute("DELETE FROM row_keys")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.commit()
+        elif self._indexed_size() != self._csv_size():
+            self.rebuild()
+
+    def _csv_size(self):
+        return os.path.getsize(self.csv_path) if os.path.exists(self.csv_path) else 0
+
+    def _indexed_size(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'csv_size'").fetchone()
+        return row[0] if row else None
+
+    def _set_size(self):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_size', ?)", (self._csv_size(),))
+
+    def _keys(self, df):
+        puuids = df['puuid'].astype(str) if 'puuid' in self.key_fields else [''] * len(df)
+        return zip(df['game_id'].astype('int64').tolist(), puuids)
+
+    def rebuild(self):
+        """Replace the keys with those of the rows now in the CSV"""
+        with self._lock:
+            self._conn.execute("DELETE FROM row_keys")
+            if self._csv_size():
+                for chunk in pd.read_csv(self.csv_path, usecols=list(self.key_fields), chunksize=BUILD_CHUNK_SIZE):
+                    self._conn.executemany("INSERT OR IGNORE INTO row_keys (game_id, puuid) VALUES (?, ?)",
+                                           self._keys(chunk))
+            self._set_size()
+            self._conn.commit()
+
+    def add(self, df):
+        """
+        Record the rows just appended to the CSV
+
+        Args:
+            df (DataFrame): The appended rows, with the key columns
+        """
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO row_keys (game_id, puuid) VALUES (?, ?)", self._keys(df))
+            self._set_size()
+            self._conn.commit()
+
+    def __contains__(self, key):
+        """Whether a (game_id, puuid) row is in the file; puuid is ignored for files keyed on game_id"""
+        game_id, puuid = key
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM row_keys WHERE game_id = ? AND puuid = ?",
+                (int(game_id), puuid if 'puuid' in self.key_fields else ''),
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM row_keys").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,184 @@
+"""
+Snowball crawler
+Expands from seed players to every participant seen in their matches, breadth first
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import time
+
+from src.api_scraper import REGION_ROUTING
+from src.async_downloader import download_matches
+
+# Times a player's match listing is tried before they are dropped from the crawl
+MAX_LIST_ATTEMPTS = 3
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings with a small false-positive rate
+
+    Uses a bit array sized for `capacity` items, so memory stays constant
+    however many IDs are added (about 1.2 MB per million items at 1%).
+    A false positive means an unseen ID is treated as seen and skipped.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        """
+        Args:
+            capacity (int): Number of items the filter is sized for
+            error_rate (float): False-positive rate at capacity (default: 0.01)
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        """
+        Add an item
+
+        Returns:
+            bool: True if the item was new (not already in the filter)
+        """
+        new = False
+        for p in self._positions(item):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+class SnowballCrawler:
+    """
+    Breadth-first crawl outward from seed players
+
+    Each player taken from the frontier has their new match IDs listed and
+    downloaded; every participant of those matches who hasn't been seen
+    joins the frontier one level deeper. Frontier entries are ordered by
+    depth and then by how recent the match they were found in is, so the
+    crawl favours active players. Seen matches and players are kept in
+    bloom filters and the frontier is capped, so memory stays bounded.
+    A player whose listing fails goes to the back of their depth level and
+    is retried, up to MAX_LIST_ATTEMPTS times.
+    """
+
+    def __init__(self, client, region, store, sync, max_depth=2, max_matches=100000,
+                 max_frontier=200000, expected_items=10000000, max_in_flight=8):
+        """
+        Args:
+            client (RiotClient): Client to send requests through
+            region (str): Platform region (e.g. na1)
+            store (MatchStore): Store downloaded matches are written to
+            sync (MatchSync): Per-player high-water marks used to list match IDs
+            max_depth (int): Hops from the seeds to expand (default: 2)
+            max_matches (int): Stop after saving this many matches (default: 100000)
+            max_frontier (int): Players kept waiting in the frontier (default: 200000)
+            expected_items (int): Matches/players the seen filters are sized for (default: 10M)
+            max_in_flight (int): Concurrent match downloads (default: 8)
+        """
+        self.client = client
+        self.region = region
+        self.routing = REGION_ROUTING.get(region, 'americas')
+        self.store = store
+        self.sync = sync
+        self.max_depth = max_depth
+        self.max_matches = max_matches
+        self.max_frontier = max_frontier
+        self.max_in_flight = max_in_flight
+        self.seen_matches = BloomFilter(expected_items)
+        self.seen_players = BloomFilter(expected_items)
+        self.frontier = []
+        self._sequence = itertools.count()
+        self._list_failures = {}    # PUUID -> failed listings, for players waiting to be retried
+        self.matches_saved = 0
+
+    def push(self, puuid, depth, last_seen):
+        """
+        Add a player to the frontier unless they have been seen before
+
+        Args:
+            puuid (str): Player's PUUID
+            depth (int): Hops from the seed players
+            last_seen (int): gameCreation (ms) of the match they were found in
+        """
+        if depth > self.max_depth or not self.seen_players.add(puuid):
+            return
+        heapq.heappush(self.frontier, (depth, -last_seen, next(self._sequence), puuid))
+        if len(self.frontier) > self.max_frontier * 2:
+            # Keep only the best max_frontier entries
+            self.frontier = heapq.nsmallest(self.max_frontier, self.frontier)
+            heapq.heapify(self.frontier)
+
+    def seed(self, puuids):
+        """Start the crawl from these players"""
+        now = int(time.time() * 1000)
+        for puuid in puuids:
+            self.push(puuid, 0, now)
+
+    def _expand(self, depth, match_ids):
+        """Download matches and push their participants into the frontier"""
+        def on_result(match_id, response, error):
+            if error is not None or response.status_code != 200:
+                return
+            match_data = response.json()
+            self.store.put(match_id, match_data)
+            self.matches_saved += 1
+            self.client.metrics.record_matches()
+            last_seen = match_data.get('info', {}).get('gameCreation', 0)
+            for puuid in match_data.get('metadata', {}).get('participants', []):
+                self.push(puuid, depth + 1, last_seen)
+
+        asyncio.run(download_matches(self.client, self.routing, match_ids, on_result,
+                                     max_in_flight=self.max_in_flight))
+
+    def run(self, backfill_pages=0):
+        """
+        Crawl until the frontier is empty or max_matches have been saved
+
+        Args:
+            backfill_pages (int): Pages of older history to list per player (default: 0)
+
+        Returns:
+            dict: Counts of matches saved, players expanded and frontier size left
+        """
+        players = 0
+        while self.frontier and self.matches_saved < self.max_matches:
+            depth, _, _, puuid = heapq.heappop(self.frontier)
+            try:
+                match_ids = self.sync.sync_player(self.client, self.region, puuid, backfill_pages=backfill_pages)
+            except Exception as e:
+                attempts = self._list_failures.pop(puuid, 0) + 1
+                if attempts < MAX_LIST_ATTEMPTS:
+                    # Already in seen_players, so push() would drop them; requeue directly
+                    self._list_failures[puuid] = attempts
+                    heapq.heappush(self.frontier, (depth, 0, next(self._sequence), puuid))
+                print(f"❌ Failed to list matches for {puuid[:15]}... (attempt {attempts}/{MAX_LIST_ATTEMPTS}): {e}")
+                continue
+            self._list_failures.pop(puuid, None)
+            players += 1
+            new_ids = [m for m in match_ids if self.seen_matches.add(m) and m not in self.store]
+            remaining = self.max_matches - self.matches_saved
+            if new_ids:
+                self._expand(depth, new_ids[:remaining])
+            self.client.metrics.set_gauge(f"snowball.{self.region}.frontier", len(self.frontier))
+            if players % 10 == 0:
+                print(f"🕸️ Players expanded: {players} | Matches saved: {self.matches_saved} | "
+                      f"Frontier: {len(self.frontier)} (depth {depth})")
+        return {'matches_saved': self.matches_saved, 'players_expanded': players, 'frontier': len(self.frontier)}
@@ -0,0 +1,343 @@
+"""
+Timeline store
+Keeps match-v5 timelines as fixed-dtype arrays that can be memory-mapped and queried in bulk
+"""
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+DEFAULT_TIMELINE_PATH = "data/match_data/timelines"
+
+# Frames hold this many participant slots (participantId 1-10 -> slot 0-9)
+MAX_PARTICIPANTS = 10
+
+# Per-participant stats kept from every frame, with where each lives in a participantFrame
+FRAME_STATS = {
+    'totalGold': ('totalGold',),
+    'currentGold': ('currentGold',),
+    'xp': ('xp',),
+    'level': ('level',),
+    'minionsKilled': ('minionsKilled',),
+    'jungleMinionsKilled': ('jungleMinionsKilled',),
+    'x': ('position', 'x'),
+    'y': ('position', 'y'),
+    'timeEnemySpentControlled': ('timeEnemySpentControlled',),
+    'totalDamageDone': ('damageStats', 'totalDamageDone'),
+    'totalDamageDoneToChampions': ('damageStats', 'totalDamageDoneToChampions'),
+    'totalDamageTaken': ('damageStats', 'totalDamageTaken'),
+    'health': ('championStats', 'health'),
+    'healthMax': ('championStats', 'healthMax'),
+}
+STAT_NAMES = list(FRAME_STATS)
+FRAME_DTYPE = np.dtype('<i4')
+
+# Event types and sub-types are stored as their position in these lists (0 = anything else)
+EVENT_TYPES = [
+    'OTHER', 'ITEM_PURCHASED', 'ITEM_SOLD', 'ITEM_DESTROYED', 'ITEM_UNDO', 'SKILL_LEVEL_UP',
+    'LEVEL_UP', 'WARD_PLACED', 'WARD_KILL', 'CHAMPION_KILL', 'CHAMPION_SPECIAL_KILL',
+    'ELITE_MONSTER_KILL', 'BUILDING_KILL', 'TURRET_PLATE_DESTROYED', 'DRAGON_SOUL_GIVEN',
+    'CHAMPION_TRANSFORM', 'OBJECTIVE_BOUNTY_PRESTART', 'OBJECTIVE_BOUNTY_FINISH', 'FEAT_UPDATE',
+    'PAUSE_END', 'GAME_END',
+]
+EVENT_SUBTYPES = [
+    'OTHER', 'DRAGON', 'BARON_NASHOR', 'RIFTHERALD', 'HORDE', 'ATAKHAN',
+    'AIR_DRAGON', 'EARTH_DRAGON', 'FIRE_DRAGON', 'WATER_DRAGON', 'HEXTECH_DRAGON', 'CHEMTECH_DRAGON',
+    'ELDER_DRAGON', 'TOWER_BUILDING', 'INHIBITOR_BUILDING', 'OUTER_TURRET', 'INNER_TURRET',
+    'BASE_TURRET', 'NEXUS_TURRET', 'YELLOW_TRINKET', 'CONTROL_WARD', 'SIGHT_WARD', 'BLUE_TRINKET',
+    'TEEMO_MUSHROOM', 'KILL_FIRST_BLOOD', 'KILL_MULTI', 'KILL_ACE', 'UNDEFINED',
+]
+_EVENT_TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+_EVENT_SUBTYPE_CODES = {name: code for code, name in enumerate(EVENT_SUBTYPES)}
+
+EVENT_DTYPE = np.dtype([
+    ('match', '<i4'),         # row of the match in the index (see match_rows)
+    ('timestamp', '<i4'),     # milliseconds since the game started
+    ('type', 'u1'),           # EVENT_TYPES code
+    ('subtype', 'u1'),        # EVENT_SUBTYPES code: monster, building, lane/tower, ward or kill type
+    ('participant', 'i1'),    # killer / creator / buyer participantId (0 = minion, turret or none)
+    ('victim', 'i1'),         # victim participantId (0 = none)
+    ('team', '<i2'),          # teamId, or killerTeamId for objectives (0 = none)
+    ('x', '<i2'),
+    ('y', '<i2'),
+    ('value', '<i4'),         # itemId, skillSlot, level, bounty or multiKillLength, by type
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timelines (
+    row INTEGER PRIMARY KEY,
+    match_id TEXT NOT NULL UNIQUE,
+    frame_offset INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    event_offset INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    frame_interval INTEGER NOT NULL,
+    participants TEXT NOT NULL
+);
+"""
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return 0
+        data = data.get(key)
+    return data if isinstance(data, (int, float)) else 0
+
+
+def frames_to_array(timeline):
+    """
+    Turn a timeline's per-participant frames into a (minute, participant, stat) array
+
+    Args:
+        timeline (dict): Raw timeline document from match-v5
+
+    Returns:
+        numpy.ndarray: int32 array of shape (frames, MAX_PARTICIPANTS, len(FRAME_STATS))
+    """
+    frames = timeline.get('info', {}).get('frames', [])
+    array = np.zeros((len(frames), MAX_PARTICIPANTS, len(FRAME_STATS)), dtype=FRAME_DTYPE)
+    paths = list(FRAME_STATS.values())
+    for minute, frame in enumerate(frames):
+        for participant_id, stats in frame.get('participantFrames', {}).items():
+            slot = int(participant_id) - 1
+            if 0 <= slot < MAX_PARTICIPANTS:
+                array[minute, slot] = [_lookup(stats, path) for path in paths]
+    return array
+
+
+def events_to_array(timeline, row=0):
+    """
+    Turn a timeline's events into typed columns
+
+    Args:
+        timeline (dict): Raw timeline document from match-v5
+        row (int): Index row stored in the `match` column (default: 0)
+
+    Returns:
+        numpy.ndarray: Structured array with EVENT_DTYPE
+    """
+    events = [event for frame in timeline.get('info', {}).get('frames', [])
+              for event in frame.get('events', [])]
+    array = np.zeros(len(events), dtype=EVENT_DTYPE)
+    for i, event in enumerate(events):
+        position = event.get('position') or {}
+        subtype = (event.get('monsterSubType') or event.get('monsterType') or event.get('towerType')
+                   or event.get('buildingType') or event.get('wardType') or event.get('killType'))
+        value = (event.get('itemId') or event.get('skillSlot') or event.get('level')
+                 or event.get('bounty') or event.get('multiKillLength') or 0)
+        array[i] = (
+            row,
+            event.get('timestamp', 0),
+            _EVENT_TYPE_CODES.get(event.get('type'), 0),
+            _EVENT_SUBTYPE_CODES.get(subtype, 0),
+            event.get('killerId') or event.get('creatorId') or event.get('participantId') or 0,
+            event.get('victimId') or 0,
+            event.get('killerTeamId') or event.get('teamId') or 0,
+            position.get('x', 0),
+            position.get('y', 0),
+            value,
+        )
+    return array
+
+
+class TimelineStore:
+    """
+    Append-only columnar store of match timelines
+
+    Frames from every game are appended to one int32 file that maps as a
+    single (frame, participant, stat) array, and events to one file of
+    EVENT_DTYPE records. An SQLite index records where each game's frames
+    and events start, so a query like "team gold difference at 15 minutes
+    across every game" is one fancy-indexing operation over the map rather
+    than a JSON parse per game.
+    """
+
+    def __init__(self, root=DEFAULT_TIMELINE_PATH):
+        """
+        Args:
+            root (str): Directory holding the array files and index
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.executescript(SCHEMA)
+        self.frames_path = os.path.join(root, "frames.i32")
+        self.events_path = os.path.join(root, "events.bin")
+        self._frame_size = MAX_PARTICIPANTS * len(FRAME_STATS) * FRAME_DTYPE.itemsize
+        frame_end, event_end = self._index.execute(
+            "SELECT COALESCE(MAX(frame_offset + frames), 0), COALESCE(MAX(event_offset + events), 0) FROM timelines"
+        ).fetchone()
+        # Drop anything appended after the last indexed game (a write interrupted by a crash)
+        self._frame_writer = self._open_truncated(self.frames_path, frame_end * self._frame_size)
+        self._event_writer = self._open_truncated(self.events_path, event_end * EVENT_DTYPE.itemsize)
+        self._frames_written = frame_end
+        self._events_written = event_end
+        self._rows = None
+
+    def _open_truncated(self, path, size):
+        writer = open(path, "ab")
+        writer.truncate(size)
+        writer.seek(size)
+        return writer
+
+    def __contains__(self, match_id):
+        with self._lock:
+            row = self._index.execute("SELECT 1 FROM timelines WHERE match_id = ?", (match_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._index.execute("SELECT COUNT(*) FROM timelines").fetchone()[0]
+
+    def put(self, match_id, timeline):
+        """
+        Append a timeline unless it is already stored
+
+        Args:
+            match_id (str): Match ID (e.g. NA1_5263238906)
+            timeline (dict): Raw timeline document from match-v5
+
+        Returns:
+            bool: True if the timeline was written, False if it was already stored
+        """
+        info = timeline.get('info', {})
+        participants = ",".join(p.get('puuid', '') for p in
+                                sorted(info.get('participants', []), key=lambda p: p.get('participantId', 0)))
+        frames = frames_to_array(timeline)
+
+        with self._lock:
+            if self._index.execute("SELECT 1 FROM timelines WHERE match_id = ?", (match_id,)).fetchone():
+                return False
+            row = self._index.execute("SELECT COALESCE(MAX(row), -1) + 1 FROM timelines").fetchone()[0]
+            events = events_to_array(timeline, row)
+            self._frame_writer.write(frames.tobytes())
+            self._frame_writer.flush()
+            self._event_writer.write(events.tobytes())
+            self._event_writer.flush()
+            with self._index:
+                self._index.execute(
+                    "INSERT INTO timelines (row, match_id, frame_offset, frames, event_offset, events, "
+                    "frame_interval, participants) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row, match_id, self._frames_written, len(frames), self._events_written, len(events),
+                     info.get('frameInterval', 60000), participants),
+                )
+            self._frames_written += len(frames)
+            self._events_written += len(events)
+            self._rows = None
+        return True
+
+    def frames(self):
+        """
+        Map every stored frame
+
+        Returns:
+            numpy.ndarray: Read-only (frame, participant, stat) array; use
+                match_rows() to find where each game's frames start
+        """
+        with self._lock:
+            count = self._frames_written
+        if not count:
+            return np.zeros((0, MAX_PARTICIPANTS, len(FRAME_STATS)), dtype=FRAME_DTYPE)
+        return np.memmap(self.frames_path, dtype=FRAME_DTYPE, mode='r',
+                         shape=(count, MAX_PARTICIPANTS, len(FRAME_STATS)))
+
+    def events(self):
+        """
+        Map every stored event
+
+        Returns:
+            numpy.ndarray: Read-only structured array with EVENT_DTYPE
+        """
+        with self._lock:
+            count = self._events_written
+        if not count:
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        return np.memmap(self.events_path, dtype=EVENT_DTYPE, mode='r', shape=(count,))
+
+    def match_rows(self):
+        """
+        Get where each game's frames and events are
+
+        Returns:
+            dict: 'match_id' list plus 'frame_offset', 'frames', 'event_offset'
+                and 'events' int64 arrays, all indexed by row
+        """
+        with self._lock:
+            if self._rows is None:
+                rows = self._index.execute(
+                    "SELECT match_id, frame_offset, frames, event_offset, events FROM timelines ORDER BY row"
+                ).fetchall()
+                columns = list(zip(*rows)) or [[], [], [], [], []]
+                self._rows = {'match_id': list(columns[0])}
+                for name, values in zip(('frame_offset', 'frames', 'event_offset', 'events'), columns[1:]):
+                    self._rows[name] = np.array(values, dtype=np.int64)
+            return self._rows
+
+    def get_frames(self, match_id):
+        """
+        Get one game's frames
+
+        Returns:
+            numpy.ndarray: (minute, participant, stat) view, or None if the timeline is not stored
+        """
+        with self._lock:
+            row = self._index.execute(
+                "SELECT frame_offset, frames FROM timelines WHERE match_id = ?", (match_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.frames()[row[0]:row[0] + row[1]]
+
+    def get_events(self, match_id):
+        """
+        Get one game's events
+
+        Returns:
+            numpy.ndarray: EVENT_DTYPE view, or None if the timeline is not stored
+        """
+        with self._lock:
+            row = self._index.execute(
+                "SELECT event_offset, events FROM timelines WHERE match_id = ?", (match_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.events()[row[0]:row[0] + row[1]]
+
+    def stat_at(self, stat, minute):
+        """
+        Get one stat for every participant at a given minute of every game that lasted that long
+
+        Args:
+            stat (str): Name from FRAME_STATS (e.g. totalGold)
+            minute (int): Frame number (frame 0 is the game start)
+
+        Returns:
+            tuple: (match_ids, values) where values has shape (games, MAX_PARTICIPANTS)
+        """
+        rows = self.match_rows()
+        long_enough = np.nonzero(rows['frames'] > minute)[0]
+        values = self.frames()[rows['frame_offset'][long_enough] + minute, :, STAT_NAMES.index(stat)]
+        return [rows['match_id'][i] for i in long_enough], np.asarray(values)
+
+    def gold_diff_at(self, minute):
+        """
+        Get blue-side minus red-side total gold at a given minute of every game
+
+        Returns:
+            tuple: (match_ids, int64 array of gold differences)
+        """
+        match_ids, gold = self.stat_at('totalGold', minute)
+        gold = gold.astype(np.int64)
+        return match_ids, gold[:, :5].sum(axis=1) - gold[:, 5:].sum(axis=1)
+
+    def close(self):
+        """Close the array files and index"""
+        with self._lock:
+            self._frame_writer.close()
+            self._event_writer.close()
+            self._index.close()
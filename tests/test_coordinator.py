@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+import src.api_scraper
+from src.api_scraper import RiotClient
+from src.coordinator import Coordinator, Worker
+from src.job_queue import DONE, IN_PROGRESS
+from src.key_pool import KeyPool
+from src.match_store import MatchStore
+from src.mock_server import MockRiotAPI, MockRiotServer
+
+APP_LIMITS = '500:10,30000:600'
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = MockRiotAPI(players=50, matches=40)
+    server = MockRiotServer(api, latency=0.0, jitter=0.0, app_limits=APP_LIMITS).start()
+    monkeypatch.setattr(src.api_scraper, 'API_URL_TEMPLATE', server.url_template)
+    yield api
+    server.stop()
+
+
+def test_restarted_worker_finishes_its_own_orphaned_matches(api, tmp_path):
+    path = str(tmp_path / "coordinator.sqlite")
+    match_ids = [api.match_id(number) for number in range(40)]
+    Coordinator(path).publish('na1', match_ids)
+
+    # The first run claims a batch and is killed before finishing or leaving
+    crashed = Coordinator(path, lease_seconds=3)
+    crashed.heartbeat('host-0')
+    crashed.rebalance('host-0')
+    assert len(crashed.claim('host-0', limit=10)) == 10
+    crashed.close()
+
+    coordinator = Coordinator(path, lease_seconds=3)
+    assert coordinator.counts()[IN_PROGRESS] == 10
+    client = RiotClient(KeyPool(['k'], app_limits=APP_LIMITS))
+    store = MatchStore(str(tmp_path / "store"))
+    worker = Worker(client, coordinator, store, worker_id='host-0', max_in_flight=4, idle_seconds=0.1)
+    summary = {}
+    thread = threading.Thread(target=lambda: summary.update(worker.run()), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    try:
+        assert not thread.is_alive(), "restarted worker never finished"
+        assert coordinator.counts() == {DONE: 40}
+        assert summary['matches_saved'] == 40
+    finally:
+        store.close()
+        coordinator.close()
+        client.close()
@@ -0,0 +1,40 @@
+from src.job_queue import DONE, IN_PROGRESS, PENDING, JobQueue, KIND_MATCH_IDS
+from src.metrics import Metrics
+
+
+def open_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "crawl.sqlite"), metrics=Metrics(), **kwargs)
+
+
+def test_rerun_picks_up_jobs_a_crashed_run_had_claimed(tmp_path):
+    crashed = open_queue(tmp_path)
+    crashed.enqueue_many(KIND_MATCH_IDS, 'na1', [f"p{i}" for i in range(10)])
+    assert len(crashed.claim(KIND_MATCH_IDS, 'na1', limit=4)) == 4
+    crashed.close()
+
+    queue = open_queue(tmp_path)
+    assert queue.recover(older_than=0) == 4
+    for jobs in queue.drain(KIND_MATCH_IDS, 'na1'):
+        queue.complete_many(KIND_MATCH_IDS, 'na1', [key for key, _ in jobs])
+    assert queue.counts(KIND_MATCH_IDS, 'na1') == {DONE: 10}
+    queue.close()
+
+
+def test_drain_releases_unfinished_jobs_when_stopped_early(tmp_path):
+    queue = open_queue(tmp_path)
+    queue.enqueue_many(KIND_MATCH_IDS, 'na1', ['a', 'b', 'c'])
+    drain = queue.drain(KIND_MATCH_IDS, 'na1')
+    (key, _), *_ = next(drain)
+    queue.complete(KIND_MATCH_IDS, 'na1', key)
+    drain.close()
+    assert queue.counts(KIND_MATCH_IDS, 'na1') == {DONE: 1, PENDING: 2}
+    queue.close()
+
+
+def test_next_retry_in_waits_for_leases(tmp_path):
+    queue = open_queue(tmp_path, lease_seconds=60)
+    queue.enqueue(KIND_MATCH_IDS, 'na1', 'a')
+    queue.claim(KIND_MATCH_IDS, 'na1')
+    assert queue.counts(KIND_MATCH_IDS, 'na1') == {IN_PROGRESS: 1}
+    assert 59 < queue.next_retry_in(KIND_MATCH_IDS, 'na1') <= 60
+    queue.close()
@@ -0,0 +1,28 @@
+import json
+
+from src.match_store import MatchStore
+
+
+def match(number):
+    return {'metadata': {'matchId': f"NA1_{number}", 'participants': [f"p{number}", "shared"]},
+            'info': {'gameCreation': number, 'participants': []}}
+
+
+def test_torn_write_is_cut_off_before_the_next_append(tmp_path):
+    root = str(tmp_path / "store")
+    store = MatchStore(root)
+    for number in range(3):
+        store.put(f"NA1_{number}", match(number))
+    segment = store.segment_path(0)
+    store.close()
+
+    # A crash mid-write leaves the start of a record after the last indexed one
+    with open(segment, "ab") as f:
+        f.write(b"\x05\x00\xff\xff\x00\x00NA1_9partial")
+
+    store = MatchStore(root)
+    store.put("NA1_3", match(3))
+    assert [match_id for match_id, _ in store.scan_raw()] == ["NA1_0", "NA1_1", "NA1_2", "NA1_3"]
+    assert store.get("NA1_3") == match(3)
+    assert json.loads(dict(store.scan_raw())["NA1_1"]) == match(1)
+    store.close()